@@ -8,8 +8,9 @@ If not, see https://www.gnu.org/licenses/.
 
 from ._jet import Jet
 from ._indoor_release import IndoorRelease
-from ._flame import Flame
+from ._flame import Flame, RadiativeKernel, RadiativeField
 from ._comps import Fluid, Orifice, Source, Enclosure, Vent
+from ._release_state import ReleaseStateCache
 from ._unconfined_overpressure import BST_method, TNT_method, Bauwens_method
 from ._fuel_props import FuelProperties
 from . import api
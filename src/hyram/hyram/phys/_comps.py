@@ -152,7 +152,7 @@ class Orifice:
         '''
         return fluid.rho * fluid.v * self.A * self.Cd
 
-    def flow(self, upstream_fluid, downstream_P = 101325, mdot = None, suppressWarnings = True):
+    def flow(self, upstream_fluid, downstream_P = 101325, mdot = None, suppressWarnings = True, method = 'sonic'):
         '''
         Returns the fluid in a flow restriction, for given upstream conditions 
         and downstream pressure.  Isentropic expansion.
@@ -162,10 +162,14 @@ class Orifice:
         upstream_fluid - upstream fluid with therm object, as well as P, T, rho, v
         downstream_P - float: downstream pressure (Pa)
         mdot - mass flow rate - only used for unchoked flow
+        method - {'sonic', 'minimize'} how the throat pressure is found: 'sonic' solves for the pressure 
+                 where the isentropic velocity equals the speed of sound with a secant iteration (falling back 
+                 to 'minimize' if it does not converge), 'minimize' maximizes the mass flux over the pressure range
         
         Returns
         -------
         Fluid object containing T, P, rho, v at the throat (orifice)
+        (the method used and number of iterations are in the fluid._throat_solution dictionary)
         '''           
         h0 = upstream_fluid.therm._total_enthalpy(P=upstream_fluid.P,
                                                   rho=upstream_fluid.rho,
@@ -186,10 +190,19 @@ class Orifice:
                 return fluid
             else:
                 raise ValueError('Downstream pressure is the same as upstream pressure.  Need to specify mass flow rate (mdot).')
-        def negflux(P):
-            h, rho = fluid.therm.PropsSI(['H', 'D'], P = P, S = s0)
-            return -rho*np.sqrt(2 * (h0 - h))
-        P = optimize.minimize_scalar(negflux, bounds = (downstream_P, upstream_fluid.P), method = 'bounded')['x']
+        P = None
+        if method == 'sonic':
+            P, iterations = self._sonic_pressure(fluid.therm, h0, s0, upstream_fluid.P, downstream_P)
+            fluid._throat_solution = {'method': 'sonic', 'iterations': iterations}
+        elif method != 'minimize':
+            raise ValueError("Unknown throat solution method '{}', use 'sonic' or 'minimize'".format(method))
+        if P is None:
+            def negflux(P):
+                h, rho = fluid.therm.PropsSI(['H', 'D'], P = P, S = s0)
+                return -rho*np.sqrt(2 * (h0 - h))
+            res = optimize.minimize_scalar(negflux, bounds = (downstream_P, upstream_fluid.P), method = 'bounded')
+            P = res['x']
+            fluid._throat_solution = {'method': 'minimize', 'iterations': res['nfev']}
         h, rho = fluid.therm.PropsSI(['H', 'D'], P = P, S = s0)
         fluid.update(rho = rho, P = P, v = np.sqrt(2 * (h0 - h)))
         if P - downstream_P > .01: 
@@ -208,6 +221,39 @@ class Orifice:
                                          downstream_P*(P - downstream_P <= .01)), v=v)
         return fluid
 
+    @staticmethod
+    def _sonic_pressure(therm, h0, s0, upstream_P, downstream_P, maxiter = 50):
+        '''
+        Pressure at which the isentropic expansion velocity equals the speed of sound (maximum mass flux)
+        
+        Parameters
+        ----------
+        therm - thermodynamic class of the fluid
+        h0 - upstream total enthalpy (J/kg)
+        s0 - upstream entropy (J/kg-K)
+        upstream_P - upstream pressure (Pa)
+        downstream_P - downstream pressure (Pa)
+        
+        Returns
+        -------
+        (P, iterations) - throat pressure (Pa) (downstream_P if unchoked, None if the solution failed)
+                          and the number of iterations
+        '''
+        def err(P):
+            h, a = therm.PropsSI(['H', 'A'], P = P, S = s0)
+            return 2 * (h0 - h) - a**2
+        try:
+            # initial guesses bracket the ideal gas critical pressure ratio for 1 < gamma < 1.7
+            P, res = optimize.newton(err, 0.53*upstream_P, x1 = 0.49*upstream_P, tol = 1e-3, rtol = 1e-10,
+                                     maxiter = maxiter, full_output = True, disp = False)
+        except (ValueError, RuntimeError, ZeroDivisionError):
+            return None, 0
+        if not res.converged or not np.isfinite(P) or P >= upstream_P:
+            return None, res.iterations
+        if P <= downstream_P:
+            return downstream_P, res.iterations
+        return P, res.iterations
+
 
 class Source(object):
     """
@@ -6,6 +6,7 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+import hashlib
 import os
 import warnings
 
@@ -15,13 +16,16 @@ from scipy import constants as const
 from scipy import integrate, interpolate, optimize
 
 from ._jet import DevelopingFlow
-from ._therm import Combustion
+from ._therm import get_combustion
 from ._comps import Fluid
 from ._plots import plot_sliced_contour
-from ._utils import get_distance_to_effect
+from ._utils import get_distance_to_effect, split_direction, trajectory_jacobian
 from ..utilities.custom_warnings import PhysicsWarning
 
 
+_MAX_RADIATIVE_KERNELS = 8
+
+
 class Flame:
     def __init__(self, fluid, orifice, ambient, mdot=None,
                  theta0=0, x0=0, y0=0,
@@ -31,7 +35,7 @@ class Flame:
                  T_establish_min=-1, verbose=False,
                  Smax=np.inf, dS=None, tol=1e-6, 
                  numB=5, n_pts_integral=100, 
-                 wind_speed = 0):
+                 wind_speed = 0, release_cache=None, solver='LSODA', developing_flow=None):
         '''
         class for calculating the characteristics of a 2-D flame, without wind
         see Ekoto et al. International Journal of Hydrogen Energy, 39, 2014 (20570-20577)
@@ -91,14 +95,33 @@ class Flame:
             maximum number of halfwidths (B) considered to be infinity - for integration in equations
         n_pts_integral: int, optional
             maximum number of points in integration (from 0 to numB)
+        release_cache: ReleaseStateCache object, optional
+            cache of diameter-independent throat and notional nozzle states, shared between releases,
+            the developing flow of the release is also taken from (or added to) the cache
+        solver: string, optional
+            scipy.integrate.solve_ivp method, 'LSODA' (default), 'Radau', 'BDF', or an explicit method
+            (e.g., 'RK45'), the implicit methods use the Jacobian of the governing equations (see _jacobian)
+        developing_flow: DevelopingFlow object, optional
+            precomputed developing flow of the release (solved with lam=lamf and the same betaA),
+            if None, it is solved (or taken from release_cache)
         '''
         self.x, self.y, self.S = [], [], []
-        self.developing_flow = DevelopingFlow(fluid, orifice, ambient, mdot,
-                                              theta0=theta0, x0=x0, y0=y0,
-                                              lam=lamf, betaA=betaA,
-                                              nn_conserve_momentum=nn_conserve_momentum, nn_T=nn_T,
-                                              T_establish_min=T_establish_min,
-                                              verbose=verbose)
+        if developing_flow is not None:
+            self.developing_flow = developing_flow
+        elif release_cache is not None:
+            self.developing_flow = release_cache.developing_flow(fluid, orifice, ambient, mdot,
+                                                                 theta0=theta0, x0=x0, y0=y0,
+                                                                 lam=lamf, betaA=betaA,
+                                                                 nn_conserve_momentum=nn_conserve_momentum, nn_T=nn_T,
+                                                                 T_establish_min=T_establish_min,
+                                                                 verbose=verbose)
+        else:
+            self.developing_flow = DevelopingFlow(fluid, orifice, ambient, mdot,
+                                                  theta0=theta0, x0=x0, y0=y0,
+                                                  lam=lamf, betaA=betaA,
+                                                  nn_conserve_momentum=nn_conserve_momentum, nn_T=nn_T,
+                                                  T_establish_min=T_establish_min,
+                                                  verbose=verbose)
         self.initial_node = self.developing_flow.initial_node
         self.mass_flow_rate = self.developing_flow.mass_flow_rate
         expanded_plug_node = self.developing_flow.expanded_plug_node
@@ -111,7 +134,7 @@ class Flame:
         self.af = af
         self.verbose = verbose
         self.wind_speed = wind_speed
-        self.solve(Smax, dS, tol, numB, n_pts_integral)
+        self.solve(Smax, dS, tol, numB, n_pts_integral, solver)
 
     def _govEqns(self, S, ind_vars, numB=5, n_pts_integral=100):
         '''
@@ -119,14 +142,30 @@ class Flame:
         
         A matrix soluition to the continuity, x-momentum, y-mometum and mixture fraction equations
         solves for d/dS of the dependent variables V_cl, B, theta, and f_cl.  Numerically integrated
-        to infinity = numB * B(S) using numpts discrete points.'''
-        
-        # break independent variables out of ind_vars
+        to infinity = numB * B(S) using numpts discrete points (see _integrals and _system).'''
         [V_cl, B, theta, f_cl, x, y] = ind_vars
-        
+        I = self._integrals(np.array([ind_vars], dtype=float), numB, n_pts_integral)[0]
+        LHS, RHS = self._system(S, ind_vars, I, numB, n_pts_integral)
+        dz = np.append(np.linalg.solve(LHS, RHS), np.array([np.cos(theta), np.sin(theta)]), axis=0)
+
+        return dz
+
+    def _integrals(self, states, numB=5, n_pts_integral=100):
+        '''
+        Radial integrals of the governing equations (see _system) for an array of states, each a row of
+        (V_cl, B, theta, f_cl, x, y). The integrals do not depend on theta, x, or y.
+
+        Returns
+        -------
+        ndarray with a row for each state of the continuity integrals (4, for d/dS of V_cl, B, theta, f_cl),
+        the momentum integrals without the angle (4), int(rho*V**2*r), the mixture fraction integrals (4),
+        int(rho_amb - rho), and int((rho_amb - rho)*g*r)
+        '''
+        V_cl, B, f_cl = [states[:, [k]] for k in [0, 1, 3]]
+
         # needed to integrate to infinity (numB*B):
-        r = np.zeros(n_pts_integral)
-        r[1:] = np.logspace(-7, np.log10(numB * B), n_pts_integral - 1)
+        r = np.zeros((len(states), n_pts_integral))
+        r[:, 1:] = np.logspace(-7, np.log10(numB * B[:, 0]), n_pts_integral - 1, axis=-1)
 
         # mixture fraction and velocity have Gaussian shapes
         f = f_cl * np.exp(-(r / (self.lamf * B)) ** 2)
@@ -142,39 +181,49 @@ class Flame:
             rho = self.chem.rho_prod(f)
             drhodf = self.chem.drhodf(f)
 
-        rho_int = integrate.trapz(self.ambient.rho - rho, r)
+        zero = np.zeros_like(r)
+        dfdS = np.array([zero, 2 * r ** 2 / self.lamf ** 2 / B ** 3 * f, zero, f / f_cl])
+        dVdS = np.array([V / V_cl, 2 * r ** 2 / self.lamv ** 2 / B ** 3 * V, zero, zero])
+        drhodS = drhodf * dfdS
+
+        integrals = [integrate.trapz(drhodS * V * r + rho * dVdS * r, r),  # continuity
+                     integrate.trapz(drhodS * V ** 2 * r + 2 * rho * V * dVdS * r, r),  # momentum
+                     integrate.trapz(rho * V ** 2 * r, r)[None],  # momentum, d/dS(theta)
+                     integrate.trapz(drhodS * V * f * r + rho * dVdS * f * r + rho * V * dfdS * r, r),  # mixture fraction
+                     integrate.trapz(self.ambient.rho - rho, r)[None],
+                     integrate.trapz((self.ambient.rho - rho) * const.g * r, r)[None]]
+        return np.concatenate(integrals).T
 
-        Ebuoy = Ebuoy = (2 * np.pi * self.alpha_buoy * np.sin(theta) * const.g * rho_int /
-                         (B * V_cl * self.developing_flow.fluid_exp.rho))  # m**2/s
+    def _system(self, S, ind_vars, integrals, numB=5, n_pts_integral=100):
+        '''
+        Left-hand side (matrix) and right-hand side of the continuity, x-momentum, y-momentum, and
+        mixture fraction equations for d/dS of (V_cl, B, theta, f_cl), from the radial integrals of
+        the state (see _integrals). Also evaluated with complex values (see _jacobian).
+        '''
+        [V_cl, B, theta, f_cl, x, y] = ind_vars
+        cont, mom, mom_theta, mix = integrals[0:4], integrals[4:8], integrals[8], integrals[9:13]
+        rho_int, ymom_int = integrals[13], integrals[14]
+        dthetadS = np.array([0, 0, 1, 0])
+
+        Ebuoy = (2 * np.pi * self.alpha_buoy * np.sin(theta) * const.g * rho_int /
+                 (B * V_cl * self.developing_flow.fluid_exp.rho))  # m**2/s
         E = self.Emom + Ebuoy
 
         # right-hand side of governing equations:
         RHS = np.array([self.ambient.rho * E / (2 * const.pi),  # continuity
                         self.wind_speed * self.ambient.rho * E / (2 * const.pi),  # x-momentum
-                        integrate.trapz((self.ambient.rho - rho) * const.g * r, r),  # y-momentum
+                        ymom_int,  # y-momentum
                         0])  # mixture fraction
 
-        zero = np.zeros_like(r)
-        dfdS = np.array([zero, 2 * r ** 2 / self.lamf ** 2 / B ** 3 * f, zero, f / f_cl])
-        dVdS = np.array([V / V_cl, 2 * r ** 2 / self.lamv ** 2 / B ** 3 * V, zero, zero])
-        drhodS = drhodf * dfdS
-        dthetadS = np.array([zero, zero, np.ones_like(r), zero])
-
         # left-hand side of governing equations:
-        LHS = np.array([drhodS * V * r + rho * dVdS * r,  # continuity
-                        drhodS * V ** 2 * np.cos(theta) * r + 2 * rho * V * dVdS * np.cos(
-                            theta) * r + rho * V ** 2 * -np.sin(theta) * dthetadS * r,  # x-momentum
-                        drhodS * V ** 2 * np.sin(theta) * r + 2 * rho * V * dVdS * np.sin(
-                            theta) * r + rho * V ** 2 * np.cos(theta) * dthetadS * r,  # y-momentum
-                        drhodS * V * f * r + rho * dVdS * f * r + rho * V * dfdS * r])  # mixture fraction
-        LHS = integrate.trapz(LHS, r)
-        
-        dz = np.append(np.linalg.solve(LHS, RHS), np.array([np.cos(theta), np.sin(theta)]), axis=0)
-
-        return dz
+        LHS = np.array([cont,  # continuity
+                        mom * np.cos(theta) - mom_theta * np.sin(theta) * dthetadS,  # x-momentum
+                        mom * np.sin(theta) + mom_theta * np.cos(theta) * dthetadS,  # y-momentum
+                        mix])  # mixture fraction
+        return LHS, RHS
 
     def solve(self, Smax=np.inf, dS=None, tol=1e-6,
-              numB=5, n_pts_integral=100):
+              numB=5, n_pts_integral=100, solver='LSODA'):
         '''
         Solves for a flame. Returns a dictionary of flame results.  Also updates the Flame class with those results.
         
@@ -182,6 +231,8 @@ class Flame:
         ----------
         Smax : float, optional
             endopoint along curved flame for integration (m) default will calculate visible length of flame
+        solver : string, optional
+            scipy.integrate.solve_ivp method (see __init__)
         
         Returns
         -------
@@ -189,11 +240,7 @@ class Flame:
             dictionary of flame results
         '''
         #ESH note: self.developing_flow.fluid_exp is at a much lower temperature than ambient and gives funky heat flux numbers if used in the Combustion object, hence initilization at ambient T and P - could be improved. 
-        try:
-            if self.chem.Treac != self.ambient.T or abs(self.chem.P / self.ambient.P - 1) > 1e-10:
-                self.chem.reinitilize(Fluid(species = self.fluid.species, T = self.ambient.T, P = self.ambient.P))
-        except:
-            self.chem = Combustion(Fluid(species = self.fluid.species, T = self.ambient.T, P = self.ambient.P))
+        self._set_chem()
 
         if self.verbose:
             print('solving for the flame...', end='')
@@ -209,23 +256,44 @@ class Flame:
         else:
             max_step = dS
             first_step = dS
+        # explicit methods do not use (and warn about) a Jacobian
+        options = {'jac': self._jacobian} if solver in ['LSODA', 'Radau', 'BDF'] else {}
         sol = integrate.solve_ivp(self._govEqns, [self.initial_node.S, Smax], 
                                   np.array([self.initial_node.v_cl, self.initial_node.B, self.initial_node.theta, f_cl0, 
                                             self.initial_node.x, self.initial_node.y]),
                                   max_step = max_step, first_step = first_step,
                                   args = (numB, n_pts_integral),
                                   atol=tol, rtol=tol,
-                                  method = 'LSODA'
+                                  method = solver,
+                                  **options
                                   )
 
         result = dict(zip(['V_cl', 'B', 'theta', 'f_cl', 'x', 'y'], sol.y))
         result['S'] = sol.t
         for k, v in result.items():
             self.__dict__[k] = v
+        self._radiative_kernels = {}
         if self.verbose:
             print('done.')
         return result
 
+    def _jacobian(self, S, ind_vars, numB=5, n_pts_integral=100):
+        '''
+        Jacobian of the governing equations (see _govEqns) with respect to (V_cl, B, theta, f_cl, x, and y).
+        The radial integrals (which depend on V_cl, B, and f_cl) are differenced in a single evaluation,
+        the rest of the equations are differentiated by complex steps (see trajectory_jacobian).
+        '''
+        return trajectory_jacobian(self._integrals, self._system, S, ind_vars, [0, 1, 3], 2, numB, n_pts_integral)
+
+    def _set_chem(self):
+        '''
+        Sets the combustion chemistry at ambient temperature and pressure, unless the given chemistry
+        already matches, using the process-wide cache rather than modifying the given chemistry
+        '''
+        if (self.chem is None or self.chem.reac != self.fluid.species or self.chem.Treac != self.ambient.T
+                or abs(self.chem.P / self.ambient.P - 1) > 1e-10):
+            self.chem = get_combustion(Fluid(species = self.fluid.species, T = self.ambient.T, P = self.ambient.P))
+
     def length(self):
         '''
         These correlations come from Schefer et al. IJHE 31 (2006): 1332-1340
@@ -239,11 +307,7 @@ class Flame:
         .tauf (flame residence time)
         .Xrad (radiant fraction)
         '''
-        try:
-            if self.chem.Treac != self.ambient.T or abs(self.chem.P / self.ambient.P - 1) > 1e-10:
-                self.chem.reinitilize(Fluid(species = self.fluid.species, T = self.ambient.T, P = self.ambient.P))
-        except:
-            self.chem = Combustion(Fluid(species = self.fluid.species, T = self.ambient.T, P = self.ambient.P))
+        self._set_chem()
         fs, Tad = self.chem.fstoich, self.chem.T_prod(self.chem.fstoich)
         Tamb = self.ambient.T
         rhoair, rhof = self.ambient.rho, self.chem.rho_prod(self.chem.fstoich)
@@ -272,19 +336,16 @@ class Flame:
 
         return self.Lvis
 
-    def Qrad_multi(self, x, y, z, RH, WaistLoc=0.75, N=50):
-        '''
-        MultiSource radiation model
-        follows Hankinson & Lowesmith, CNF 159, 2012: 1165-1177       
+    def _radiative_sources(self, WaistLoc=0.75, N=50):
         '''
-        obsOrg = np.array([x, y, z]).T
-
-        try:
-            Lvis = self.Lvis  # length of visible flame [m]
-        except:
-            Lvis = self.length()
-        T = self.ambient.T
+        Weighted point sources of the multi-source radiation model
 
+        Returns
+        -------
+        tuple of (sources, weights)
+            sources: ndarray of shape (N, 3) of source (x, y, z) locations (m)
+            weights: ndarray of shape (N,) of source weights, which sum to 1
+        '''
         n = int(WaistLoc * N)
         w = np.arange(1, N + 1, dtype=float)
         w[n:] = (n - ((n - 1) / (N - (n + 1))) * (w[n:] - (n + 1)))
@@ -292,41 +353,72 @@ class Flame:
 
         try:
             S = np.linspace(self.S[0], min([self.S[-1], self.Lvis]), N)
-            X = interpolate.interp1d(self.S, self.x)(S)
-            Y = interpolate.interp1d(self.S, self.y)(S)
         except:
             warnings.warn('Running flame model with default parameters.', category=PhysicsWarning)
             self.solve()
             S = np.linspace(self.S[0], min([self.S[-1], self.Lvis]), N)
-            X = interpolate.interp1d(self.S, self.x)(S)
-            Y = interpolate.interp1d(self.S, self.y)(S)
+        sources = np.array([np.interp(S, self.S, self.x), np.interp(S, self.S, self.y), np.zeros_like(S)]).T
+        return sources, w
 
-        sourceOrg = np.array([X, Y, np.zeros_like(X)]).T
+    def Qrad_multi(self, x, y, z, RH, WaistLoc=0.75, N=50, chunk_size=4096, dtype=np.float64, rtol=None):
+        '''
+        MultiSource radiation model
+        follows Hankinson & Lowesmith, CNF 159, 2012: 1165-1177       
 
-        Qrad = np.zeros(obsOrg.shape[:-1])
+        Parameters
+        ----------
+        x, y, z: float or array-like
+            observer coordinates (m), broadcast against each other
+        RH: float
+            relative humidity (0-1)
+        WaistLoc: float
+            fractional distance along the flame of the largest source weight
+        N: int
+            number of point sources along the flame
+        chunk_size: int
+            maximum number of observers evaluated at once (limits memory to about chunk_size*N*3 values)
+        dtype: numpy floating point type
+            precision of the calculation (np.float32 is faster, with about 1e-6 relative error)
+        rtol: float or None
+            if given, observers far from the flame use fewer sources where the estimated relative error
+            of the heat flux is below rtol (see RadiativeKernel); default is to use all N sources
 
-        for j in range(len(w)):
-            v = sourceOrg[j] - obsOrg
-            if obsOrg.ndim > 1:
-                obsNorm = v / (np.linalg.norm(v, axis=1) + 1e-99)[:, np.newaxis]
-            else:
-                obsNorm = v / (np.linalg.norm(v) + 1e-99)
-
-            if obsOrg.ndim == 4:
-                len_v = np.linalg.norm(v, axis=3)
-                phi = np.arcsin(np.linalg.norm(np.cross(obsNorm, v), axis=3) / len_v)
-            elif obsOrg.ndim == 3:
-                len_v = np.linalg.norm(v, axis=2)
-                phi = np.arcsin(np.linalg.norm(np.cross(obsNorm, v), axis=2) / len_v)
-            elif obsOrg.ndim == 2:
-                len_v = np.linalg.norm(v, axis=1)
-                phi = np.arcsin(np.linalg.norm(np.cross(obsNorm, v), axis=1) / len_v)
-            elif obsOrg.ndim == 1:
-                len_v = np.linalg.norm(v)
-                phi = np.arcsin(np.linalg.norm(np.cross(obsNorm, v)) / len_v)
-            Qrad += w[j] / (4 * const.pi * len_v ** 2) * np.cos(phi) * self.Srad * calc_transmissivity(len_v, T, RH)
-
-        return Qrad.T
+        Returns
+        -------
+        Qrad: ndarray
+            radiative heat flux (W/m^2) with the broadcast shape of x, y, and z
+        '''
+        sources, w = self._radiative_sources(WaistLoc, N)
+        kernel = RadiativeKernel(sources, w, x, y, z, self.Srad, self.ambient.T,
+                                 chunk_size=chunk_size, dtype=dtype, rtol=rtol)
+        return kernel.flux(RH)
+
+    def radiative_kernel(self, x, y, z, WaistLoc=0.75, N=50, chunk_size=4096, dtype=np.float64, rtol=None):
+        '''
+        Returns the humidity-independent part of the multi-source radiation model (see Qrad_multi)
+        for a set of observers, which is kept for reuse until the flame is solved again
+
+        Parameters
+        ----------
+        x, y, z: float or array-like
+            observer coordinates (m), broadcast against each other
+        WaistLoc, N, chunk_size, dtype, rtol:
+            see Qrad_multi
+
+        Returns
+        -------
+        RadiativeKernel object
+        '''
+        x, y, z = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in (x, y, z)])
+        key = (WaistLoc, N, np.dtype(dtype).str, rtol, x.shape,
+               hashlib.sha1(np.ascontiguousarray([x, y, z]).tobytes()).hexdigest())
+        if key not in self._radiative_kernels:
+            if len(self._radiative_kernels) >= _MAX_RADIATIVE_KERNELS:
+                self._radiative_kernels.pop(next(iter(self._radiative_kernels)))
+            sources, w = self._radiative_sources(WaistLoc, N)
+            self._radiative_kernels[key] = RadiativeKernel(sources, w, x, y, z, self.Srad, self.ambient.T,
+                                                           chunk_size=chunk_size, dtype=dtype, rtol=rtol)
+        return self._radiative_kernels[key]
 
     def _contourdata(self):
         iS = np.arange(len(self.S))
@@ -429,7 +521,8 @@ class Flame:
                               nx=50, ny=50, nz=50,
                               xlims=None, ylims=None, zlims=None,
                               WaistLoc=0.75,
-                              savefig=True):
+                              savefig=True, fields=None, return_fields=False,
+                              max_workers=None, progressive=False):
         '''
         plots slices of heat flux levels
 
@@ -457,11 +550,20 @@ class Flame:
             value between 0 and 1 along flame length at which to make xz slice
         savefig : boolean (optional)
             whether to save the figure as filename
+        fields : dict (optional)
+            fields returned by a previous call with return_fields=True, to re-plot without recalculating
+        return_fields : Boolean (optional)
+            whether to also return the calculated fields (see plot_sliced_contour)
+        max_workers : int (optional)
+            number of threads over which the slices are evaluated
+        progressive : Boolean (optional)
+            whether to evaluate a coarse grid first and then refine only near the contour levels
 
         Returns
         -------
         If savefig is True, returns full filepath of saved figure;
         if savefig is False, returns figure object.
+        If return_fields is True, returns a tuple of the above and the fields.
         '''
         if contours is None:
             contours = [1.577, 4.732, 25.237]  # kW/m2
@@ -483,7 +585,9 @@ class Flame:
                                               origin_lines=flame_centerlines,
                                               title=title, savefig=savefig,
                                               directory=directory, filename=filename,
-                                              RH=RH, WaistLoc=WaistLoc)
+                                              RH=RH, WaistLoc=WaistLoc,
+                                              fields=fields, return_fields=return_fields,
+                                              max_workers=max_workers, progressive=progressive)
         return fig_or_filepath
 
     def generate_positional_flux(self, flux_coordinates, rel_humid):
@@ -508,7 +612,7 @@ class Flame:
         x_values = [flux_coordinate[0] for flux_coordinate in flux_coordinates]
         y_values = [flux_coordinate[1] for flux_coordinate in flux_coordinates]
         z_values = [flux_coordinate[2] for flux_coordinate in flux_coordinates]
-        flux = self.Qrad_multi(x_values, y_values, z_values, rel_humid)
+        flux = self.radiative_kernel(x_values, y_values, z_values).flux(rel_humid)
         return flux
 
     def get_srad(self):
@@ -562,21 +666,7 @@ class Flame:
         distance : float
             distance to heat_flux_level (m)
         '''
-        flame_center_streamline = self.Lvis * WaistLoc
-        flame_center = [
-            np.interp(flame_center_streamline, self.S, self.x),  # x
-            np.interp(flame_center_streamline, self.S, self.y),  # y
-            0  # z
-        ]
-        from_point = flame_center
-        if direction == 'x':
-            from_point[0] = 0
-        elif direction == 'y':
-            from_point[1] = 0
-        elif direction == 'z':
-            from_point[2] = 0
-        else:
-            raise ValueError(f"Direction ('{direction}') must be 'x', 'y', or 'z'")
+        from_point = self._distance_origin(direction, WaistLoc)
         distance = get_distance_to_effect(value=heat_flux_level,
                                           from_point=from_point,
                                           direction=direction,
@@ -586,6 +676,360 @@ class Flame:
                                           RH=RH)
         return distance
 
+    def _distance_origin(self, direction, WaistLoc=0.75):
+        '''
+        Point from which distances to heat flux levels are measured along an axis:
+        the center of the flame (at WaistLoc along the visible length) with the coordinate along the axis set to 0
+        '''
+        if direction not in ['x', 'y', 'z']:
+            raise ValueError(f"Direction ('{direction}') must be 'x', 'y', or 'z'")
+        flame_center_streamline = self.Lvis * WaistLoc
+        from_point = [
+            np.interp(flame_center_streamline, self.S, self.x),  # x
+            np.interp(flame_center_streamline, self.S, self.y),  # y
+            0  # z
+        ]
+        from_point['xyz'.index(direction)] = 0
+        return from_point
+
+    def hazard_distance_table(self, heat_flux_levels, directions=('x', '-x', 'y', 'z'),
+                              RH=0.89, WaistLoc=0.75, max_distance=500, tol=1e-6):
+        '''
+        Calculate distances from leak point to several heat flux levels in several directions,
+        solving for all of the levels together in each direction (see calc_distance_to_heatflux)
+
+        Parameters
+        ----------
+        heat_flux_levels : array-like
+            heat flux levels for which to get the distances (W/m^2)
+        directions : list of strings, optional
+            directions in which to calculate the distances,
+            each 'x', 'y', or 'z', optionally preceded by '+' or '-'
+            (default is ('x', '-x', 'y', 'z'))
+        RH : float
+            relative humidity
+        WaistLoc : float
+            fractional distance along flame at which to look for the distances
+        max_distance : float (optional)
+            maximum distance to look for heat flux levels
+        tol : float (optional)
+            absolute tolerance of the distances (m)
+
+        Returns
+        -------
+        table : dict
+            distances (m) to each of the heat_flux_levels, keyed by direction;
+            distances in negative directions are negative
+        '''
+        heat_flux_levels = np.asarray(heat_flux_levels, dtype=float)
+        table = {}
+        for direction in directions:
+            axis, negative_direction = split_direction(direction)
+            table[direction] = get_distance_to_effect(heat_flux_levels, self._distance_origin(axis, WaistLoc), axis,
+                                                      self.Qrad_multi, max_distance=max_distance,
+                                                      negative_direction=negative_direction, tol=tol, RH=RH)
+        return table
+
+
+class RadiativeKernel:
+    def __init__(self, sources, weights, x, y, z, Srad, ambient_temperature, chunk_size=4096, dtype=np.float64,
+                 rtol=None):
+        '''
+        Radiative heat flux from weighted point sources to a set of observers, evaluated as one
+        broadcast over (observers x sources) in chunks of observers
+
+        The observer is taken to face each source (cos(phi) = 1), so the view factor of each source
+        is w / (4 pi L^2) for path length L.  The transmissivity (see calc_transmissivity) is a
+        quadratic in log10(L) with coefficients that depend only on the ambient temperature,
+        humidity, and CO2 concentration, so only the sums over sources of the view factors times
+        log10(L)^k (k = 0, 1, 2) are kept for each observer, and the flux for other atmospheric
+        conditions or radiant powers is found from these without recomputing the geometry.
+
+        Parameters
+        ----------
+        sources: ndarray
+            (N, 3) array of source (x, y, z) locations (m)
+        weights: ndarray
+            (N,) array of source weights
+        x, y, z: float or array-like
+            observer coordinates (m), broadcast against each other
+        Srad: float
+            total emitted radiative power (W)
+        ambient_temperature: float
+            ambient temperature (K)
+        chunk_size: int
+            maximum number of observers evaluated at once
+        dtype: numpy floating point type
+            precision of the geometric calculation
+        rtol: float or None
+            if given, observers far from the sources (relative to the extent of the sources) use
+            fewer sources, each combining consecutive sources at their weighted center, where the
+            estimated relative error of the view factor is below rtol (see _source_tiers)
+
+        Contents
+        --------
+        self.shape: tuple
+            broadcast shape of the observer coordinates
+        self.moments: ndarray
+            (3, number of observers) array of sum(w / (4 pi L^2) * log10(L)**k) for k = 0, 1, 2
+        self.num_sources: ndarray
+            number of sources used for each observer, with shape self.shape
+        '''
+        dtype = np.dtype(dtype)
+        if dtype.kind != 'f':
+            raise ValueError('dtype must be a floating point type')
+        x, y, z = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in (x, y, z)])
+        self.shape = x.shape
+        self.Srad, self.ambient_temperature = Srad, ambient_temperature
+        observers = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=-1).astype(dtype)
+        sources = np.asarray(sources, dtype=dtype)
+        weights = np.asarray(weights, dtype=dtype) / dtype.type(4 * const.pi)
+        chunk_size = max(int(chunk_size), 1)
+
+        self.moments = np.empty((3, len(observers)))
+        self.num_sources = np.full(self.shape, len(sources))
+        if rtol is None:
+            tiers = [(sources, weights, slice(None))]
+        else:
+            tiers = _source_tiers(sources, weights, observers, rtol)
+        for tier_sources, tier_weights, index in tiers:
+            self.moments[:, index] = _source_moments(tier_sources, tier_weights, observers[index], chunk_size, dtype)
+            self.num_sources.reshape(-1)[index] = len(tier_sources)
+
+    def flux(self, relative_humidity, ambient_temperature=None, atmospheric_CO2_ppm=335, Srad=None):
+        '''
+        Calculates the heat flux at the observers
+
+        Parameters
+        ----------
+        relative_humidity: float or array-like
+            fractional relative humidity (0-1)
+        ambient_temperature: float or array-like, optional
+            ambient temperature (K), default is the temperature given when the kernel was made
+        atmospheric_CO2_ppm: float or array-like, optional
+            atmospheric CO2 concentration (ppm), default is 335 ppm
+        Srad: float, optional
+            total emitted radiative power (W), default is the power given when the kernel was made
+
+        Returns
+        -------
+        flux: ndarray
+            heat flux (W/m^2) with shape (broadcast shape of the atmospheric conditions) + self.shape
+        '''
+        if ambient_temperature is None:
+            ambient_temperature = self.ambient_temperature
+        if Srad is None:
+            Srad = self.Srad
+        c0, c1, c2 = _transmissivity_coefficients(ambient_temperature, relative_humidity, atmospheric_CO2_ppm)
+        flux = Srad * (np.multiply.outer(c0, self.moments[0]) + np.multiply.outer(c1, self.moments[1])
+                       + c2 * self.moments[2])
+        return flux.reshape(np.shape(c0) + self.shape)
+
+
+class RadiativeField:
+    def __init__(self, flame, RH, rtol=1e-3, floor=1.0, WaistLoc=0.75, N=50, max_refinements=10):
+        '''
+        Radiative heat flux of a flame tabulated on a grid for fast evaluation at many points
+
+        The logarithm of the flux (see Flame.Qrad_multi) is tabulated on a grid of spherical
+        coordinates around the center of the radiative sources - log-spaced in distance, with polar
+        angles on one side of the z = 0 plane, about which the flux is symmetric - and is interpolated
+        linearly.  Grid intervals are halved where the flux at the midpoints of the intervals or at the
+        centers of the grid cells is not interpolated within rtol.  Points near the flame, where the
+        flux varies too quickly to tabulate, are calculated directly, and points farther from the flame
+        than the distance beyond which the flux is below the floor are given zero flux without being
+        calculated.
+
+        Parameters
+        ----------
+        flame: Flame object
+            flame for which to calculate the heat flux
+        RH: float
+            relative humidity (0-1)
+        rtol: float
+            relative tolerance of the interpolated heat flux
+        floor: float
+            heat flux (W/m^2) below which the flux is taken as zero
+        WaistLoc, N:
+            see Flame.Qrad_multi
+        max_refinements: int
+            maximum number of times the grid is refined
+
+        Contents
+        --------
+        self.center: ndarray
+            (x, y, z) center (m) of the radiative sources
+        self.inner_distance: float
+            distance (m) from the center within which the flux is calculated directly
+        self.prune_distance: float
+            distance (m) from the center beyond which the flux is below the floor
+        self.axes: tuple of ndarrays
+            log distance from the center, polar angle from the z axis, and azimuthal angle of the grid
+        self.error: float
+            largest relative error of the interpolated flux at the interval midpoints and cell centers
+            of the final grid
+        '''
+        sources, weights = flame._radiative_sources(WaistLoc, N)
+        self.RH, self.rtol, self.floor = RH, rtol, floor
+        self._kernel_args = (sources, weights, flame.Srad, flame.ambient.T)
+
+        self.center = weights @ sources / np.sum(weights)
+        radius = np.max(np.linalg.norm(sources - self.center, axis=1))
+        self.inner_distance = 2 * radius
+        # the Wayne (1991) transmissivity is a quadratic in log10(L) with c2 < 0, so its maximum over
+        # all path lengths is c0 - c1^2/(4 c2) (about 1.07 at 288 K and 89% RH)
+        c0, c1, c2 = _transmissivity_coefficients(flame.ambient.T, RH)
+        max_transmissivity = float(c0 - c1 ** 2 / (4 * c2))
+        self.prune_distance = radius + np.sqrt(max_transmissivity * flame.Srad / (4 * const.pi * floor))
+        self.prune_distance = max(self.prune_distance, 1.01 * self.inner_distance)
+
+        axes = [np.linspace(np.log(self.inner_distance), np.log(self.prune_distance), 9),
+                np.linspace(0, const.pi / 2, 5),
+                np.linspace(-const.pi, const.pi, 17)]
+        log_flux = self._grid_log_flux(axes)
+
+        for _ in range(max_refinements):
+            refine = [np.zeros(len(axis) - 1, dtype=bool) for axis in axes]
+            self.error = 0
+            for i in range(3):
+                mid_axes = axes[:i] + [(axes[i][1:] + axes[i][:-1]) / 2] + axes[i + 1:]
+                exact = self._grid_log_flux(mid_axes)
+                interpolated = (np.delete(log_flux, -1, axis=i) + np.delete(log_flux, 0, axis=i)) / 2
+                error = np.abs(np.expm1(interpolated - exact))
+                self.error = max(self.error, np.max(error))
+                refine[i] |= np.moveaxis(error > rtol, i, 0).reshape(len(axes[i]) - 1, -1).any(axis=1)
+            center_axes = [(axis[1:] + axis[:-1]) / 2 for axis in axes]
+            exact = self._grid_log_flux(center_axes)
+            interpolated = interpolate.RegularGridInterpolator(axes, log_flux)(
+                np.stack(np.meshgrid(*center_axes, indexing='ij'), axis=-1))
+            error = np.abs(np.expm1(interpolated - exact))
+            self.error = max(self.error, np.max(error))
+            for i in range(3):
+                refine[i] |= np.moveaxis(error > rtol, i, 0).reshape(len(axes[i]) - 1, -1).any(axis=1)
+            if not any(np.any(r) for r in refine):
+                break
+            for i in range(3):
+                midpoints = (axes[i][1:] + axes[i][:-1]) / 2
+                axes[i] = np.sort(np.append(axes[i], midpoints[refine[i]]))
+            log_flux = self._grid_log_flux(axes)
+        else:
+            warnings.warn(f'Radiative field interpolation error ({self.error:.2g}) is above tolerance ({rtol:.2g})',
+                          category=PhysicsWarning)
+        self.axes = tuple(axes)
+        self._interpolator = interpolate.RegularGridInterpolator(self.axes, log_flux)
+
+    def _grid_log_flux(self, axes):
+        '''logarithm of the flux calculated at the points of a grid of (log distance, polar angle, azimuthal angle)'''
+        log_distance, polar, azimuth = np.meshgrid(*axes, indexing='ij')
+        distance = np.exp(log_distance)
+        x = self.center[0] + distance * np.sin(polar) * np.cos(azimuth)
+        y = self.center[1] + distance * np.sin(polar) * np.sin(azimuth)
+        z = distance * np.cos(polar)
+        sources, weights, Srad, T = self._kernel_args
+        kernel = RadiativeKernel(sources, weights, x, y, z, Srad, T, rtol=self.rtol / 10)
+        return np.log(kernel.flux(self.RH))
+
+    def flux(self, x, y, z):
+        '''
+        Calculates the heat flux at points
+
+        Parameters
+        ----------
+        x, y, z: float or array-like
+            coordinates (m), broadcast against each other
+
+        Returns
+        -------
+        flux: ndarray
+            heat flux (W/m^2) with the broadcast shape of x, y, and z
+        '''
+        x, y, z = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in (x, y, z)])
+        shape = x.shape
+        dx, dy, dz = x.ravel() - self.center[0], y.ravel() - self.center[1], np.abs(z.ravel())
+        distance = np.sqrt(dx ** 2 + dy ** 2 + dz ** 2)
+        flux = np.zeros(len(distance))
+        inner = distance < self.inner_distance
+        if np.any(inner):
+            sources, weights, Srad, T = self._kernel_args
+            kernel = RadiativeKernel(sources, weights, x.ravel()[inner], y.ravel()[inner], z.ravel()[inner], Srad, T)
+            flux[inner] = kernel.flux(self.RH)
+        tabulated = ~inner & (distance <= self.prune_distance)
+        points = np.stack([np.log(distance[tabulated]), np.arccos(dz[tabulated] / distance[tabulated]),
+                           np.arctan2(dy[tabulated], dx[tabulated])], axis=-1)
+        flux[tabulated] = np.exp(self._interpolator(points))
+        return flux.reshape(shape)
+
+
+def _source_moments(sources, weights, observers, chunk_size, dtype):
+    '''
+    Sums over sources of w / L^2 * log10(L)**k (k = 0, 1, 2) for each observer (see RadiativeKernel)
+    '''
+    moments = np.empty((3, len(observers)))
+    for start in range(0, len(observers), chunk_size):
+        obs = observers[start:start + chunk_size]
+        dist = sources[np.newaxis, :, :] - obs[:, np.newaxis, :]
+        L2 = np.einsum('ijk,ijk->ij', dist, dist)
+        view_factor = weights / L2
+        log_L = dtype.type(0.5) * np.log10(L2)
+        moments[0, start:start + chunk_size] = view_factor.sum(axis=1)
+        view_factor *= log_L
+        moments[1, start:start + chunk_size] = view_factor.sum(axis=1)
+        view_factor *= log_L
+        moments[2, start:start + chunk_size] = view_factor.sum(axis=1)
+    return moments
+
+
+def _source_tiers(sources, weights, observers, rtol, source_counts=(1, 2, 5, 10, 25)):
+    '''
+    Groups observers by the number of sources needed for their view factors to be within rtol
+
+    Consecutive sources are combined into a single source at their weighted center with their total
+    weight.  At the weighted center, the first-order error in 1/L^2 cancels, so the relative error for
+    an observer at distance d from the sources is at most about 3 (l / d)^2 for group extent l (the
+    largest distance of a source from the center of its group), and each observer uses the fewest
+    sources that meet rtol.
+
+    Returns
+    -------
+    list of (sources, weights, observer indices) tuples
+    '''
+    center = weights @ sources / np.sum(weights)
+    distance = np.linalg.norm(observers - center, axis=1) - np.max(np.linalg.norm(sources - center, axis=1))
+    assigned = np.zeros(len(observers), dtype=bool)
+    tiers = []
+    for count in source_counts:
+        if count >= len(sources):
+            break
+        groups = np.array_split(np.arange(len(sources)), count)
+        group_weights = np.array([np.sum(weights[group]) for group in groups], dtype=sources.dtype)
+        group_sources = np.array([weights[group] @ sources[group] / np.sum(weights[group]) for group in groups],
+                                 dtype=sources.dtype)
+        extent = max(np.max(np.linalg.norm(sources[group] - group_source, axis=1))
+                     for group, group_source in zip(groups, group_sources))
+        use = ~assigned & (distance > 0) & (3 * extent ** 2 <= rtol * np.maximum(distance, 0) ** 2)
+        if np.any(use):
+            tiers.append((group_sources, group_weights, np.nonzero(use)[0]))
+            assigned |= use
+    if not np.all(assigned):
+        tiers.append((sources, weights, np.nonzero(~assigned)[0]))
+    return tiers
+
+
+def _transmissivity_coefficients(ambient_temperature, relative_humidity, atmospheric_CO2_ppm=335):
+    '''
+    Coefficients (c0, c1, c2) of calc_transmissivity written as c0 + c1*log10(L) + c2*log10(L)**2
+    for path length L (m), broadcast over the given conditions
+    '''
+    ambient_temperature, relative_humidity, atmospheric_CO2_ppm = np.broadcast_arrays(
+        *[np.asarray(v, dtype=float) for v in (ambient_temperature, relative_humidity, atmospheric_CO2_ppm)])
+    sat_water_vap_pressure_mmHg = np.exp(20.386 - 5132 / ambient_temperature)
+    h = np.log10(relative_humidity * sat_water_vap_pressure_mmHg * 2.88651e2 / ambient_temperature)
+    c = np.log10(273. / ambient_temperature * atmospheric_CO2_ppm / 335.)
+    c0 = 1.006 - 0.01171 * h - 0.02368 * h ** 2 - 0.03188 * c + 0.001164 * c ** 2
+    c1 = -0.01171 - 2 * 0.02368 * h - 0.03188 + 2 * 0.001164 * c
+    c2 = -0.02368 + 0.001164
+    return c0, c1, c2
+
 
 def calc_transmissivity(path_length, ambient_temperature, relative_humidity, atmospheric_CO2_ppm=335):
     '''
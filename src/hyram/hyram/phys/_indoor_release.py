@@ -19,7 +19,7 @@ from scipy import interpolate
 from ._fuel_props import FuelProperties
 from ._comps import Fluid, Orifice
 from ._layer import LayeringJet
-from ._therm import Combustion
+from ._therm import get_combustion
 from ..utilities import misc_utils
 from ..utilities.custom_warnings import PhysicsWarning
 
@@ -130,7 +130,7 @@ class IndoorRelease:
                     mdots = mdots[:i]
         # Source fluid at ambient conditions
         gas = Fluid(species = source.fluid.species, T = ambient.T, P = ambient.P)
-        self.comb = Combustion(gas)
+        self.comb = get_combustion(gas)
         self.enclosure = enclosure
         
         if release_area is not None:
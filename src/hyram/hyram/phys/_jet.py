@@ -13,12 +13,18 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 import numpy as np
 from scipy import integrate, optimize
+from scipy.spatial import cKDTree
 import scipy.constants as const
 
 from ._fuel_props import FuelProperties
 from ._notional_nozzle import NotionalNozzle
+from ._utils import trajectory_jacobian
 from ..utilities.custom_warnings import PhysicsWarning
 
+
+# Gauss-Laguerre nodes and weights for radial integrals of Gaussian profiles, in terms of u = r^2/B^2
+_LAGUERRE_NODES, _LAGUERRE_WEIGHTS = np.polynomial.laguerre.laggauss(32)
+
 ########################################################################
 # TODO: untested for alternate fuels
 ########################################################################
@@ -30,10 +36,14 @@ class DevelopingFlow:
                  lam=1.16, betaA=0.28,
                  nn_conserve_momentum=True, nn_T='solve_energy', 
                  T_establish_min=-1,  
-                 suppressWarnings=False, verbose=False):
+                 suppressWarnings=False, verbose=False,
+                 release_cache=None):
         '''
         Engineering correlations to calculate the Gaussian profile boundary conditions for
         the flow through an orifice
+
+        If a ReleaseStateCache is given as release_cache, the throat and notional nozzle states
+        are taken from (or added to) the cache rather than being solved for this orifice.
         '''
         self.verbose = verbose
         S0 = 0 # S always starts at 0. x and y may start somewhere else.
@@ -43,7 +53,10 @@ class DevelopingFlow:
         self.orifice = orifice
         if self.verbose:
             print('solving for orifice flow... ', end='')
-        self.fluid_orifice = self.orifice.flow(fluid, ambient.P, mdot, suppressWarnings) # plug node at orifice exit
+        if release_cache is None:
+            self.fluid_orifice = self.orifice.flow(fluid, ambient.P, mdot, suppressWarnings) # plug node at orifice exit
+        else:
+            self.fluid_orifice = release_cache.throat(fluid, orifice, ambient.P, mdot, suppressWarnings)
         self.mass_flow_rate = self.orifice.mdot(self.fluid_orifice)
         if self.verbose:
             print('done')
@@ -52,7 +65,7 @@ class DevelopingFlow:
                                      1, self.fluid_orifice.T, theta0, x0, y0, S0)
 
         # Underexpanded jet (if needed: gets fluid to atmospheric pressure)
-        self.fluid_exp, self.orifice_exp = self._expand(orifice, ambient, nn_T, nn_conserve_momentum)
+        self.fluid_exp, self.orifice_exp = self._expand(orifice, ambient, nn_T, nn_conserve_momentum, release_cache)
  
         # Initial entrainment and heating (if needed: warms fluid to good T for thermodynamics)
         self.expanded_plug_node = self._dev_plug(self.fluid_exp, self.orifice_exp, ambient, Y0, theta0, x0, y0, S0, 
@@ -62,15 +75,18 @@ class DevelopingFlow:
 
         self.initial_node = self.expanded_plug_node.establish(ambient, self.fluid_exp, lam)
     
-    def _expand(self, orifice, ambient, nn_T, nn_conserve_momentum):
+    def _expand(self, orifice, ambient, nn_T, nn_conserve_momentum, release_cache=None):
         '''
         expands an underexpanded jet, if needed
         '''
         if self.fluid_orifice.P > ambient.P: # use notional nozzle model
             if self.verbose:
                 print('solving for notional nozzle... ', end='')
-            nn = NotionalNozzle(self.fluid_orifice, orifice, ambient)
-            g, o = nn.calculate(nn_T, nn_conserve_momentum)
+            if release_cache is None:
+                nn = NotionalNozzle(self.fluid_orifice, orifice, ambient)
+                g, o = nn.calculate(nn_T, nn_conserve_momentum)
+            else:
+                g, o = release_cache.expanded(self.fluid_orifice, orifice, ambient, nn_T, nn_conserve_momentum)
             if self.verbose:
                 print('done.')
         else:
@@ -205,11 +221,12 @@ class GaussianNode:
         return np.array([self.v_cl, self.B, self.rho_cl, self.Y_cl, self.theta, self.x, self.y])    
 
     def entrainment(self, Emom, rho_amb, alpha_buoy, alpha):
-        FrL = self.v_cl**2*self.rho_cl/(const.g*self.B*abs(rho_amb-self.rho_cl)) # ESH: added absolute value 07/23/20 - for negatively buoyant jets, this was a negative number - might need justification
+        # the absolute value and comparison are written so that the node can have complex values (see Jet._jacobian)
+        FrL = self.v_cl**2*self.rho_cl/(const.g*self.B*(rho_amb-self.rho_cl)*np.sign(np.real(rho_amb-self.rho_cl))) # ESH: added absolute value 07/23/20 - for negatively buoyant jets, this was a negative number - might need justification
         E_buoy = alpha_buoy/FrL*(2*const.pi*self.v_cl*self.B)*np.sin(self.theta)  # m**2/s
         E = Emom + E_buoy
         alphatest = E/(2*const.pi*self.v_cl*self.B)
-        if alphatest > alpha:
+        if np.real(alphatest) > alpha:
             E = alpha*2*const.pi*self.B*self.v_cl
         return E        
 
@@ -223,7 +240,8 @@ class Jet:
                  Ymin=7e-4, dS=None, Smax=np.inf, 
                  max_steps=5000, tol=1e-8,
                  alpha=0.082, Yamb=0, numB=5, numpts=500, 
-                 suppressWarnings=False, verbose=False):
+                 suppressWarnings=False, verbose=False,
+                 release_cache=None, integral_method='trapz', solver='dopri5', developing_flow=None):
         '''
         Class for solving for a 2D jet. 
         If fluid pressure is <= 2 x ambient pressure, use subsonic initialization (specify mdot).
@@ -284,6 +302,22 @@ class Jet:
             whether to display warnings about fluid being under-/over-specified in DevelopingFlow object
         verbose: boolean, optional
             whether to include print statements about the model actions
+        release_cache: ReleaseStateCache object, optional
+            cache of diameter-independent throat and notional nozzle states, shared between releases,
+            the developing flow of the release is also taken from (or added to) the cache
+        integral_method: string, optional
+            method for the radial integral in the energy equation, either 'trapz' (trapezoidal rule
+            on numpts points out to numB halfwidths) or 'quadrature' (Gauss-Laguerre quadrature
+            to infinity, independent of numB and numpts)
+        solver: string, optional
+            integrator, either 'dopri5' (scipy.integrate.ode, stepped in chunks of dS) or a method of
+            scipy.integrate.solve_ivp ('RK45', 'DOP853', or the implicit 'Radau', 'BDF', or 'LSODA',
+            which use the Jacobian of the governing equations (see _jacobian) and are suited to stiff
+            near-field segments). solve_ivp methods stop exactly at Ymin or Smax and keep a continuous
+            solution that can be evaluated at any S (see state)
+        developing_flow: DevelopingFlow object, optional
+            precomputed developing flow of the release (solved with the same lam and betaA),
+            if None, it is solved (or taken from release_cache)
         There are up to 4 engineering models that give initial conditions to an 
         integral model:
         1) flow through the orifice - choked if pressure above critical pressure, assumed
@@ -299,13 +333,24 @@ class Jet:
         '''
         self.verbose = verbose
                
-        self.developing_flow = DevelopingFlow(fluid, orifice, ambient, mdot,
-                                              theta0=theta0, x0=x0, y0=y0,
-                                              lam=lam, betaA=betaA,
-                                              nn_conserve_momentum=nn_conserve_momentum,nn_T=nn_T, 
-                                              T_establish_min=T_establish_min,  
-                                              suppressWarnings=suppressWarnings,
-                                              verbose=verbose)
+        if developing_flow is not None:
+            self.developing_flow = developing_flow
+        elif release_cache is not None:
+            self.developing_flow = release_cache.developing_flow(fluid, orifice, ambient, mdot,
+                                                                 theta0=theta0, x0=x0, y0=y0,
+                                                                 lam=lam, betaA=betaA,
+                                                                 nn_conserve_momentum=nn_conserve_momentum, nn_T=nn_T,
+                                                                 T_establish_min=T_establish_min,
+                                                                 suppressWarnings=suppressWarnings,
+                                                                 verbose=verbose)
+        else:
+            self.developing_flow = DevelopingFlow(fluid, orifice, ambient, mdot,
+                                                  theta0=theta0, x0=x0, y0=y0,
+                                                  lam=lam, betaA=betaA,
+                                                  nn_conserve_momentum=nn_conserve_momentum,nn_T=nn_T, 
+                                                  T_establish_min=T_establish_min,  
+                                                  suppressWarnings=suppressWarnings,
+                                                  verbose=verbose)
         self.initial_node = self.developing_flow.initial_node
         self.mass_flow_rate = self.developing_flow.mass_flow_rate
         
@@ -335,14 +380,19 @@ class Jet:
 
         
         # Integrate in the zone of established flow
-        self.solve(Ymin, dS, Smax, max_steps, tol, alpha, Yamb, numB, numpts)
+        self.solve(Ymin, dS, Smax, max_steps, tol, alpha, Yamb, numB, numpts, integral_method, solver)
     
     def solve(self, Ymin = 7e-4, dS = None, Smax = np.inf, 
               max_steps = 5000, tol = 1e-8,
-              alpha = 0.082, Yamb = 0, numB = 5, numpts = 500):
+              alpha = 0.082, Yamb = 0, numB = 5, numpts = 500, integral_method = 'trapz',
+              solver = 'dopri5'):
         '''
         solves (integrates) the model equations from the initial node out to limit
         '''
+        if integral_method not in ['trapz', 'quadrature']:
+            raise ValueError("integral_method must be 'trapz' or 'quadrature'")
+        if solver not in ['dopri5', 'RK45', 'DOP853', 'Radau', 'BDF', 'LSODA']:
+            raise ValueError("solver must be 'dopri5', 'RK45', 'DOP853', 'Radau', 'BDF', or 'LSODA'")
         if self.verbose:
             print('integrating... ', end='')
 
@@ -352,60 +402,116 @@ class Jet:
         elif dS is None:
             dS = Smax
 
-        r = integrate.ode(self._govEqns).set_f_params(alpha, Yamb, numB, numpts)
-        r.set_integrator('dopri5', atol = tol, rtol = tol)
-        
-        T, Y = [], []
-        def solout(t, y):
-            T.append(t)
-            Y.append(np.array(y))
-        r.set_solout(solout)
-        r.set_initial_value(self.initial_node.conditions, self.initial_node.S)
-        
-        i = 0
-        while r.successful() and r.y[3] > Ymin and i < max_steps and r.t < Smax:
-            r.integrate(r.t + dS)
-            i += 1
+        args = (alpha, Yamb, numB, numpts, integral_method)
+        if solver == 'dopri5':
+            r = integrate.ode(self._govEqns).set_f_params(*args)
+            r.set_integrator('dopri5', atol = tol, rtol = tol)
+            
+            T, Y = [], []
+            def solout(t, y):
+                T.append(t)
+                Y.append(np.array(y))
+            r.set_solout(solout)
+            r.set_initial_value(self.initial_node.conditions, self.initial_node.S)
+            
+            i = 0
+            while r.successful() and r.y[3] > Ymin and i < max_steps and r.t < Smax:
+                r.integrate(r.t + dS)
+                i += 1
+            self._dense_solution = None
+        else:
+            # integrates (at most) as far as dopri5 would, stopping at Ymin or Smax
+            S0 = self.initial_node.S
+            Send = min(Smax, S0 + max_steps*dS)
+            def Ymin_event(S, ind_vars, *args):
+                return ind_vars[3] - Ymin
+            Ymin_event.terminal, Ymin_event.direction = True, -1
+            options = {} if solver in ['RK45', 'DOP853'] else {'jac': self._jacobian}
+            sol = integrate.solve_ivp(self._govEqns, [S0, Send], self.initial_node.conditions, method = solver,
+                                      args = args, atol = tol, rtol = tol,
+                                      events = Ymin_event, dense_output = True, **options)
+            if not sol.success:
+                warnings.warn('Jet integration stopped: {}'.format(sol.message), category = PhysicsWarning)
+            T, Y = sol.t, sol.y.T
+            self._dense_solution = sol.sol
             
         Y = np.array(Y)
         
         for key, val in zip(['V_cl', 'B', 'rho_cl', 'Y_cl', 'theta', 'x', 'y'], Y.T):
             self.__dict__[key] = val
         self.__dict__['S'] = np.array(T)
+        self._streamline_index = None
 
-        MW_fluid, MW_air = self.fluid.therm.MW, self.ambient.therm.MW
-        MW_cl  = MW_air*MW_fluid/(self.Y_cl*(MW_air-MW_fluid) + MW_fluid)
-        self.X_cl = self.Y_cl*MW_cl/MW_fluid
-        self.T_cl = self.ambient.P*MW_cl/(const.R*self.rho_cl)
+        self.X_cl, self.T_cl = self._X_T_cl(self.Y_cl, self.rho_cl)
         
         if self.verbose:
             print('done.')
 
         return self
     
-    def _govEqns(self, S, ind_vars, alpha = 0.082, Yamb = 0, numB = 5, numpts = 500):
+    def _X_T_cl(self, Y_cl, rho_cl):
+        '''centerline mole fraction and temperature (K) from the centerline mass fraction and density'''
+        MW_fluid, MW_air = self.fluid.therm.MW, self.ambient.therm.MW
+        MW_cl  = MW_air*MW_fluid/(Y_cl*(MW_air-MW_fluid) + MW_fluid)
+        return Y_cl*MW_cl/MW_fluid, self.ambient.P*MW_cl/(const.R*rho_cl)
+
+    def state(self, S):
+        '''
+        Centerline state of the jet at distance(s) along the centerline, limited to the solved range.
+        Uses the continuous solution if the jet was solved with solve_ivp (any solver other than
+        'dopri5'), otherwise interpolates linearly between solution steps.
+
+        Parameters
+        ----------
+        S: float or ndarray
+            distance along the centerline (m)
+
+        Returns
+        -------
+        dictionary of V_cl, B, rho_cl, Y_cl, theta, x, y, X_cl, and T_cl at S
+        '''
+        S = np.clip(np.asarray(S, dtype = float), self.S[0], self.S[-1])
+        keys = ['V_cl', 'B', 'rho_cl', 'Y_cl', 'theta', 'x', 'y']
+        if getattr(self, '_dense_solution', None) is not None:
+            res = dict(zip(keys, self._dense_solution(S)))
+        else:
+            res = dict([[k, np.interp(S, self.S, self.__dict__[k])] for k in keys])
+        res['X_cl'], res['T_cl'] = self._X_T_cl(res['Y_cl'], res['rho_cl'])
+        return res
+
+    def _govEqns(self, S, ind_vars, alpha = 0.082, Yamb = 0, numB = 5, numpts = 500, integral_method = 'trapz'):
         '''
         Governing equations for a plume, written in terms of d/dS of (V_cl, B, rho_cl, Y_cl, 
         theta, x, and y).
         
         A matrix solution to the continuity, x-momentum, y-momentum, species, and energy 
         equations solves for d/dS of the dependent variables V_cl, B, rho_cl, Y_cl,  and Theta.  
-        Numerically integrated to infinity = numB * B(S) using numpts discrete points.
+        Numerically integrated to infinity = numB * B(S) using numpts discrete points, or
+        using Gauss-Laguerre quadrature if integral_method is 'quadrature' (see _integrals and _system).
         '''
-        # break independent variables out of ind_vars, then put them into node_in
         [V_cl, B, rho_cl, Y_cl, theta, x, y] = ind_vars
-        node_in = GaussianNode(B, V_cl, rho_cl, Y_cl, theta, S = S)
+        I = self._integrals(np.array([ind_vars], dtype = float), alpha, Yamb, numB, numpts, integral_method)[0]
+        LHS, RHS = self._system(S, ind_vars, I, alpha, Yamb, numB, numpts, integral_method)
+        dz = np.append(np.linalg.solve(LHS,RHS), np.array([np.cos(theta), np.sin(theta)]), axis = 0)
         
-        # pull some parameters out of objects so their definition isn't so long
+        return dz
+
+    def _integrals(self, states, alpha = 0.082, Yamb = 0, numB = 5, numpts = 500, integral_method = 'trapz'):
+        '''
+        Radial integral in the energy equation, 2*pi*int_0^inf (V*d(rho*h)/dS + rho*h*dV/dS)*r*dr,
+        for d/dS of (V_cl, B, rho_cl, Y_cl, theta), for an array of states, each a row of
+        (V_cl, B, rho_cl, Y_cl, theta, x, y). The integral does not depend on theta, x, or y.
+        '''
+        if integral_method == 'quadrature':
+            return self._energy_integral(states[:, 1], states[:, 0], states[:, 2], states[:, 3]).T
+        V_cl, B, rho_cl, Y_cl = [states[:, [k]] for k in range(4)]
         rho_amb, MW_air, MW_fluid = self.ambient.rho, self.ambient.therm.MW, self.fluid.therm.MW
         lam = self.lam
         Pamb = self.ambient.P
-        h_amb0, Cp_fluid, Cp_air = self._h_amb0, self._Cp_fluid, self._Cp_air
-        h_amb0 = Cp_air * self.ambient.T
-        E = node_in.entrainment(self._Emom, rho_amb, self._alpha_buoy, alpha = alpha)
-        
+        Cp_fluid, Cp_air = self._Cp_fluid, self._Cp_air
         # some stuff needed to integrate to infinity (numB*B):
-        r = np.append(np.array([0]), np.logspace(-5, np.log10(numB*max(B, 1e-99)), numpts))
+        r = np.zeros((len(states), numpts + 1))
+        r[:, 1:] = np.logspace(-5, np.log10(numB*np.maximum(B[:, 0], 1e-99)), numpts, axis = -1)
         zero = np.zeros_like(r)
         V       = V_cl*np.exp(-(r**2)/(B**2))
         dVdS = np.array([V/V_cl,                                                 #d/dS(V_cl)
@@ -444,12 +550,29 @@ class Jet:
         # d_h_fluid_dT = self._dh_fluid_dT(T)
         # h = Y*h_fluid - Y*h_amb + h_amb
         # dhdS = (h_fluid - h_amb)*dYdS + Y*(d_h_fluid_dT - d_h_amb_dT)*dTdS + d_h_amb_dT*dTdS
-        
+
         # rhoh = rho*h
         # drhohdS = h*drhodS + rho*dhdS
         # #########################################################
+        return 2*const.pi*integrate.trapz(V*drhohdS*r + rhoh*dVdS*r, r).T
+
+    def _system(self, S, ind_vars, integrals, alpha = 0.082, Yamb = 0, numB = 5, numpts = 500,
+                integral_method = 'trapz'):
+        '''
+        Left-hand side (matrix) and right-hand side of the continuity, x-momentum, y-momentum, species, and
+        energy equations for d/dS of (V_cl, B, rho_cl, Y_cl, theta), from the radial integral in the energy
+        equation of the state (see _integrals). Also evaluated with complex values (see _jacobian).
+        '''
+        [V_cl, B, rho_cl, Y_cl, theta, x, y] = ind_vars
+        node_in = GaussianNode(B, V_cl, rho_cl, Y_cl, theta, S = S)
         
-        
+        # pull some parameters out of objects so their definition isn't so long
+        rho_amb = self.ambient.rho
+        lam = self.lam
+        Cp_air = self._Cp_air
+        h_amb0 = Cp_air * self.ambient.T
+        E = node_in.entrainment(self._Emom, rho_amb, self._alpha_buoy, alpha = alpha)
+
         # governing equations:
         LHScont = np.array([(lam**2*rho_cl + rho_amb)*B**2,                        #d/dS(V_cl)
                             2*(lam**2*rho_cl + rho_amb)*B*V_cl,                    #d/dS(B)
@@ -482,12 +605,11 @@ class Jet:
                             ])*const.pi*lam**2*B/(lam**2 + 1)                
         RHSspec = Yamb*RHScont
         
-        LHSener = 2*const.pi*integrate.trapz(V*drhohdS*r + rhoh*dVdS*r, r)
-        LHSener += [const.pi/(6*lam**2 + 2)*(3*lam**2*rho_cl+rho_amb)*B**2*V_cl**2, #d/dS(V_cl)
+        LHSener = integrals + np.array([const.pi/(6*lam**2 + 2)*(3*lam**2*rho_cl+rho_amb)*B**2*V_cl**2, #d/dS(V_cl)
                     const.pi/(9*lam**2 + 3)*(3*lam**2*rho_cl+rho_amb)*V_cl**3*B,    #d/dS(B)
                     const.pi/(6*lam**2 + 2)*lam**2*B**2*V_cl**3,                    #d/dS(rho_cl)
                     0,                                                             #d/dS(Y_cl)
-                    0]                                                             #d/dS(theta)
+                    0])                                                            #d/dS(theta)
         
         RHSener = h_amb0*RHScont
         
@@ -503,15 +625,56 @@ class Jet:
                         RHSspec,
                         RHSener])
         
-        dz = np.append(np.linalg.solve(LHS,RHS), np.array([np.cos(theta), np.sin(theta)]), axis = 0)
-        
-        return dz
+        return LHS, RHS
     
+    def _jacobian(self, S, ind_vars, alpha = 0.082, Yamb = 0, numB = 5, numpts = 500, integral_method = 'trapz'):
+        '''
+        Jacobian of the governing equations (see _govEqns) with respect to (V_cl, B, rho_cl, Y_cl, 
+        theta, x, and y). The radial integral in the energy equation (which depends on V_cl, B, rho_cl,
+        and Y_cl) is differenced in a single evaluation, the rest of the equations are differentiated
+        by complex steps (see trajectory_jacobian).
+        '''
+        return trajectory_jacobian(self._integrals, self._system, S, ind_vars, [0, 1, 2, 3], 4,
+                                   alpha, Yamb, numB, numpts, integral_method)
+
+    def _energy_integral(self, B, V_cl, rho_cl, Y_cl):
+        '''
+        Radial integral in the energy equation, 2*pi*int_0^inf (V*d(rho*h)/dS + rho*h*dV/dS)*r*dr,
+        for d/dS of (V_cl, B, rho_cl, Y_cl, theta), with shape (5,) + the shape of the inputs.
+
+        With u = r^2/B^2, V = V_cl*exp(-u), so the integrand is exp(-u) times a smooth function of u,
+        which is integrated using Gauss-Laguerre quadrature. Terms with Y^2*exp(u/lam^2) are written
+        as Y*Y_cl*rho_cl/rho so that they do not overflow far from the centerline.
+        '''
+        rho_amb, MW_air, MW_fluid = self.ambient.rho, self.ambient.therm.MW, self.fluid.therm.MW
+        lam, Pamb, Cp_fluid, Cp_air = self.lam, self.ambient.P, self._Cp_fluid, self._Cp_air
+        u, w = _LAGUERRE_NODES, _LAGUERRE_WEIGHTS
+        B_r, V_cl, rho_cl, Y_cl = [np.asarray(v, dtype = float)[..., None] for v in (B, V_cl, rho_cl, Y_cl)]
+        exp_u = np.exp(-u/lam**2)
+        rho     = (rho_cl - rho_amb)*exp_u + rho_amb
+        Y       = Y_cl*rho_cl*exp_u/rho
+        dYdS    = np.zeros((5,) + Y.shape)
+        dYdS[1] = 2*Y*rho_amb*u/(lam**2*B_r*rho)                 #d/dS(B)
+        dYdS[2] = -Y*rho_amb*np.expm1(-u/lam**2)/(rho_cl*rho)    #d/dS(rho_cl)
+        dYdS[3] = Y/Y_cl                                         #d/dS(Y_cl)
+        MW      = MW_air*MW_fluid/(Y*(MW_air - MW_fluid) + MW_fluid)
+        dMWdS   = (MW*(MW_air - MW_fluid)/(MW_fluid*(Y-1) - MW_air*Y))*dYdS
+        Cp      = Y*(Cp_fluid - Cp_air) + Cp_air
+        dCpdS   = (Cp_fluid - Cp_air)*dYdS
+        rhoh    = Pamb/const.R*MW*Cp
+        drhohdS = Pamb/const.R*(MW*dCpdS + Cp*dMWdS)
+        dVdS    = np.zeros((5,) + Y.shape)                       # dV/dS divided by exp(-u)
+        dVdS[0] = 1                                              #d/dS(V_cl)
+        dVdS[1] = 2*V_cl*u/B_r                                   #d/dS(B)
+        return const.pi*B**2*np.dot(V_cl*drhohdS + rhoh*dVdS, w)
+
     def reshape(self, enclosure, showPlot = False):
         '''
         reshapes the plume to turn upwards, should it hit the enclosure wall, 
         and crops it so it stops at the ceiling
         '''
+        self._dense_solution = None  # no longer matches the reshaped plume
+        self._streamline_index = None
         if np.any(self.x > enclosure.Xwall):
             iwall = np.argmax(self.x > enclosure.Xwall)
             for k in ['S', 'rho_cl', 'V_cl', 'Y_cl', 'B', 'theta', 'y', 'x']:
@@ -530,7 +693,7 @@ class Jet:
             plt.plot(self.x,self.y)
         return self
 
-    def m_flammable(self, X_lean=None, X_rich=None, Hmax=np.inf):
+    def m_flammable(self, X_lean=None, X_rich=None, Hmax=np.inf, method='closed_form'):
         '''
         Calculates the amount of mass in the plume
         that is within the flammability limits
@@ -548,6 +711,10 @@ class Jet:
         Hmax : float, optional
             Maximum height for integration
             Default is infinity (np.inf)
+        method : string, optional
+            'closed_form' (default) finds the flammable radii at all nodes at once and integrates the
+            mass per length analytically, 'reference' uses root finding and numerical integration at
+            each node
         
         Outputs
         -------
@@ -589,6 +756,16 @@ class Jet:
         ivals = slice(np.argmax(Y_cl <= Yrich), np.argmax(Y_cl <= Ylean))
 
         Y_cl, B, rho_cl, S = [np.append(np.append(np.interp(Srich, S, var), var[ivals]), np.interp(Slean, S, var)) for var in [Y_cl, B, rho_cl, S]]
+        if method == 'closed_form':
+            r_lean = self._flammable_radius(Ylean, Y_cl, B, rho_cl)
+            r_rich = self._flammable_radius(Yrich, Y_cl, B, rho_cl)
+            # rho*Y = rho_cl*Y_cl*exp(-r**2/(lam*B)**2), which integrates analytically over the flammable annulus
+            lamB2 = (self.lam*B)**2
+            mass_per_len = const.pi*lamB2*rho_cl*Y_cl*(np.exp(-r_rich**2/lamB2) - np.exp(-r_lean**2/lamB2))
+            return integrate.trapz(mass_per_len, S)
+        elif method != 'reference':
+            raise ValueError("method must be 'closed_form' or 'reference'")
+
         # radius of flammable concentration at each node:
         r_lean = np.array([0 if rhoY(0, i)[1] <= Ylean else 
                            optimize.brentq(lambda r: rhoY(r, i)[1] - Ylean, 0, 100*B[i])
@@ -603,6 +780,39 @@ class Jet:
         # integrate to find the total mass
         return integrate.trapz(mass_per_len, S)
     
+    def _flammable_radius(self, Y_target, Y_cl, B, rho_cl, xtol=1e-12, maxiter=50):
+        '''
+        Radius (m) at which the mass fraction falls to Y_target at each node (0 where the centerline
+        mass fraction is not above Y_target), with the same density profile as m_flammable.
+
+        With s = r**2/(lam*B)**2, the mass fraction equals Y_target where
+        rho_cl*Y_cl*exp(-s) = Y_target*((rho_cl - rho_amb)*exp(-lam*s) + rho_amb).
+        The density exponent (lam*s) differs from that of rho*Y (s), so this has no closed-form solution for
+        non-integer lam. Starting from the closed form for equal exponents (as in iso_contour),
+        it is solved for all nodes at once with Newton iterations, safeguarded by bisection within [0, (100/lam)**2].
+        '''
+        rho_amb, lam = self.ambient.rho, self.lam
+        inside = Y_cl > Y_target
+        rhoY_cl, drho = (rho_cl*Y_cl)[inside], (rho_cl - rho_amb)[inside]
+        lo, hi = np.zeros_like(rhoY_cl), np.full_like(rhoY_cl, (100/lam)**2)
+        s = np.clip(-np.log(Y_target*rho_amb/(rhoY_cl - Y_target*drho)), lo, hi)
+        for _ in range(maxiter):
+            F = rhoY_cl*np.exp(-s) - Y_target*(drho*np.exp(-lam*s) + rho_amb)
+            lo = np.where(F > 0, s, lo)
+            hi = np.where(F < 0, s, hi)
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                step = F/(-rhoY_cl*np.exp(-s) + lam*Y_target*drho*np.exp(-lam*s))
+            converged = (F == 0) | (np.abs(step) <= xtol*np.maximum(s, 1))
+            s_new = np.where(converged, s, s - step)
+            bisect = ~converged & (~np.isfinite(s_new) | (s_new <= lo) | (s_new >= hi))
+            s_new[bisect] = 0.5*(lo[bisect] + hi[bisect])
+            s = s_new
+            if np.all(converged):
+                break
+        r = np.zeros_like(B)
+        r[inside] = lam*B[inside]*np.sqrt(s)
+        return r
+
     @property
     def _contourdata(self):
         """
@@ -650,6 +860,150 @@ class Jet:
         y = self.y[iS] - r*np.cos(self.theta[iS])
         return x, y, X, Y, v, T
     
+    def _centerline_index(self, num_samples = 400):
+        '''
+        Builds a spatial index of points along the jet centerline: the nodes, and points dividing
+        the longer segments so that neighboring points are no further apart than the length of the
+        centerline divided by num_samples (dopri5 steps can be very uneven)
+
+        Returns
+        -------
+        tuple of (cKDTree of the points, segment index of each point, maximum spacing between the points (m))
+        '''
+        dx, dy = np.diff(self.x), np.diff(self.y)
+        seg_len = np.sqrt(dx**2 + dy**2)
+        spacing = max(seg_len.sum()/num_samples, np.finfo(float).tiny)
+        pieces = np.maximum(np.ceil(seg_len/spacing).astype(int), 1)
+        iseg = np.repeat(np.arange(len(dx)), pieces)
+        frac = (np.arange(len(iseg)) - np.repeat(np.cumsum(pieces) - pieces, pieces))/pieces[iseg]
+        points = np.column_stack((np.append(self.x[iseg] + frac*dx[iseg], self.x[-1]),
+                                  np.append(self.y[iseg] + frac*dy[iseg], self.y[-1])))
+        iseg = np.append(iseg, len(dx) - 1)
+        return cKDTree(points), iseg, (seg_len/pieces).max()
+
+    def _project(self, points, k = 4, block_size = 2**22):
+        '''
+        Projects points onto the (piecewise linear) jet centerline
+
+        The segments containing the k nearest indexed centerline points (see _centerline_index),
+        and the segments before them, are searched first. A segment with none of its points among
+        the k nearest is no closer to a point than sqrt(d_k**2 - h**2/4), where d_k is the distance to the
+        k-th nearest indexed point and h is the maximum spacing of the indexed points, so the search is
+        widened (up to all of the segments) for points where the nearest segment found is not closer than that.
+
+        Parameters
+        ----------
+        points: ndarray
+            array of shape (n, 2) of x, y coordinates (m)
+        k: int
+            number of nearest indexed centerline points whose segments are searched first
+        block_size: int
+            maximum number of point-segment pairs evaluated at once
+
+        Returns
+        -------
+        tuple of (segment index, fraction along segment, squared distance to the centerline (m^2)) for each point
+        '''
+        if getattr(self, '_streamline_index', None) is None:
+            self._streamline_index = self._centerline_index()
+        tree, labels, spacing = self._streamline_index
+        x0, y0 = self.x[:-1], self.y[:-1]
+        dx, dy = np.diff(self.x), np.diff(self.y)
+        len2 = dx**2 + dy**2
+        iseg_best, t_best, d2_best = (np.zeros(len(points), dtype = int), np.zeros(len(points)),
+                                      np.zeros(len(points)))
+        todo = np.arange(len(points))
+        while len(todo):
+            k = min(k, tree.n)
+            certified = np.zeros(len(todo), dtype = bool)
+            step = max(1, block_size//(2*k))
+            for start in range(0, len(todo), step):
+                block = todo[start:start + step]
+                dist, inear = tree.query(points[block], k = k)
+                dist, inear = [np.reshape(a, (len(block), -1)) for a in (dist, inear)]
+                # candidate segments (the first point of a segment is also the end of the previous segment)
+                iseg = np.clip(np.concatenate((labels[inear] - 1, labels[inear]), axis = 1), 0, len(x0) - 1)
+                px, py = points[block, :1] - x0[iseg], points[block, 1:2] - y0[iseg]
+                sx, sy, sl2 = dx[iseg], dy[iseg], len2[iseg]
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    t = np.clip(np.nan_to_num((px*sx + py*sy)/sl2), 0, 1)
+                d2 = (px - t*sx)**2 + (py - t*sy)**2
+                best = np.argmin(d2, axis = 1)
+                rows = np.arange(len(block))
+                iseg_best[block], t_best[block], d2_best[block] = iseg[rows, best], t[rows, best], d2[rows, best]
+                certified[start:start + step] = ((k == tree.n) | (d2[rows, best] <= dist[:, -1]**2 - spacing**2/4))
+            todo = todo[~certified]
+            k *= 4
+        return iseg_best, t_best, d2_best
+
+    def _field_at(self, points, ind_var, chunk_size = 2**16):
+        '''
+        Evaluates the Gaussian profiles at points, see concentration_at and velocity_at
+        '''
+        points = np.asarray(points, dtype = float)
+        if points.shape[-1] not in [2, 3]:
+            raise ValueError('points must have 2 (x, y) or 3 (x, y, z) coordinates')
+        shape = points.shape[:-1]
+        points = np.reshape(points, (-1, points.shape[-1]))
+        rho_amb = self.ambient.rho
+        MW_fluid, MW_air = self.fluid.therm.MW, self.ambient.therm.MW
+        values = np.empty(len(points))
+        for i in range(0, len(points), chunk_size):
+            chunk = points[i:i + chunk_size]
+            iseg, t, r2 = self._project(chunk[:, :2])
+            if chunk.shape[1] == 3:
+                r2 = r2 + chunk[:, 2]**2
+            B, rho_cl, Y_cl, V_cl = [var[iseg] + t*(var[iseg + 1] - var[iseg])
+                                     for var in [self.B, self.rho_cl, self.Y_cl, self.V_cl]]
+            if ind_var == 'v':
+                values[i:i + chunk_size] = V_cl*np.exp(-r2/B**2)
+            else:
+                rho = rho_amb + (rho_cl - rho_amb)*np.exp(-r2/self.lam**2/B**2)
+                Y   = Y_cl*rho_cl*np.exp(-r2/((self.lam*B)**2))/rho
+                MW  = MW_air*MW_fluid/(Y*(MW_air-MW_fluid) + MW_fluid)
+                values[i:i + chunk_size] = Y if ind_var == 'Y' else Y*MW/MW_fluid
+        return np.reshape(values, shape)
+
+    def concentration_at(self, points, mass_fraction = False, chunk_size = 2**16):
+        '''
+        Concentration of the jet fluid at points, found by projecting each point onto the jet centerline
+        (using a spatial index of the centerline nodes, built once per solution) and evaluating the
+        Gaussian profiles at the distance from the centerline. Points beyond either end of the jet use
+        the profile at that end.
+
+        Parameters
+        ----------
+        points: array_like
+            array of shape (..., 2) of (x, y) or (..., 3) of (x, y, z) coordinates (m), where z is
+            perpendicular to the plane of the jet
+        mass_fraction: boolean, optional
+            whether to return mass fractions rather than mole fractions
+        chunk_size: int, optional
+            number of points evaluated at once (limits memory use)
+
+        Returns
+        -------
+        ndarray of mole (or mass) fractions of shape points.shape[:-1]
+        '''
+        return self._field_at(points, 'Y' if mass_fraction else 'X', chunk_size)
+
+    def velocity_at(self, points, chunk_size = 2**16):
+        '''
+        Velocity (m/s) of the jet at points (see concentration_at)
+
+        Parameters
+        ----------
+        points: array_like
+            array of shape (..., 2) of (x, y) or (..., 3) of (x, y, z) coordinates (m)
+        chunk_size: int, optional
+            number of points evaluated at once (limits memory use)
+
+        Returns
+        -------
+        ndarray of velocities (m/s) of shape points.shape[:-1]
+        '''
+        return self._field_at(points, 'v', chunk_size)
+
     def _radial_profile(self, distance, ind_var = 'Y', nB = 3):
         '''
         returns radial profile at a certain distance along the jet
@@ -936,6 +1290,53 @@ class Jet:
             ax.set_aspect(aspect)
         return plt.gcf()
     
+    def iso_contour(self, X = 0.04):
+        '''
+        Mole fraction contour(s) of the jet in the x-y plane, calculated directly from the centerline.
+        With the Gaussian profiles, the radius at which the mole fraction equals X at a node is
+        r = lam*B*sqrt(-ln(g)), where g = Y*rho_amb/(Y_cl*rho_cl - Y*(rho_cl - rho_amb)) and Y is the mass fraction at X.
+
+        Parameters
+        ----------
+        X: float or array_like
+            mole fraction(s) of the contour(s)
+
+        Returns
+        -------
+        dictionary (or list of dictionaries, if X is array_like) containing:
+            X: mole fraction of the contour
+            x, y: ndarrays of the vertices of the closed contour polygon (m), empty if the centerline
+                  mole fraction is never above X
+            S: streamline distance (m) to the end of the contour on the centerline
+            x_min, x_max, y_min, y_max: extents of the contour (m), nan if there is no contour
+        '''
+        Xvals = np.atleast_1d(np.asarray(X, dtype = float))
+        MW_fluid, MW_air = self.fluid.therm.MW, self.ambient.therm.MW
+        rho_amb = self.ambient.rho
+        Yvals = (Xvals*MW_fluid/(Xvals*MW_fluid + (1 - Xvals)*MW_air))[:, None]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            g = Yvals*rho_amb/(self.Y_cl*self.rho_cl - Yvals*(self.rho_cl - rho_amb))
+            r = np.where(self.Y_cl > Yvals, self.lam*self.B*np.sqrt(-np.log(g)), 0)
+        sin, cos = np.sin(self.theta), np.cos(self.theta)
+        contours = []
+        for Xval, Y, ri in zip(Xvals, Yvals[:, 0], r):
+            n = np.argmax(self.Y_cl <= Y) if np.any(self.Y_cl <= Y) else len(self.S)
+            if n == 0:
+                contours.append({'X': Xval, 'x': np.array([]), 'y': np.array([]), 'S': self.S[0],
+                                 'x_min': np.nan, 'x_max': np.nan, 'y_min': np.nan, 'y_max': np.nan})
+                continue
+            if n < len(self.S):
+                # end of the contour, where the centerline mass fraction falls to Y
+                tip = [np.interp(Y, self.Y_cl[[n, n - 1]], var[[n, n - 1]]) for var in [self.S, self.x, self.y]]
+            else:
+                tip = [self.S[-1], self.x[-1], self.y[-1]]
+            x = np.concatenate((self.x[:n] + ri[:n]*sin[:n], [tip[1]], (self.x[:n] - ri[:n]*sin[:n])[::-1]))
+            y = np.concatenate((self.y[:n] - ri[:n]*cos[:n], [tip[2]], (self.y[:n] + ri[:n]*cos[:n])[::-1]))
+            x, y = np.append(x, x[0]), np.append(y, y[0])
+            contours.append({'X': Xval, 'x': x, 'y': y, 'S': tip[0],
+                             'x_min': x.min(), 'x_max': x.max(), 'y_min': y.min(), 'y_max': y.max()})
+        return contours[0] if np.ndim(X) == 0 else contours
+
     def streamline_distance_to_mole_fraction(self, X = 0.08):
         '''
         returns the streamline distance to a given mole fraction
@@ -8,6 +8,7 @@ If not, see https://www.gnu.org/licenses/.
 
 import copy
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import matplotlib.pyplot as plt
 from mpl_toolkits.axes_grid1 import ImageGrid
@@ -22,7 +23,9 @@ def plot_sliced_contour(contours, xlims, ylims, zlims, nx, ny, nz,
                         savefig=False,
                         directory=os.getcwd(),
                         filename='sliced_contour_plot.png',
-                        *args, **kwargs):
+                        *args, fields=None, return_fields=False,
+                        max_workers=None, executor=None, tile_size=4096,
+                        progressive=False, **kwargs):
     '''
     Get grid location values for use in sliced contour plot
 
@@ -72,64 +75,107 @@ def plot_sliced_contour(contours, xlims, ylims, zlims, nx, ny, nz,
     filename : string (optional)
         file name to write
     *args : positional arguments (optional)
-        if provided, passed to distance_func
+        if provided, passed to distance_func and value_func
+    fields : dict (optional)
+        fields returned by a previous call (see return_fields) to plot
+        without calculating any values; limits given in xlims, ylims, and zlims
+        are then only used as the plot limits
+    return_fields : Boolean (optional)
+        whether to also return the calculated fields
+    max_workers : int (optional)
+        if greater than 1 (and no executor is given), number of threads over which
+        tiles of the slices are evaluated
+    executor : concurrent.futures.Executor (optional)
+        executor (thread or process pool) on which tiles of the slices are evaluated;
+        a process pool requires value_func and its arguments to be picklable
+    tile_size : int (optional)
+        number of points in each tile of the slices passed to value_func
+    progressive : Boolean (optional)
+        if True, values are first calculated on a grid coarser by a factor of 4 (and at the
+        center of each coarse cell), and then only in (and next to) the coarse cells in which
+        these values show that a contour level is crossed; values in the other cells are
+        interpolated between the coarse values. This is a heuristic: a contour that crosses
+        a cell, and its neighbors, without passing between any of the sampled values is missed
     **kwargs : keyword arguments, optional
-        if provided, passed to distance_func
+        if provided, passed to distance_func and value_func
 
     Returns
     -------
     fig_or_filepath: matplotlib.pyplot.Figure object or string
         If savefig is True, returns filename of the corresponding plot.
         If savefig is false, returns fig object.
+    fields: dict
+        only if return_fields is True, dictionary of the slice location ('slice_xyz')
+        and the (horizontal coordinates, vertical coordinates, values) of each slice
+        ('xy', 'xz', and 'zy'), in the units of value_func
     '''
-    furthest_contour = contours[0] * 1000  # convert from kilo
-    default_scaling = 1.1  # default scaling is 10% past furthest contour
+    if fields is None:
+        furthest_contour = contours[0] * 1000  # convert from kilo
+        default_scaling = 1.1  # default scaling is 10% past furthest contour
 
-    if xlims is None:
-        pos_x_distance_to_contour = distance_func(furthest_contour,
-                                                  direction='x',
+        if xlims is None:
+            pos_x_distance_to_contour = distance_func(furthest_contour,
+                                                      direction='x',
+                                                      *args, **kwargs)
+            neg_x_distance_to_contour = distance_func(furthest_contour,
+                                                      direction='x',
+                                                      negative_direction=True,
+                                                      *args, **kwargs)
+            padded_pos_x_distance = default_scaling * pos_x_distance_to_contour
+            padded_neg_x_distance = default_scaling * neg_x_distance_to_contour
+            dx = (padded_pos_x_distance - padded_neg_x_distance) / nx
+            x0 = slice(padded_neg_x_distance, padded_pos_x_distance, dx)
+        else:
+            dx = (xlims[1] - xlims[0]) / nx
+            x0 = slice(xlims[0], xlims[1], dx)
+
+        if ylims is None:
+            y_distance_to_contour = distance_func(furthest_contour,
+                                                  direction='y',
                                                   *args, **kwargs)
-        neg_x_distance_to_contour = distance_func(furthest_contour,
-                                                  direction='x',
-                                                  negative_direction=True,
+            padded_y_distance = default_scaling * y_distance_to_contour
+            dy = padded_y_distance / ny
+            y0 = slice(0, padded_y_distance, dy)
+        else:
+            dy = (ylims[1] - ylims[0]) / ny
+            y0 = slice(ylims[0], ylims[1], dy)
+
+        if zlims is None:
+            z_distance_to_contour = distance_func(furthest_contour,
+                                                  direction='z',
                                                   *args, **kwargs)
-        padded_pos_x_distance = default_scaling * pos_x_distance_to_contour
-        padded_neg_x_distance = default_scaling * neg_x_distance_to_contour
-        dx = (padded_pos_x_distance - padded_neg_x_distance) / nx
-        x0 = slice(padded_neg_x_distance, padded_pos_x_distance, dx)
-    else:
-        dx = (xlims[1] - xlims[0]) / nx
-        x0 = slice(xlims[0], xlims[1], dx)
-
-    if ylims is None:
-        y_distance_to_contour = distance_func(furthest_contour,
-                                              direction='y',
-                                              *args, **kwargs)
-        padded_y_distance = default_scaling * y_distance_to_contour
-        dy = padded_y_distance / ny
-        y0 = slice(0, padded_y_distance, dy)
-    else:
-        dy = (ylims[1] - ylims[0]) / ny
-        y0 = slice(ylims[0], ylims[1], dy)
-
-    if zlims is None:
-        z_distance_to_contour = distance_func(furthest_contour,
-                                              direction='z',
-                                              *args, **kwargs)
-        padded_z_distance = default_scaling * z_distance_to_contour
-        dz = 2 * padded_z_distance / nz
-        z0 = slice(-padded_z_distance, padded_z_distance, dz)
-    else:
-        dz = (zlims[1] - zlims[0]) / nz
-        z0 = slice(zlims[0], zlims[1], dz)
+            padded_z_distance = default_scaling * z_distance_to_contour
+            dz = 2 * padded_z_distance / nz
+            z0 = slice(-padded_z_distance, padded_z_distance, dz)
+        else:
+            dz = (zlims[1] - zlims[0]) / nz
+            z0 = slice(zlims[0], zlims[1], dz)
 
-    x_z, y_z = np.mgrid[x0, y0]
-    x_y, z_y = np.mgrid[x0, z0]
-    y_x, z_x = np.mgrid[y0, z0]
+        x_z, y_z = np.mgrid[x0, y0]
+        x_y, z_y = np.mgrid[x0, z0]
+        y_x, z_x = np.mgrid[y0, z0]
 
-    fxy = value_func(x_z, y_z, slice_xyz[2] * np.ones_like(x_z), *args, **kwargs)
-    fxz = value_func(x_y, slice_xyz[1] * np.ones_like(x_y), z_y, *args, **kwargs)
-    fzy = value_func(slice_xyz[0] * np.ones_like(z_x), y_x, z_x, *args, **kwargs)
+        levels = np.asarray(contours, dtype=float) * 1000  # convert from kilo
+        own_executor = executor is None and max_workers is not None and max_workers > 1
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            evaluation = (value_func, args, kwargs, levels, progressive, tile_size, executor)
+            fxy = _evaluate_slice(x_z, y_z, slice_xyz[2] * np.ones_like(x_z), *evaluation)
+            fxz = _evaluate_slice(x_y, slice_xyz[1] * np.ones_like(x_y), z_y, *evaluation)
+            fzy = _evaluate_slice(slice_xyz[0] * np.ones_like(z_x), y_x, z_x, *evaluation)
+        finally:
+            if own_executor:
+                executor.shutdown()
+        fields = {'slice_xyz': list(slice_xyz), 'xy': (x_z, y_z, fxy), 'xz': (x_y, z_y, fxz), 'zy': (z_x, y_x, fzy)}
+        plot_lims = (None, None, None)
+    else:
+        plot_lims = (xlims, ylims, zlims)
+
+    slice_xyz = fields['slice_xyz']
+    x_z, y_z, fxy = fields['xy']
+    x_y, z_y, fxz = fields['xz']
+    z_x, y_x, fzy = fields['zy']
     fxy = fxy / 1000  # convert to kilo
     fxz = fxz / 1000
     fzy = fzy / 1000
@@ -196,10 +242,85 @@ def plot_sliced_contour(contours, xlims, ylims, zlims, nx, ny, nz,
     if title is not None:
         fig.suptitle(title)
 
+    xlims, ylims, zlims = plot_lims
+    if xlims is not None:
+        ax_xy.set_xlim(xlims)
+    if ylims is not None:
+        ax_xy.set_ylim(ylims)
+    if zlims is not None:
+        ax_zy.set_xlim(zlims)
+        ax_xz.set_ylim(zlims)
+
     if savefig:
         filepath = os.path.join(directory, filename)
         fig.savefig(filepath, bbox_inches='tight')
         plt.close(fig)
-        return filepath
+        fig_or_filepath = filepath
+    else:
+        fig_or_filepath = fig
+    if return_fields:
+        return fig_or_filepath, fields
+    return fig_or_filepath
+
+
+def _evaluate_tiles(x, y, z, value_func, args, kwargs, tile_size, executor):
+    '''
+    Evaluates value_func at flattened points in tiles of tile_size points,
+    on the executor if one is given
+    '''
+    if len(x) == 0:
+        return np.empty(0)
+    tiles = [(x[i:i + tile_size], y[i:i + tile_size], z[i:i + tile_size]) for i in range(0, len(x), tile_size)]
+    if executor is None:
+        values = [value_func(*tile, *args, **kwargs) for tile in tiles]
     else:
-        return fig
+        futures = [executor.submit(value_func, *tile, *args, **kwargs) for tile in tiles]
+        values = [future.result() for future in futures]
+    return np.concatenate([np.ravel(value) for value in values])
+
+
+def _evaluate_slice(x, y, z, value_func, args, kwargs, levels, progressive, tile_size, executor, stride=4):
+    '''
+    Evaluates value_func on a 2D grid of points (see plot_sliced_contour), either at every point or
+    (if progressive) on a coarse grid and the centers of its cells, followed by the cells of the coarse
+    grid that a level crosses between those values
+    '''
+    evaluation = (value_func, args, kwargs, max(int(tile_size), 1), executor)
+    shape = x.shape
+    if not progressive or min(shape) <= 2 * stride:
+        return _evaluate_tiles(x.ravel(), y.ravel(), z.ravel(), *evaluation).reshape(shape)
+
+    i_c = np.unique(np.append(np.arange(0, shape[0], stride), shape[0] - 1))
+    j_c = np.unique(np.append(np.arange(0, shape[1], stride), shape[1] - 1))
+    coarse_index = np.ix_(i_c, j_c)
+    # centers of the coarse cells, to detect levels crossed within cells whose corners are between the same levels
+    center_index = np.ix_((i_c[:-1] + i_c[1:])//2, (j_c[:-1] + j_c[1:])//2)
+    num_coarse = len(i_c)*len(j_c)
+    sampled = _evaluate_tiles(np.append(x[coarse_index], x[center_index]), np.append(y[coarse_index], y[center_index]),
+                              np.append(z[coarse_index], z[center_index]), *evaluation)
+    coarse = sampled[:num_coarse].reshape(len(i_c), len(j_c))
+    center = sampled[num_coarse:].reshape(len(i_c) - 1, len(j_c) - 1)
+
+    # bilinear interpolation between coarse values
+    rows = np.array([np.interp(np.arange(shape[1]), j_c, coarse_row) for coarse_row in coarse])
+    values = np.array([np.interp(np.arange(shape[0]), i_c, column) for column in rows.T]).T
+
+    corners = np.stack([coarse[:-1, :-1], coarse[1:, :-1], coarse[:-1, 1:], coarse[1:, 1:], center])
+    cell_min, cell_max = corners.min(axis=0), corners.max(axis=0)
+    crossed = ~np.all(np.isfinite(corners), axis=0)
+    for level in levels:
+        crossed |= (cell_min < level) & (cell_max >= level)
+    # include neighboring cells, in which a level may cross between coarse values
+    crossed[1:, :] |= crossed[:-1, :].copy()
+    crossed[:-1, :] |= crossed[1:, :].copy()
+    crossed[:, 1:] |= crossed[:, :-1].copy()
+    crossed[:, :-1] |= crossed[:, 1:].copy()
+    refine = np.zeros(shape, dtype=bool)
+    for a, b in zip(*np.nonzero(crossed)):
+        refine[i_c[a]:i_c[a + 1] + 1, j_c[b]:j_c[b + 1] + 1] = True
+    refine[coarse_index] = False
+    refine[center_index] = False
+    values[coarse_index] = coarse
+    values[center_index] = center
+    values[refine] = _evaluate_tiles(x[refine], y[refine], z[refine], *evaluation)
+    return values
@@ -0,0 +1,180 @@
+"""
+Copyright 2015-2022 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+You should have received a copy of the GNU General Public License along with HyRAM+.
+If not, see https://www.gnu.org/licenses/.
+"""
+
+import copy
+
+import numpy as np
+
+from ._comps import Orifice
+from ._jet import DevelopingFlow
+from ._notional_nozzle import NotionalNozzle
+
+
+class ReleaseStateCache:
+    def __init__(self):
+        '''
+        Cache of the diameter-independent states of a release.
+
+        The isentropic throat state (T, P, rho, v) of a release depends only on the upstream fluid
+        and the downstream pressure, and the state after the notional nozzle depends only on the
+        throat state, the discharge coefficient, the ambient fluid and the notional nozzle model.
+        These states are solved once and reused for every orifice diameter, with the mass flow rate
+        and effective (notional nozzle) diameter rescaled to each orifice. The complete developing flow
+        (see DevelopingFlow) of each release is also kept, so that releases with the same orifice and
+        establishment parameters (e.g., repeated Flame or Jet objects) share one near-field solution.
+
+        Contents
+        --------
+        self.hits, self.misses: int
+            number of states found in (and added to) the cache
+        '''
+        self._throats = {}
+        self._expanded = {}
+        self._developing_flows = {}
+        self.hits, self.misses = 0, 0
+
+    @staticmethod
+    def _fluid_key(fluid):
+        '''hashable description of a fluid state'''
+        return (fluid.species, float(fluid.T), float(fluid.P), float(fluid.rho), float(fluid.v),
+                type(fluid.therm).__name__)
+
+    def throat(self, fluid, orifice, downstream_P=101325, mdot=None, suppressWarnings=True):
+        '''
+        Returns the fluid at the throat of an orifice (see Orifice.flow)
+
+        Parameters
+        ----------
+        fluid: Fluid object
+            upstream fluid
+        orifice: Orifice object
+            orifice the fluid flows through
+        downstream_P: float
+            downstream pressure (Pa)
+        mdot: float or None
+            mass flow rate (kg/s) - only used for unchoked flow, in which case the throat state
+            depends on the orifice area and is not cached
+        suppressWarnings: boolean
+            whether to suppress warnings about the flow being choked/unchoked
+
+        Returns
+        -------
+        Fluid object containing T, P, rho, v at the throat (orifice)
+        '''
+        if mdot is not None:
+            return orifice.flow(fluid, downstream_P, mdot, suppressWarnings)
+        key = (self._fluid_key(fluid), float(downstream_P))
+        if key in self._throats:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._throats[key] = orifice.flow(fluid, downstream_P, None, suppressWarnings)
+        return copy.copy(self._throats[key])
+
+    def mass_flow_rate(self, fluid, orifice, downstream_P=101325):
+        '''
+        Returns the mass flow rate (kg/s) of a fluid through an orifice
+        '''
+        return orifice.mdot(self.throat(fluid, orifice, downstream_P))
+
+    def expanded(self, throat, orifice, ambient, nn_T='solve_energy', nn_conserve_momentum=True):
+        '''
+        Returns the fluid and effective orifice at the exit of the notional nozzle (see NotionalNozzle.calculate)
+
+        Parameters
+        ----------
+        throat: Fluid object
+            fluid at the orifice throat
+        orifice: Orifice object
+            orifice the fluid flows through
+        ambient: Fluid object
+            ambient fluid
+        nn_T: string or float
+            notional nozzle temperature specification
+        nn_conserve_momentum: boolean
+            whether the notional nozzle model conserves momentum
+
+        Returns
+        -------
+        tuple of (fluid object, orifice object), all at exit of notional nozzle
+        '''
+        key = (self._fluid_key(throat), float(orifice.Cd), self._fluid_key(ambient), nn_T, nn_conserve_momentum)
+        if key in self._expanded:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._expanded[key], _ = NotionalNozzle(throat, orifice, ambient).calculate(nn_T, nn_conserve_momentum)
+        fluid = copy.copy(self._expanded[key])
+        # conserve mass to solve for effective diameter:
+        return fluid, Orifice(np.sqrt(orifice.mdot(throat)/(fluid.rho*fluid.v)*4/np.pi))
+
+    def developing_flow(self, fluid, orifice, ambient, mdot=None, theta0=0, x0=0, y0=0,
+                        lam=1.16, betaA=0.28, nn_conserve_momentum=True, nn_T='solve_energy',
+                        T_establish_min=-1, suppressWarnings=False, verbose=False):
+        '''
+        Returns the developing flow of a release (see DevelopingFlow), solving it the first time that
+        the release is requested. The returned object is shared, and should not be modified.
+
+        Parameters
+        ----------
+        fluid: Fluid object
+            upstream fluid
+        orifice: Orifice object
+            orifice the fluid flows through
+        ambient: Fluid object
+            ambient fluid
+        mdot: float or None
+            mass flow rate (kg/s) - only used for unchoked flow
+        theta0, x0, y0: float
+            angle of release (rad) and starting location (m)
+        lam: float
+            spreading ratio of the established Gaussian profile
+        betaA: float
+            momentum entrainment coefficient
+        nn_conserve_momentum, nn_T:
+            notional nozzle model specification
+        T_establish_min: float
+            minimum temperature (K) at the zone of flow establishment
+        suppressWarnings, verbose: boolean
+            passed to DevelopingFlow when it is solved
+
+        Returns
+        -------
+        DevelopingFlow object
+        '''
+        key = (self._fluid_key(fluid), float(orifice.d), float(orifice.Cd), self._fluid_key(ambient),
+               None if mdot is None else float(mdot), float(theta0), float(x0), float(y0),
+               float(lam), float(betaA), nn_conserve_momentum, nn_T, float(T_establish_min))
+        if key in self._developing_flows:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._developing_flows[key] = DevelopingFlow(fluid, orifice, ambient, mdot,
+                                                         theta0=theta0, x0=x0, y0=y0,
+                                                         lam=lam, betaA=betaA,
+                                                         nn_conserve_momentum=nn_conserve_momentum, nn_T=nn_T,
+                                                         T_establish_min=T_establish_min,
+                                                         suppressWarnings=suppressWarnings, verbose=verbose,
+                                                         release_cache=self)
+        return self._developing_flows[key]
+
+    def release_states(self):
+        '''
+        Returns a new cache holding the throat and notional nozzle states of this cache, with zeroed counters.
+        The developing flows, which hold complete near-field solutions, are left out so that the copy is small
+        enough to send to worker processes. States added to the copy are not added to this cache.
+        '''
+        states = ReleaseStateCache()
+        states._throats, states._expanded = dict(self._throats), dict(self._expanded)
+        return states
+
+    def info(self):
+        '''returns a dictionary of cache counters and sizes'''
+        return {'hits': self.hits, 'misses': self.misses,
+                'throat_states': len(self._throats), 'expanded_states': len(self._expanded),
+                'developing_flows': len(self._developing_flows)}
@@ -6,12 +6,16 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+import os
+import hashlib
 import warnings
 import logging
+import threading
+from collections import OrderedDict
 
 from CoolProp import CoolProp
 import numpy as np
-from scipy import optimize, interpolate
+from scipy import optimize, interpolate, ndimage
 from scipy import constants as const
 
 from ._fuel_props import FuelProperties
@@ -21,6 +25,17 @@ from ..utilities.custom_warnings import PhysicsWarning
 log = logging.getLogger(__name__)
 
 
+def _new_blend_state(species):
+    '''
+    returns a new CoolProp AbstractState for a blend (e.g., 'Methane[0.5]&Nitrogen[0.5]')
+    '''
+    spec_names = '&'.join([s.split('[')[0] for s in species.split('&')])
+    molefracs = [float(s.split('[')[1][:-1]) for s in species.split('&')]
+    eos = CoolProp.AbstractState('HEOS', spec_names)
+    eos.set_mole_fractions(molefracs)
+    return eos
+
+
 class CoolPropWrapper:
     def __init__(self, species):
         '''
@@ -31,7 +46,51 @@ class CoolPropWrapper:
         self._cp = CoolProp
         self.spec = species
         self.MW = self._cp.PropsSI(self.spec, 'molemass')        
-        
+        self._cache_name = species
+        self._blend = '&' in species
+        if self._blend:
+            self._init_blend_state()
+
+    def _init_blend_state(self):
+        '''
+        creates the AbstractState of a blend, which is reused for every evaluation by this wrapper
+        (and only this wrapper, as each update changes the state), and the lock that guards it
+        '''
+        self._eos = _new_blend_state(self.spec)
+        self._eos_PT = None  # (P, T) of the current state of self._eos
+        self._eos_lock = threading.RLock()
+        self._last_T, self._last_P, self._last_rhomolar = None, None, None
+
+    def __getstate__(self):
+        # the CoolProp module, blend state and lock cannot be pickled and are recreated on unpickling
+        state = self.__dict__.copy()
+        for key in ['_cp', '_eos', '_eos_PT', '_eos_lock']:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cp = CoolProp
+        if self._blend:
+            self._init_blend_state()
+
+    def _set_phase(self, rho, P, Q):
+        '''sets the phase from CoolProp (for pure species) or from the quality (for blends)'''
+        if not self._blend:
+            try:
+                self.phase = self._cp.PhaseSI('D', rho, 'P', P, self.spec)
+                return
+            except ValueError:
+                pass
+        if (Q < 1) and (Q > 0):
+            self.phase = 'twophase'
+        elif Q == 1:
+            self.phase = 'vapor'
+        elif Q == 0:
+            self.phase = 'liquid'
+        else:
+            self.phase = ''
+
     def P(self, T, rho):
         '''
         returns the temperature given the pressure and density (and sets the phase)
@@ -49,21 +108,7 @@ class CoolPropWrapper:
             pressure (Pa)
         '''
         P, Q = self.PropsSI(['P', 'Q'], D=rho, T = T)
-        try:
-            if '&' in self.spec:
-                raise ValueError
-
-            self.phase = self._cp.PhaseSI('D', rho, 'P', P, self.spec)
-        except ValueError:
-            if (Q < 1) and (Q > 0):
-                self.phase = 'twophase'
-            elif Q == 1:
-                self.phase = 'vapor'
-            elif Q == 0:
-                self.phase = 'liquid'
-            else:
-                self.phase = ''
-
+        self._set_phase(rho, P, Q)
         return P
     
     def T(self, P, rho):
@@ -83,18 +128,7 @@ class CoolPropWrapper:
             temperature (K)
         '''
         T, Q = self.PropsSI(['T', 'Q'], D=rho, P=P)
-        try:
-            if '&' in self.spec: raise ValueError
-            self.phase = self._cp.PhaseSI('D', rho, 'P', P, self.spec)
-        except ValueError:
-            if (Q < 1) and (Q > 0):
-                self.phase = 'twophase'
-            elif Q == 1:
-                self.phase = 'vapor'
-            elif Q == 0:
-                self.phase = 'liquid'
-            else:
-                self.phase = ''
+        self._set_phase(rho, P, Q)
         return T
     
     def rho(self, T, P):
@@ -116,18 +150,7 @@ class CoolPropWrapper:
         '''
         try:
             rho, Q = self.PropsSI(['D', 'Q'], T = T, P = P)
-            try:
-                if '&' in self.spec: raise ValueError
-                self.phase = self._cp.PhaseSI('D', rho, 'P', P, self.spec)
-            except ValueError:
-                if (Q < 1) and (Q > 0):
-                    self.phase = 'twophase'
-                elif Q == 1:
-                    self.phase = 'vapor'
-                elif Q == 0:
-                    self.phase = 'liquid'
-                else:
-                    self.phase = ''
+            self._set_phase(rho, P, Q)
             return rho
         except:
             print('exception')
@@ -257,6 +280,8 @@ class CoolPropWrapper:
     def PropsSI(self, output, **kwargs):
         '''wrapper on CoolProps PropsSI
         
+        Results are memoized in a per-species cache (see set_props_cache).
+
         Parameters 
         ----------
         those accepted by CoolProp.PropsSI (e.g., T, P, S, D - with the addition of the keyword 'phase')
@@ -265,126 +290,179 @@ class CoolPropWrapper:
         -------
         Outputs from CoolProp listed within output (could be single value or list)
         '''
+        cache = _get_props_cache(self._cache_name)
+        if cache is None:
+            return self._uncached_PropsSI(output, **kwargs)
+        key = cache.key(output, kwargs)
+        if key is None:
+            return self._uncached_PropsSI(output, **kwargs)
+        out = cache.get(key)
+        if out is None:
+            # returned as stored, so that a miss gives the same type as a later hit
+            out = cache.put(key, self._uncached_PropsSI(output, **kwargs))
+        return out
+
+    def _uncached_PropsSI(self, output, **kwargs):
+        '''evaluates PropsSI (see PropsSI)'''
+        if self._blend:
+            return self._blend_PropsSI(output, **kwargs)
         if 'phase' in kwargs:
             phase =  '|' + kwargs.pop('phase')
         else:
             phase = ''        
+        (k1, v1), (k2, v2) = kwargs.items()
+        k1 += phase
+        if type(v1) == list or type(v1) == np.ndarray: 
+            if len(v1) == 1:
+                v1 = float(v1)
+        if type(v2) == list or type(v2) == np.ndarray:
+            if len(v2) == 1:
+                v2 = float(v2)
+        return self._cp.PropsSI(output, k1, v1, k2, v2, self.spec)
+
+    def _blend_update(self, P, T):
+        '''
+        updates the state of a blend to a given pressure and temperature, retrying with density guesses
+        (starting with the density of the last converged state) if the update fails
+
+        Raises a ValueError if no update succeeds, as the AbstractState would otherwise
+        still hold the previous state.
+        '''
+        eos = self._eos
+        if self._eos_PT == (P, T):
+            return
+        # the state is changed (or left invalid) by any update attempt
+        self._eos_PT = None
         try:
-            if '&' in self.spec:
-                raise ValueError
-
-            (k1, v1), (k2, v2) = kwargs.items()
-            k1 += phase
-            if type(v1) == list or type(v1) == np.ndarray: 
-                if len(v1) == 1:
-                    v1 = float(v1)
-            if type(v2) == list or type(v2) == np.ndarray:
-                if len(v2) == 1:
-                    v2 = float(v2)
-            out = self._cp.PropsSI(output, k1, v1, k2, v2, self.spec)
-            return out
-
-        except ValueError:  # likely blend
-            if '&' not in self.spec:
-                return ValueError  # not a blend - some other issue
-
-            spec_names = '&'.join([s.split('[')[0] for s in self.spec.split('&')])
-            molefracs = [float(s.split('[')[1][:-1]) for s in self.spec.split('&')]
-            eos = self._cp.AbstractState('HEOS', spec_names)
-            eos.set_mole_fractions(molefracs)
+            eos.update(self._cp.PT_INPUTS, P, T)
+            updated = True
+        except Exception:
+            updated = False
             guess = self._cp.PyGuessesStructure()
+            # unclear what the 'right' guess is (hence the loop)
+            guesses = [(i+1)*2*P/(8.314*T) for i in range(10)]
+            if self._last_rhomolar is not None:
+                guesses.insert(0, self._last_rhomolar)
+            for rhomolar in guesses:
+                guess.rhomolar = rhomolar
+                try:
+                    eos.update_with_guesses(self._cp.PT_INPUTS, P, T, guess)
+                    updated = True
+                    break
+                except Exception:
+                    pass
+        if not updated:
+            self._last_rhomolar = None
+            raise ValueError('Unable to update the state of {} to P = {} Pa, T = {} K'.format(self.spec, P, T))
+        self._last_rhomolar = eos.rhomolar()
+        self._eos_PT = (P, T)
+
+    def _blend_output(self, k):
+        '''returns an output property from the current state of the blend'''
+        eos = self._eos
+        if   k == 'D': return eos.rhomass()
+        elif k == 'T': return eos.T()
+        elif k == 'P': return eos.p()
+        elif k == 'S': return eos.smass()
+        elif k == 'H': return eos.hmass()
+        elif k == 'U': return eos.umass()
+        elif k == 'Q': return eos.Q()
+        elif k == 'A': return eos.speed_sound()
+        elif k == 'C': return eos.cpmass()
+        elif k == 'V': return eos.viscosity()
+        elif k == 'isobaric_expansion_coefficient': return eos.isobaric_expansion_coefficient()
+        raise ValueError('Output {} not available for blends'.format(k))
 
-            def out(k):
-                if   k == 'D': return eos.rhomass()
-                elif k == 'S': return eos.smass()
-                elif k == 'H': return eos.hmass()
-                elif k == 'U': return eos.umass()
+    def _blend_newton(self, k, v, T=None, P=None, x0=None, bounds=(0, np.inf), xtol=1e-12, maxiter=50):
+        '''
+        solves for the pressure (if T is given) or temperature (if P is given) of a blend at which output k
+        equals v using Newton's method, with derivatives from the AbstractState
+
+        Returns
+        -------
+        solution (or None if the iteration did not converge within the bounds)
+        '''
+        params = {'D': self._cp.iDmass, 'S': self._cp.iSmass, 'H': self._cp.iHmass, 'U': self._cp.iUmass}
+        if k not in params:
+            return None
+        if T is None:
+            wrt, const = self._cp.iT, self._cp.iP
+        else:
+            wrt, const = self._cp.iP, self._cp.iT
+        x = x0
+        try:
+            for i in range(maxiter):
+                if T is None:
+                    self._blend_update(P, x)
+                else:
+                    self._blend_update(x, T)
+                dx = (v - self._blend_output(k))/self._eos.first_partial_deriv(params[k], wrt, const)
+                x_new = x + dx
+                if not (bounds[0] < x_new < bounds[1]) or not np.isfinite(x_new):
+                    return None
+                if abs(dx) <= xtol*abs(x_new):
+                    return x  # state of the blend is already at this solution
+                x = x_new
+        except Exception:
+            return None
+        return None
+
+    def _blend_PropsSI(self, output, **kwargs):
+        '''
+        PropsSI for blends, using the persistent AbstractState of this wrapper
+
+        Flashes other than pressure-temperature are solved with Newton's method starting from the
+        last solved state, falling back to the (slower) global solvers if that fails.
+        Evaluations are serialized by a lock, as each one updates the AbstractState of this wrapper.
+        '''
+        with self._eos_lock:
+            kwargs.pop('phase', None)
+            eos = self._eos
+            out = self._blend_output
             if ('P' in kwargs) and ('T' in kwargs):
-                P = kwargs['P']; T = kwargs['T']
-                try:
-                    eos.update(self._cp.PT_INPUTS, P, T)
-                except:
-                    for i in range(10):
-                        guess.rhomolar = (i+1)*2*P/(8.314*T) # unclear what the 'right' guess is (hence the loop)
-                        try:
-                            eos.update_with_guesses(self._cp.PT_INPUTS, P, T, guess)
-                            break
-                        except:
-                            pass
+                P, T = float(np.squeeze(kwargs['P'])), float(np.squeeze(kwargs['T']))
             elif ('T' in kwargs):
-                T = kwargs.pop('T')
-                k, v = list(kwargs.items())[0]
-                def err(P):
-                    try:
-                        eos.update(self._cp.PT_INPUTS, P, T)
-                    except:
-                        for i in range(10):
-                            guess.rhomolar = (i+1)*2*P/(8.314*T) # unclear what the 'right' guess is (hence the loop)
-                            try:
-                                eos.update_with_guesses(self._cp.PT_INPUTS, P, T, guess)
-                                break
-                            except:
-                                pass
-                    return v - out(k)
-                P = optimize.root(err, 101325.)['x'] # somewhat arbitrarily starts at 1 atm
+                T = float(np.squeeze(kwargs.pop('T')))
+                (k, v), = kwargs.items()
+                v = float(np.squeeze(v))
+                P0 = self._last_P if self._last_P is not None else 101325. # somewhat arbitrarily starts at 1 atm
+                P = self._blend_newton(k, v, T=T, x0=P0, bounds=(0, eos.pmax()))
+                if P is None:
+                    def err(P):
+                        self._blend_update(float(np.squeeze(P)), T)
+                        return v - out(k)
+                    P = optimize.root(err, 101325.)['x'][0]
             elif ('P' in kwargs):
-                P = kwargs.pop('P')
-                k, v = list(kwargs.items())[0]
-                def err(T):
-                    try:
-                        eos.update(self._cp.PT_INPUTS, P, T)
-                    except:
-                        for i in range(10):
-                            guess.rhomolar = (2*i+1)*P/(8.314*T) # unclear what the 'right' guess is (hence the loop)
-                            try:
-                                eos.update_with_guesses(self._cp.PT_INPUTS, P, T, guess)
-                                break
-                            except:
-                                pass
-
-                    return v - out(k)
-                T = optimize.brentq(err, eos.Tmin(), eos.Tmax()) # not the most efficient here, but works
+                P = float(np.squeeze(kwargs.pop('P')))
+                (k, v), = kwargs.items()
+                v = float(np.squeeze(v))
+                Tmin, Tmax = eos.Tmin(), eos.Tmax()
+                T0 = self._last_T if self._last_T is not None else (Tmin + Tmax)/2
+                T = self._blend_newton(k, v, P=P, x0=T0, bounds=(Tmin, Tmax))
+                if T is None:
+                    def err(T):
+                        self._blend_update(P, T)
+                        return v - out(k)
+                    T = optimize.brentq(err, Tmin, Tmax) # not the most efficient here, but works
             else:
                 (k1, v1), (k2, v2) = list(kwargs.items())
-                warnings.warn('Only PT_inputs allowed for blends (this may not work) trying to solve for %s, %s inputs' % (k1, k2), 
+                warnings.warn('Only PT_inputs allowed for blends (this may not work) trying to solve for %s, %s inputs' % (k1, k2),
                               category=PhysicsWarning)
                 def err(TP):
                     T, P = TP
-                    try:
-                        eos.update(self._cp.PT_INPUTS, P, T)
-                    except:
-                        for i in range(10):
-                            guess.rhomolar = (i+1)*2*P/(8.314*T) # unclear what the 'right' guess is (hence the loop)
-                            try:
-                                eos.update_with_guesses(self._cp.PT_INPUTS, P, T, guess)
-                                break
-                            except:
-                                pass
+                    self._blend_update(P, T)
                     return [v1 - out(k1), v2 - out(k2)]
-                T, P = optimize.root(err, [(eos.Tmin() + eos.Tmax())/2, 101325])['x']              
-
-            def map_outputs(key_or_keys, eos):
-                def out(k):
-                    if   k == 'D': return eos.rhomass()
-                    elif k == 'T': return eos.T()
-                    elif k == 'P': return eos.p()
-                    elif k == 'S': return eos.smass()
-                    elif k == 'H': return eos.hmass()
-                    elif k == 'U': return eos.umass()
-                    elif k == 'Q': return eos.Q()
-                    elif k == 'A': return eos.speed_sound()
-                    elif k == 'C': return eos.cpmass()
-                    elif k == 'V': return eos.viscosity()
-                    elif k == 'isobaric_expansion_coefficient': return eos.isobaric_expansion_coefficient()
-                if type(key_or_keys) == list:
-                    return [out(k) for k in key_or_keys]
+                if self._last_T is not None:
+                    TP0 = [self._last_T, self._last_P]
                 else:
-                    return out(key_or_keys)
-            return map_outputs(output, eos)
-        except:
-            raise warnings.warn('system not properly defined')
+                    TP0 = [(eos.Tmin() + eos.Tmax())/2, 101325]
+                T, P = optimize.root(err, TP0)['x']
+            self._blend_update(P, T)
+            self._last_T, self._last_P = T, P
+            if type(output) == list:
+                return [out(k) for k in output]
+            return out(output)
 
-            
     def s(self, T = None, P = None, rho = None, phase = None):
         '''
         entropy (J/kg-K) of a fluid at temperature T (K) and pressure P (Pa)
@@ -414,7 +492,473 @@ class CoolPropWrapper:
         else:
             raise warnings.warn('system not properly defined')
 
-            
+
+class PropsCache:
+    def __init__(self, maxsize=4096, sig_digits=12):
+        '''
+        Bounded least-recently-used cache of property evaluations for a single species
+
+        Access is guarded by a lock, so the cache can be shared by threads.
+
+        Parameters
+        ----------
+        maxsize: int
+            maximum number of entries before the least recently used entries are evicted
+        sig_digits: int
+            number of significant digits the input values are rounded to when forming cache keys
+
+        Contents
+        --------
+        self.hits, self.misses, self.evictions: int
+            counters of cache use
+        '''
+        self.maxsize, self.sig_digits = maxsize, sig_digits
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def _round(self, value):
+        '''rounds a value to the number of significant digits of the cache'''
+        if type(value) == list or type(value) == np.ndarray:
+            if len(value) != 1:
+                raise TypeError('only scalar inputs are cached')
+            value = value[0]
+        value = float(value)
+        if value == 0 or not np.isfinite(value):
+            return value
+        return round(value, self.sig_digits - 1 - int(np.floor(np.log10(abs(value)))))
+
+    def key(self, output, kwargs):
+        '''
+        returns a hashable key for a PropsSI call, or None if the call cannot be cached
+
+        The inputs are sorted by name, so the key does not depend on the order of the keyword arguments.
+        '''
+        try:
+            inputs = tuple(sorted([(k, v if k == 'phase' else self._round(v)) for k, v in kwargs.items()]))
+        except (TypeError, ValueError):
+            return None
+        if type(output) == list:
+            output = tuple(output)
+        return output, inputs
+
+    def get(self, key):
+        '''returns the cached value for a key (or None if not cached)'''
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._output(value)
+
+    @staticmethod
+    def _output(value):
+        '''returns a stored value as it is returned from the cache (a new array for multiple outputs)'''
+        if type(value) == tuple:
+            return np.array(value)
+        return value
+
+    def put(self, key, value):
+        '''
+        adds a value to the cache, evicting the least recently used entry if full
+
+        Returns
+        -------
+        the value as it will be returned from the cache (or the value itself, if it cannot be cached)
+        '''
+        if type(value) == np.ndarray or type(value) == list:
+            value = tuple([float(v) for v in value])
+        elif isinstance(value, (float, np.floating)):
+            value = float(value)
+        else:
+            return value
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return self._output(value)
+
+    def info(self):
+        '''returns a dictionary of cache counters and size'''
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        '''removes all entries and resets the counters'''
+        with self._lock:
+            self._entries.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+
+_props_cache_settings = {'enabled': True, 'maxsize': 4096, 'sig_digits': 12}
+_props_caches = {}  # species -> PropsCache
+
+
+def _get_props_cache(name):
+    '''returns the property cache for a species (or tabulated species), or None if caching is disabled'''
+    if not _props_cache_settings['enabled']:
+        return None
+    cache = _props_caches.get(name)
+    if cache is None:
+        # setdefault keeps the first cache if threads create caches for the same species at once
+        cache = _props_caches.setdefault(name, PropsCache(_props_cache_settings['maxsize'],
+                                                          _props_cache_settings['sig_digits']))
+    return cache
+
+
+def set_props_cache(enabled=True, maxsize=None, sig_digits=None):
+    '''
+    Turns memoization of CoolPropWrapper.PropsSI on or off and sets the cache parameters.
+    Changing the parameters clears the existing caches.
+
+    Parameters
+    ----------
+    enabled: bool
+        whether property evaluations are cached
+    maxsize: int or None
+        maximum number of entries per species (unchanged if None)
+    sig_digits: int or None
+        number of significant digits the inputs are rounded to for cache keys (unchanged if None)
+    '''
+    _props_cache_settings['enabled'] = enabled
+    if maxsize is not None or sig_digits is not None:
+        if maxsize is not None:
+            _props_cache_settings['maxsize'] = maxsize
+        if sig_digits is not None:
+            _props_cache_settings['sig_digits'] = sig_digits
+        _props_caches.clear()
+
+
+def props_cache_info(species=None):
+    '''
+    Returns the cache counters (hits, misses, evictions, size, maxsize)
+
+    Parameters
+    ----------
+    species: string or None
+        species to return counters for, if None, returns a dictionary of counters for all species
+    '''
+    if species is not None:
+        cache = _props_caches.get(species)
+        return PropsCache(0).info() if cache is None else cache.info()
+    return dict([[spec, cache.info()] for spec, cache in _props_caches.items()])
+
+
+def clear_props_cache():
+    '''removes all cached property evaluations and resets the counters'''
+    _props_caches.clear()
+
+
+_TABLE_PROPS = ['T', 'P', 'D', 'H', 'S', 'U', 'A', 'C']
+_LOG_PROPS = ['T', 'P', 'D']  # tabulated (and interpolated) in log space
+_PHASE_NAMES = {0: 'liquid', 1: 'supercritical', 2: 'supercritical_gas', 3: 'supercritical_liquid',
+                4: 'critical_point', 5: 'gas', 6: 'twophase', 7: 'unknown', 8: 'not_imposed'}
+_TABLE_FORMAT_VERSION = 2
+# fractional locations within each cell (along each axis) where the interpolation is checked against CoolProp
+_TABLE_CHECK_POINTS = [(0.5, 0.5), (0.25, 0.25), (0.25, 0.75), (0.75, 0.25), (0.75, 0.75)]
+# denser check points for cells that border invalid cells (e.g., next to the saturation curve)
+_TABLE_BORDER_CHECK_POINTS = [(f1, f2) for f1 in (0.125, 0.375, 0.625, 0.875) for f2 in (0.125, 0.375, 0.625, 0.875)]
+
+_property_tables = {}  # process-wide cache of built tables, keyed by species and table settings
+
+
+class _PropertyTable:
+    def __init__(self, keys, axes, nodes, valid, phase, max_error):
+        '''
+        Bicubic interpolating table of fluid properties for one pair of input properties
+
+        Parameters
+        ----------
+        keys: tuple of strings
+            the two CoolProp input keys (e.g., ('T', 'P')) along the table axes
+        axes: tuple of ndarrays
+            node locations along each axis (log of the value for properties in _LOG_PROPS)
+        nodes: dict
+            {output key: 2D array of node values} (log of the value for properties in _LOG_PROPS)
+        valid: ndarray of bool
+            cells (between nodes) where the interpolation has been verified against CoolProp
+        phase: ndarray of int
+            CoolProp phase index for each cell
+        max_error: float
+            maximum relative error of the interpolation at the check points (_TABLE_CHECK_POINTS)
+            of the valid cells
+        '''
+        self.keys, self.axes, self.nodes = keys, axes, nodes
+        self.valid, self.phase, self.max_error = valid, phase, max_error
+        self.outputs = list(nodes.keys())
+        self._splines = dict([[k, interpolate.RectBivariateSpline(axes[0], axes[1], v, kx=3, ky=3)]
+                              for k, v in nodes.items()])
+
+    def cell(self, v1, v2):
+        '''returns the (transformed) coordinates and the cell index of a point, or None if not in a valid cell'''
+        x1 = np.log(v1) if self.keys[0] in _LOG_PROPS else v1
+        x2 = np.log(v2) if self.keys[1] in _LOG_PROPS else v2
+        ax1, ax2 = self.axes
+        if not (ax1[0] <= x1 <= ax1[-1] and ax2[0] <= x2 <= ax2[-1]):
+            return None
+        i = min(np.searchsorted(ax1, x1, side='right') - 1, len(ax1) - 2)
+        j = min(np.searchsorted(ax2, x2, side='right') - 1, len(ax2) - 2)
+        if not self.valid[i, j]:
+            return None
+        return x1, x2, (i, j)
+
+    def __call__(self, key, x1, x2):
+        '''interpolated value of an output at transformed coordinates x1, x2'''
+        val = self._splines[key](x1, x2, grid=False)[()]
+        return np.exp(val) if key in _LOG_PROPS else val
+
+
+class TabulatedWrapper(CoolPropWrapper):
+    def __init__(self, species, T_range=(None, 1000.), P_range=(1e3, 1e8), numpoints=80, rtol=1e-5,
+                 directory=None):
+        '''
+        Class that uses bicubic interpolating tables for equation of state calculations of a pure species,
+        falling back to CoolProp outside of the tables.
+
+        Tables are built over (T, P), (D, U), (P, S), and (H, D) inputs. Each table cell is checked
+        against CoolProp at its center and four quarter points when the table is built; cells that
+        cross a phase boundary, contain a two-phase state, or exceed the relative error tolerance at
+        any of these points are marked invalid and queries within them are passed through to CoolProp.
+        The tolerance is therefore an estimate of the interpolation error rather than a guarantee:
+        the error between the check points (e.g., close to the saturation curve) can be larger.
+        Tables are shared between instances with the same settings, and can be saved to (and loaded
+        from) a directory.
+        Use with a Fluid object, e.g., Fluid('H2', T=300, P=1e6, therm=TabulatedWrapper('Hydrogen')).
+
+        Parameters
+        ----------
+        species: string
+            CoolProp species name (blends are passed through to CoolProp)
+        T_range: tuple of floats
+            (minimum, maximum) temperature of the (T, P) table (K); a minimum of None uses
+            the minimum temperature of the equation of state
+        P_range: tuple of floats
+            (minimum, maximum) pressure of the (T, P) table (Pa)
+        numpoints: int
+            number of nodes along each axis of each table
+        rtol: float
+            relative error tolerance of the interpolation, used to verify the table cells
+        directory: string or None
+            directory used to save and load tables, if None, tables are not saved
+
+        Contents
+        --------
+        self.error_bounds: dict
+            maximum relative error at the check points of the valid cells of each tabulated input pair
+            (an estimate of the interpolation error)
+        self.table_calls, self.fallback_calls: int
+            number of property evaluations made using the tables and CoolProp, respectively
+        '''
+        super().__init__(species)
+        self.table_calls, self.fallback_calls = 0, 0
+        if '&' in self.spec:
+            warnings.warn('Property tables are not available for blends, using CoolProp for {}.'.format(self.spec),
+                          category=PhysicsWarning)
+            self._tables = {}
+        else:
+            Tmin, Tmax = T_range
+            if Tmin is None:
+                Tmin = self._cp.PropsSI('Tmin', self.spec)*1.001
+            settings = (self.spec, float(Tmin), float(Tmax), float(P_range[0]), float(P_range[1]),
+                        int(numpoints), float(rtol))
+            if settings not in _property_tables:
+                _property_tables[settings] = self._load_or_build_tables(settings, directory)
+            self._tables = _property_tables[settings]
+            self._cache_name = '{}|tabulated|{}'.format(self.spec, id(self._tables))
+        self.error_bounds = dict([[table.keys, table.max_error] for table in self._tables.values()])
+
+    def _load_or_build_tables(self, settings, directory):
+        '''loads tables from the directory if they have been previously saved, otherwise builds (and saves) them'''
+        if directory is not None:
+            tag = hashlib.sha1(repr((_TABLE_FORMAT_VERSION,) + settings).encode()).hexdigest()[:16]
+            filename = os.path.join(directory, '{}_{}.npz'.format(self.spec.replace(' ', '_'), tag))
+            if os.path.exists(filename):
+                return self._unpack_tables(np.load(filename))
+        spec, Tmin, Tmax, Pmin, Pmax, numpoints, rtol = settings
+        tables = {}
+        TP = self._build_table(('T', 'P'), (np.log(Tmin), np.log(Tmax)), (np.log(Pmin), np.log(Pmax)),
+                               numpoints, rtol)
+        tables[frozenset(TP.keys)] = TP
+        for keys in [('D', 'U'), ('P', 'S'), ('H', 'D')]:
+            # ranges of the other tables cover the states within the (T, P) table
+            lims = []
+            for k in keys:
+                if k in TP.keys:
+                    ax = TP.axes[TP.keys.index(k)]
+                    lims.append((ax[0], ax[-1]))
+                else:
+                    lims.append((TP.nodes[k].min(), TP.nodes[k].max()))
+            table = self._build_table(keys, lims[0], lims[1], numpoints, rtol)
+            tables[frozenset(keys)] = table
+        if directory is not None:
+            np.savez(filename, **self._pack_tables(tables))
+        return tables
+
+    def _build_table(self, keys, lims1, lims2, numpoints, rtol):
+        '''evaluates CoolProp on a grid (and at points within each cell, for verification) to create a table'''
+        axes = (np.linspace(*lims1, numpoints), np.linspace(*lims2, numpoints))
+        outputs = [k for k in _TABLE_PROPS if k not in keys]
+
+        def evaluate(x1, x2):
+            X1, X2 = [np.exp(x) if k in _LOG_PROPS else x for k, x in zip(keys, (x1, x2))]
+            vals = self._cp.PropsSI(outputs + ['Phase'], keys[0], X1.ravel(), keys[1], X2.ravel(), self.spec)
+            vals = np.reshape(vals, X1.shape + (len(outputs) + 1,))
+            vals, phase = vals[..., :-1], vals[..., -1]
+            ok = np.all(np.isfinite(vals), axis=-1) & np.isfinite(phase) & (phase != 6)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                vals = dict([[k, np.log(vals[..., i]) if k in _LOG_PROPS else vals[..., i]]
+                             for i, k in enumerate(outputs)])
+            for k in outputs:
+                ok &= np.isfinite(vals[k])
+            return vals, phase, ok
+
+        nodes, node_phase, node_ok = evaluate(*np.meshgrid(*axes, indexing='ij'))
+        if not node_ok.any():
+            raise ValueError('Unable to build property table for {} over {} inputs'.format(self.spec, keys))
+        # fills nodes outside of the valid domain with the nearest valid value so that the splines can be fit
+        ind = ndimage.distance_transform_edt(~node_ok, return_distances=False, return_indices=True)
+        for k in outputs:
+            nodes[k] = nodes[k][tuple(ind)]
+        cell_phase = node_phase[:-1, :-1]
+        table = _PropertyTable(keys, axes, nodes, np.ones((numpoints - 1, numpoints - 1), dtype=bool), cell_phase, 0)
+        scales = dict([[k, 1e-6*np.abs(nodes[k]).max()] for k in outputs])
+
+        def check(i, j, check_points):
+            '''maximum relative error within cells (i, j) at the check points (inf if not in the phase of the cell)'''
+            error = np.zeros(np.shape(i))
+            for f1, f2 in check_points:
+                x1 = axes[0][i] + f1*(axes[0][i + 1] - axes[0][i])
+                x2 = axes[1][j] + f2*(axes[1][j + 1] - axes[1][j])
+                true, phase, ok = evaluate(x1, x2)
+                ok &= (phase == cell_phase[i, j])
+                for k in outputs:
+                    interp = table._splines[k](x1, x2, grid=False)
+                    with np.errstate(invalid='ignore', over='ignore'):
+                        if k in _LOG_PROPS:
+                            err = np.abs(np.expm1(interp - true[k]))
+                        else:
+                            err = np.abs(interp - true[k])/(np.abs(true[k]) + scales[k])
+                    error = np.fmax(error, np.where(ok, err, np.inf))
+            return error
+
+        same_phase = ((cell_phase == node_phase[1:, :-1]) & (cell_phase == node_phase[:-1, 1:]) &
+                      (cell_phase == node_phase[1:, 1:]))
+        bad_node = ndimage.binary_dilation(~node_ok)
+        bad_node = bad_node[:-1, :-1] | bad_node[1:, :-1] | bad_node[:-1, 1:] | bad_node[1:, 1:]
+        error = check(*np.indices(cell_phase.shape), _TABLE_CHECK_POINTS)
+        table.valid = same_phase & ~bad_node & (error <= rtol)
+        # interpolation errors are largest next to phase boundaries and the edges of the valid domain,
+        # so cells bordering invalid cells are checked more densely
+        border = np.nonzero(table.valid & ndimage.binary_dilation(~table.valid, structure=np.ones((3, 3))))
+        if len(border[0]):
+            error[border] = np.fmax(error[border], check(*border, _TABLE_BORDER_CHECK_POINTS))
+            table.valid[border] = error[border] <= rtol
+        table.max_error = error[table.valid].max() if table.valid.any() else np.nan
+        return table
+
+    @staticmethod
+    def _pack_tables(tables):
+        '''flattens tables into a dictionary of arrays for saving'''
+        packed = {}
+        for n, table in enumerate(tables.values()):
+            prefix = 't{}_'.format(n)
+            packed[prefix + 'keys'] = np.array(table.keys)
+            packed[prefix + 'axis0'], packed[prefix + 'axis1'] = table.axes
+            packed[prefix + 'valid'], packed[prefix + 'phase'] = table.valid, table.phase
+            packed[prefix + 'max_error'] = table.max_error
+            for k, v in table.nodes.items():
+                packed[prefix + 'node_' + k] = v
+        return packed
+
+    @staticmethod
+    def _unpack_tables(packed):
+        '''rebuilds tables from a dictionary of arrays'''
+        tables = {}
+        n = 0
+        while 't{}_keys'.format(n) in packed:
+            prefix = 't{}_'.format(n)
+            keys = tuple(str(k) for k in packed[prefix + 'keys'])
+            nodes = dict([[k, packed[prefix + 'node_' + k]] for k in _TABLE_PROPS if k not in keys])
+            tables[frozenset(keys)] = _PropertyTable(keys, (packed[prefix + 'axis0'], packed[prefix + 'axis1']), nodes,
+                                                     packed[prefix + 'valid'], packed[prefix + 'phase'],
+                                                     float(packed[prefix + 'max_error']))
+            n += 1
+        return tables
+
+    def _interpolate(self, output, kwargs):
+        '''
+        returns the tabulated output(s) and phase index at the inputs given by kwargs,
+        or None if the inputs are not within a valid table cell
+        '''
+        if len(kwargs) != 2 or 'phase' in kwargs:
+            return None
+        table = self._tables.get(frozenset(kwargs.keys()))
+        if table is None:
+            return None
+        outputs = output if type(output) == list else [output]
+        if any([k not in table.outputs and k not in table.keys and k != 'Q' for k in outputs]):
+            return None
+        try:
+            v1, v2 = [float(np.squeeze(kwargs[k])) for k in table.keys]
+        except (TypeError, ValueError):  # array inputs
+            return None
+        cell = table.cell(v1, v2)
+        if cell is None:
+            return None
+        x1, x2, ij = cell
+
+        def out(k):
+            if k == 'Q':
+                return -1.  # CoolProp value for single-phase states
+            elif k in table.keys:
+                return [v1, v2][table.keys.index(k)]
+            return table(k, x1, x2)
+        if type(output) == list:
+            values = np.array([out(k) for k in outputs])
+        else:
+            values = out(output)
+        return values, table.phase[ij]
+
+    def _uncached_PropsSI(self, output, **kwargs):
+        '''evaluates PropsSI using the property tables when possible, otherwise with CoolProp'''
+        tabulated = self._interpolate(output, kwargs)
+        if tabulated is None:
+            self.fallback_calls += 1
+            return super()._uncached_PropsSI(output, **kwargs)
+        self.table_calls += 1
+        return tabulated[0]
+
+    def rho(self, T, P):
+        '''
+        returns the density given the temperature and pressure - if at saturation conditions,
+        requires phase to already be set
+
+        Parameters
+        ----------
+        T: float
+            temperature (K)
+        P: float
+            pressure (Pa)
+
+        Returns
+        -------
+        rho:
+            density (kg/m^3)
+        '''
+        tabulated = self._interpolate('D', {'T': T, 'P': P})
+        if tabulated is None:
+            return super().rho(T, P)
+        self.table_calls += 1
+        rho, phase = tabulated
+        self.phase = _PHASE_NAMES[int(phase)]
+        return rho
+
 
 class Combustion:
     def __init__(self, fluid, #ambient, # TODO: add ambient object
@@ -471,27 +1015,71 @@ class Combustion:
                           np.linspace(self.fstoich, 1, int(max(numpoints*(1-self.fstoich), 5))))
         T = self._T_combustion(Treac, fvals)
         MWvals = self._MWmix(self._Yprod(fvals))
-        
-        
-        self.MW_prod = lambda f: self._MWmix(self._Yprod(f))
+        self._set_tables(fvals, T, MWvals, ifstoich)
+        cp, cv = self._PropsSI(['CPMASS', 'CVMASS'], 'T', Treac, 'P', P, self.reac)
+        self.gamma_reac = cp/cv
+        if verbose:
+            print('done.')
+
+    def _set_tables(self, fvals, T, MWvals, ifstoich):
+        '''creates the interpolating functions from the product temperatures and molecular weights'''
+        P = self.P
+        self._fvals, self._Tvals, self._MWvals, self._ifstoich = fvals, T, MWvals, ifstoich
         # Creates a couple of interpolating functions
         # Only create them once during initialization, to use as a lookup value
         self.T_prod = interpolate.interp1d(fvals, T)
-        self.rho_prod = lambda f: P*self.MW_prod(f)/(const.R*self.T_prod(f))
         self.drhodf = interpolate.interp1d(fvals,
                                            P/(const.R*T)*(np.append(np.gradient(MWvals[:ifstoich], fvals[:ifstoich]),
                                                           np.gradient(MWvals[ifstoich:], fvals[ifstoich:])) - 
                                                           np.append(np.gradient(T[:ifstoich], fvals[:ifstoich]),
                                                           np.gradient(T[ifstoich:], fvals[ifstoich:]))/T*MWvals))
 
-        
         self.X_reac_stoich = self._Yreac(self.fstoich)[self.reac]*self._MWmix(self._Yreac(self.fstoich))/self.MW[self.reac]
-        self.sigma = ((self._MWmix(self._Yreac(self.fstoich))/Treac) /
+        self.sigma = ((self._MWmix(self._Yreac(self.fstoich))/self.Treac) /
                       (self._MWmix(self._Yprod(self.fstoich))/self.T_prod(self.fstoich)))
-        cp, cv = self._PropsSI(['CPMASS', 'CVMASS'], 'T', Treac, 'P', P, self.reac)
-        self.gamma_reac = cp/cv
-        if verbose:
-            print('done.')
+
+    def MW_prod(self, f):
+        '''mixture averaged molecular weight of products (g/mol) at a mixture fraction, f'''
+        return self._MWmix(self._Yprod(f))
+
+    def rho_prod(self, f):
+        '''density of products (kg/m^3) at a mixture fraction, f'''
+        return self.P*self.MW_prod(f)/(const.R*self.T_prod(f))
+
+    def _to_arrays(self):
+        '''returns a dictionary of arrays from which the chemistry can be recreated (see _from_arrays)'''
+        return {'reac': np.array(self.reac), 'Treac': self.Treac, 'P': self.P,
+                'nCHO': np.array([self._nC, self._nH, self._nO]), 'xO2stoich': self.xO2stoich, 'DHc': self.DHc,
+                'MW_species': np.array(list(self.MW.keys())), 'MW_values': np.array(list(self.MW.values())),
+                'fstoich': self.fstoich, 'gamma_reac': self.gamma_reac, 'sigma': self.sigma,
+                'fvals': self._fvals, 'T_prod': self._Tvals, 'MW_prod': self._MWvals, 'ifstoich': self._ifstoich,
+                'drhodf': self.drhodf.y}
+
+    @classmethod
+    def _from_arrays(cls, fluid, data):
+        '''recreates the chemistry for a fluid from the arrays returned by _to_arrays'''
+        self = cls.__new__(cls)
+        self._myPropsSI = fluid.therm.PropsSI
+        self._PropsSI = fluid.therm._cp.PropsSI
+        self.reac = str(data['reac'])
+        self.Treac, self.P = float(data['Treac']), float(data['P'])
+        self._nC, self._nH, self._nO = [float(n) for n in data['nCHO']]
+        self.xO2stoich, self.DHc = float(data['xO2stoich']), float(data['DHc'])
+        self.MW = dict(zip([str(spec) for spec in data['MW_species']], [float(MW) for MW in data['MW_values']]))
+        self.fstoich, self.gamma_reac = float(data['fstoich']), float(data['gamma_reac'])
+        self._set_tables(data['fvals'], data['T_prod'], data['MW_prod'], int(data['ifstoich']))
+        return self
+
+    def __getstate__(self):
+        # property functions are only needed to build the tables and are restored on unpickling
+        state = self.__dict__.copy()
+        del state['_myPropsSI'], state['_PropsSI']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._PropsSI = CoolProp.PropsSI
+        self._myPropsSI = CoolPropWrapper(self.reac).PropsSI
 
     def reinitilize(self, fluid, numpoints = 100):
         '''
@@ -573,12 +1161,122 @@ class Combustion:
                                                    fill_value = 'extrapolate')
         return Hdict
 
-    def _T_combustion(self, T_reac, f, numpoints = 500):
-        '''combustion temperature (K)'''
+    def _T_combustion(self, T_reac, f, numpoints = 500, xtol = 1e-10, maxiter = 100):
+        '''
+        combustion temperature (K)
+
+        The energy balance at each mixture fraction is an independent scalar equation, solved for
+        all mixture fractions at once with Newton iterations, safeguarded by bisection within a
+        bracket for each point, until each point has converged to a relative tolerance of xtol.
+        '''
+        f = np.asarray(f, dtype = float)
+        shape = f.shape
+        f = f.ravel()
         DHc = self.DHc*self._Yprod(f)['H2O']/(self._nH/2)*self.MW[self.reac]/self.MW['H2O'] # heat of combustion [J/kg_total_products]
         Hdict = self._Hdict(T_reac, npoints = numpoints)
         H0 = self._H(T_reac, self._Yreac(f), Hdict)
         H0 *= self._MWmix(self._Yreac(f))/self._MWmix(self._Yprod(f)) #J/kg
         H = H0 + DHc
-        T = optimize.root(lambda T: self._H(T, self._Yprod(f), Hdict) - H, T_reac*np.ones_like(np.array(f)))['x']
-        return T
+        Yprod = dict([[spec, np.broadcast_to(Y, f.shape)] for spec, Y in self._Yprod(f).items()])
+
+        def resid(T, i):
+            return self._H(T, dict([[spec, Y[i]] for spec, Y in Yprod.items()]), Hdict) - H[i]
+
+        # bracket the roots (enthalpies are extrapolated beyond the interpolating functions)
+        allpts = np.arange(f.size)
+        lo, hi = np.full(f.shape, 0.5*T_reac), np.full(f.shape, 6000.)
+        for _ in range(maxiter):
+            i = allpts[resid(lo, allpts) > 0]
+            if i.size == 0:
+                break
+            lo[i] *= 0.5
+        for _ in range(maxiter):
+            i = allpts[resid(hi, allpts) < 0]
+            if i.size == 0:
+                break
+            hi[i] *= 2
+
+        T = np.clip(np.full(f.shape, float(T_reac)), lo, hi)
+        active = np.ones(f.shape, dtype = bool)
+        for _ in range(maxiter):
+            i = allpts[active]
+            if i.size == 0:
+                break
+            Ti = T[i]
+            g = resid(Ti, i)
+            lo[i] = np.where(g < 0, Ti, lo[i])
+            hi[i] = np.where(g > 0, Ti, hi[i])
+            dT = 1e-6*Ti
+            dgdT = (resid(Ti + dT, i) - resid(Ti - dT, i))/(2*dT)
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                Tnew = Ti - g/dgdT
+            bisect = ~np.isfinite(Tnew) | (Tnew <= lo[i]) | (Tnew >= hi[i])
+            Tnew[bisect] = 0.5*(lo[i][bisect] + hi[i][bisect])
+            T[i] = Tnew
+            active[i] = (g != 0) & (np.abs(Tnew - Ti) > xtol*Ti)
+        if active.any():
+            warnings.warn('Combustion temperature did not converge for {} mixture fractions.'.format(active.sum()),
+                          category = PhysicsWarning)
+        return T.reshape(shape)
+
+
+_COMBUSTION_FORMAT_VERSION = 1
+_combustion_cache = {}  # process-wide cache of Combustion objects, keyed by (species, T, P, numpoints)
+_combustion_cache_settings = {'directory': None}
+
+
+def get_combustion(fluid, numpoints=100, verbose=False):
+    '''
+    Returns the combustion chemistry of a fluid, from the process-wide cache if it has
+    been previously calculated (or from the cache directory, if one has been set).
+    The returned object is shared and should not be modified (e.g., through reinitilize).
+
+    Parameters
+    ----------
+    fluid : hyram.phys.Fluid object
+        fluid being combusted
+    numpoints : int
+        number of points to solve for temperature to create interpolating functions
+    verbose: boolean
+        whether to include some print statements
+
+    Returns
+    -------
+    Combustion object
+    '''
+    key = (fluid.species, float(fluid.T), float(fluid.P), int(numpoints))
+    chem = _combustion_cache.get(key)
+    if chem is not None:
+        return chem
+    directory = _combustion_cache_settings['directory']
+    if directory is not None:
+        tag = hashlib.sha1(repr((_COMBUSTION_FORMAT_VERSION,) + key).encode()).hexdigest()[:16]
+        filename = os.path.join(directory, 'combustion_{}.npz'.format(tag))
+        if os.path.exists(filename):
+            chem = Combustion._from_arrays(fluid, np.load(filename))
+    if chem is None:
+        chem = Combustion(fluid, numpoints, verbose)
+        if directory is not None:
+            np.savez(filename, **chem._to_arrays())
+    _combustion_cache[key] = chem
+    return chem
+
+
+def set_combustion_cache_dir(directory):
+    '''
+    Sets the directory where combustion tables are saved (and loaded from) by get_combustion,
+    so that they can be reused by other processes.
+
+    Parameters
+    ----------
+    directory: string or None
+        directory to save tables in, created if it does not exist; if None, tables are only kept in memory
+    '''
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    _combustion_cache_settings['directory'] = directory
+
+
+def clear_combustion_cache():
+    '''removes all combustion chemistry from the in-memory cache (saved tables are not deleted)'''
+    _combustion_cache.clear()
@@ -13,7 +13,7 @@ import scipy as sp
 
 from ._fuel_props import FuelProperties
 from ._plots import plot_sliced_contour
-from ._utils import get_distance_to_effect
+from ._utils import get_distance_to_effect, split_direction
 from . import _overpressure_data as opdata
 
 class Generic_overpressure_method:
@@ -79,10 +79,9 @@ class Generic_overpressure_method:
                                 self.jet_object.S[::-1])
 
             # Get x and y coordinates from jet based on streamline coordinate
-            jet_x = np.interp(s_coord, self.jet_object.S, self.jet_object.x)
-            jet_y = np.interp(s_coord, self.jet_object.S, self.jet_object.y)
+            jet_state = self.jet_object.state(s_coord)
 
-            self.origin = (jet_x, jet_y, 0)
+            self.origin = (jet_state['x'], jet_state['y'], 0)
 
     @staticmethod
     def calc_distance(locations:list, origin) -> list:
@@ -287,6 +286,48 @@ class Generic_overpressure_method:
             distance = distance_from_leakpoint_to_overpressure_origin + distance_from_overpressure_origin
         return distance
 
+    def hazard_distance_table(self, thresholds, directions=('x', '-x', 'y', 'z'), quantity='overpressure'):
+        """
+        Calculate distances from leak point to several overpressure or impulse levels in several directions,
+        solving for all of the levels together (see calc_distance_to_overpressure and calc_distance_to_impulse)
+
+        Parameters
+        ----------
+        thresholds : array-like
+            Overpressure (Pa) or impulse (Pa*s) levels
+        directions : list of strings (optional)
+            Directions in which to calculate the distances,
+            each 'x', 'y', or 'z', optionally preceded by '+' or '-'
+            (default is ('x', '-x', 'y', 'z'))
+        quantity : 'overpressure' or 'impulse' (optional)
+            Quantity of the thresholds
+            (default is 'overpressure')
+
+        Returns
+        -------
+        table : dict
+            Real distances (m) to each of the thresholds from leak-point, keyed by direction
+        """
+        thresholds = np.asarray(thresholds, dtype=float)
+        if quantity == 'overpressure':
+            scaled_overpressure = self.calc_scaled_overpressure(overpressure=thresholds)
+            scaled_distance = self.get_scaled_distance_from_scaled_overpressure(scaled_overpressure=scaled_overpressure)
+        elif quantity == 'impulse':
+            scaled_impulse = self.calc_scaled_impulse(impulse=thresholds)
+            scaled_distance = self.get_scaled_distance_from_scaled_impulse(scaled_impulse=scaled_impulse)
+        else:
+            raise ValueError(f"Quantity ('{quantity}') must be 'overpressure' or 'impulse'")
+        distance_from_overpressure_origin = self.calc_unscaled_distance(scaled_distance=scaled_distance)  # m
+        table = {}
+        for direction in directions:
+            axis, negative_direction = split_direction(direction)
+            distance_from_leakpoint_to_overpressure_origin = self.origin['xyz'.index(axis)]
+            if negative_direction:
+                table[direction] = distance_from_leakpoint_to_overpressure_origin - distance_from_overpressure_origin
+            else:
+                table[direction] = distance_from_leakpoint_to_overpressure_origin + distance_from_overpressure_origin
+        return table
+
     def calc_scaled_impulse(self, impulse):
         # Placeholder method; this will be over-written by sub-classes below
         scaled_impulse = np.full_like(impulse, np.nan)
@@ -303,7 +344,8 @@ class Generic_overpressure_method:
                                  contours=None,
                                  nx=50, ny=50, nz=50,
                                  xlims=None, ylims=None, zlims=None,
-                                 savefig=False):
+                                 savefig=False, fields=None, return_fields=False,
+                                 max_workers=None, progressive=False):
         '''
         Plots contour slices of overpressure levels
 
@@ -325,11 +367,20 @@ class Generic_overpressure_method:
             limits for x, y, and z axes
         savefig: Boolean (optional)
             determines if figure file is saved
+        fields: dict (optional)
+            fields returned by a previous call with return_fields=True, to re-plot without recalculating
+        return_fields: Boolean (optional)
+            whether to also return the calculated fields (see plot_sliced_contour)
+        max_workers: int (optional)
+            number of threads over which the slices are evaluated
+        progressive: Boolean (optional)
+            whether to evaluate a coarse grid first and then refine only near the contour levels
 
         Returns
         -------
         If savefig is True, returns filename corresponding plot.
         If savefig is false, returns fig object.
+        If return_fields is True, returns a tuple of the above and the fields.
         '''
         if contours is None:
             contours = [5, 16, 70]  # kPa
@@ -341,7 +392,9 @@ class Generic_overpressure_method:
                                               self.calculate_overpressure_for_list_of_locations,
                                               self.origin, colorbar_label,
                                               title=title, savefig=savefig,
-                                              directory=directory, filename=plot_filename)
+                                              directory=directory, filename=plot_filename,
+                                              fields=fields, return_fields=return_fields,
+                                              max_workers=max_workers, progressive=progressive)
         return fig_or_filepath
 
     def plot_impulse_sliced(self, title=None,
@@ -350,7 +403,8 @@ class Generic_overpressure_method:
                             contours=None,
                             nx=50, ny=50, nz=50,
                             xlims=None, ylims=None, zlims=None,
-                            savefig=False):
+                            savefig=False, fields=None, return_fields=False,
+                            max_workers=None, progressive=False):
         '''
         Plots contour slices of impulse levels
 
@@ -376,11 +430,20 @@ class Generic_overpressure_method:
             limits for x, y, and z axes
         savefig: Boolean (optional)
             determines if figure file is saved
+        fields: dict (optional)
+            fields returned by a previous call with return_fields=True, to re-plot without recalculating
+        return_fields: Boolean (optional)
+            whether to also return the calculated fields (see plot_sliced_contour)
+        max_workers: int (optional)
+            number of threads over which the slices are evaluated
+        progressive: Boolean (optional)
+            whether to evaluate a coarse grid first and then refine only near the contour levels
 
         Returns
         -------
         If savefig is True, returns filename corresponding plot.
         If savefig is false, returns fig object.
+        If return_fields is True, returns a tuple of the above and the fields.
         '''
         if contours is None:
             contours = [0.13, 0.18, 0.27]  # kPa*s
@@ -392,7 +455,9 @@ class Generic_overpressure_method:
                                               self.calculate_impulse_for_list_of_locations,
                                               self.origin, colorbar_label,
                                               title=title, savefig=savefig,
-                                              directory=directory, filename=plot_filename)
+                                              directory=directory, filename=plot_filename,
+                                              fields=fields, return_fields=return_fields,
+                                              max_workers=max_workers, progressive=progressive)
         return fig_or_filepath
 
 
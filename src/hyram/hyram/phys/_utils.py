@@ -6,18 +6,26 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 import numpy as np
+from scipy import optimize
 
 
 def get_distance_to_effect(value, from_point, direction, effect_func, *args,
                            max_distance=500, interpolation_points=10000,
-                           negative_direction=False, **kwargs):
+                           negative_direction=False, method='brentq', tol=1e-6,
+                           bracket_points=41, **kwargs):
     """
     Calculates the distance from some starting point to a physical effect value of interest
 
+    The effect is evaluated at log-spaced distances out to max_distance, which bracket the
+    farthest distance at which the effect crosses each value, and each crossing is then found
+    with Brent's method, reusing every effect evaluation for all of the values.  If the effect
+    does not decrease monotonically beyond its largest value, the evaluation at
+    interpolation_points evenly spaced distances ('scan' method) is used instead.
+
     Parameters
     ----------
     value: float or array-like
-        effect value of interest
+        effect value(s) of interest
     from_point: array-like of length 3
         (x, y, z) location of reference point
         from which distance will be measured
@@ -34,11 +42,19 @@ def get_distance_to_effect(value, from_point, direction, effect_func, *args,
         (default value is 500)
     interpolation_points: int (optional)
         number of distance-points at which to calculate effects
-        and use for interpolation
+        and use for interpolation in the 'scan' method
         (default value is 10,000)
     negative_direction : Boolean (optional)
         whether or not to look in the negative direction instead of positive
         (default is False)
+    method: 'brentq' or 'scan' (optional)
+        whether to solve for the distances (default) or to interpolate between evenly spaced distances
+    tol: float (optional)
+        absolute tolerance (m) of the distances for the 'brentq' method
+        (default value is 1e-6)
+    bracket_points: int (optional)
+        number of log-spaced distance-points used to bracket the distances in the 'brentq' method
+        (default value is 41)
     **kwargs: keyword arguments, optional
         if provided, passed to effect_func
 
@@ -49,26 +65,167 @@ def get_distance_to_effect(value, from_point, direction, effect_func, *args,
         calculated from the from_point
         along the direction axis specified
     """
-    # TODO: Should this be changed to a solver instead of interpolation? Does 10,000 calculations
-    if negative_direction:
-        max_distance = -1 * max_distance
-    distances = np.linspace(max_distance, 0, interpolation_points)
-    if direction == 'x':
-        x_values = from_point[0] + distances
-        y_values = from_point[1] * np.ones_like(distances)
-        z_values = from_point[2] * np.ones_like(distances)
-    elif direction == 'y':
-        x_values = from_point[0] * np.ones_like(distances)
-        y_values = from_point[1] + distances
-        z_values = from_point[2] * np.ones_like(distances)
-    elif direction == 'z':
-        x_values = from_point[0] * np.ones_like(distances)
-        y_values = from_point[1] * np.ones_like(distances)
-        z_values = from_point[2] + distances
-    else:
+    if direction not in ['x', 'y', 'z']:
         raise ValueError(f"Direction ('{direction}') must be 'x', 'y', or 'z'")
-    effects = effect_func(x_values, y_values, z_values, *args, **kwargs)
+    if method not in ['brentq', 'scan']:
+        raise ValueError(f"Method ('{method}') must be 'brentq' or 'scan'")
+    axis = 'xyz'.index(direction)
+    sign = -1 if negative_direction else 1
+
+    def effects_at(distances):
+        points = np.tile(np.asarray(from_point, dtype=float), (len(distances), 1))
+        points[:, axis] += sign * np.asarray(distances, dtype=float)
+        return np.asarray(effect_func(points[:, 0], points[:, 1], points[:, 2], *args, **kwargs), dtype=float)
+
+    if method == 'brentq':
+        distance = _solve_distance_to_effect(value, effects_at, max_distance, tol, bracket_points)
+        if distance is not None:
+            return sign * distance
+
+    distances = np.linspace(max_distance, 0, interpolation_points)
+    effects = effects_at(distances)
     # effect values must be monotonically increasing
     index_max_value = np.argmax(effects)
     distance = np.interp(value, effects[:index_max_value], distances[:index_max_value])
-    return distance
+    return sign * distance
+
+
+def split_direction(direction):
+    """
+    Splits a direction such as 'x', '+y', or '-z' into its axis ('x', 'y', or 'z')
+    and whether it is the negative direction along that axis
+    """
+    axis = direction.lstrip('+-')
+    if axis not in ['x', 'y', 'z'] or len(direction) - len(axis) > 1:
+        raise ValueError(f"Direction ('{direction}') must be 'x', 'y', or 'z', optionally preceded by '+' or '-'")
+    return axis, direction.startswith('-')
+
+
+def _solve_distance_to_effect(value, effects_at, max_distance, tol, bracket_points):
+    """
+    Solves for the farthest distance (up to max_distance) at which an effect is equal to each value
+    (see get_distance_to_effect), where effects_at(distances) returns the effects at an array of distances;
+    returns None if the effect does not decrease monotonically beyond its largest bracketing value
+
+    Effects that are infinite close to the starting point (e.g., overpressure from a point source) are
+    bracketed from the closest distance at which they are finite, and values larger than the effect there
+    are found by moving toward the starting point. Monotonicity is only checked at the bracketing points,
+    so an effect that rises and falls between two of them is not detected.
+    """
+    distances = np.append(0, max_distance * np.logspace(-5, 0, bracket_points - 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effects = effects_at(distances)
+    finite = np.isfinite(effects)
+    i_finite = np.argmax(finite)
+    # non-finite effects are only allowed as an infinite effect closest to the starting point
+    if not finite.any() or not finite[i_finite:].all() or np.any(effects[:i_finite] != np.inf):
+        return None
+    singular = i_finite > 0
+    distances, effects = distances[i_finite:], effects[i_finite:]
+    i_peak = np.argmax(effects)
+    if np.any(np.diff(effects[i_peak:]) > 0):
+        return None
+    known = dict(zip(distances, effects))
+
+    def effect(distance):
+        if distance not in known:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                known[distance] = effects_at([distance])[0]
+        return known[distance]
+
+    values = np.asarray(value, dtype=float)
+    d_peak = distances[i_peak]
+    if np.any(values > effects[i_peak]) and not singular:
+        # largest value may be between bracketing points
+        lower, upper = distances[max(i_peak - 1, 0)], distances[min(i_peak + 1, len(distances) - 1)]
+        res = optimize.minimize_scalar(lambda d: -effect(d), bounds=(lower, upper), method='bounded',
+                                       options={'xatol': tol})
+        if effect(res.x) > effects[i_peak]:
+            d_peak = res.x
+
+    solution = np.empty(values.size)
+    for k, v in enumerate(values.ravel()):
+        ds = np.array(sorted(d for d in known if d >= d_peak))
+        fs = np.array([known[d] for d in ds])
+        if v >= fs[0] and singular and i_peak == 0:
+            # the effect increases toward the starting point, where it is infinite
+            # (bisection, as the effect may be infinite within the bracket)
+            d_min = min(tol, ds[0])
+            if effect(d_min) > v:
+                solution[k] = optimize.bisect(lambda d: effect(d) - v, d_min, ds[0], xtol=tol)
+            else:
+                solution[k] = d_min
+        elif v >= fs[0]:
+            solution[k] = ds[0]
+        elif v <= fs[-1]:
+            solution[k] = max_distance
+        else:
+            j = np.nonzero(fs >= v)[0][-1]
+            solution[k] = optimize.brentq(lambda d: effect(d) - v, ds[j], ds[j + 1], xtol=tol)
+    return solution.reshape(values.shape)[()]
+
+
+def trajectory_jacobian(integrals, system, S, ind_vars, integral_columns, theta_index, *args):
+    """
+    Jacobian of governing equations written in terms of d/dS of (..., theta, ..., x, y), where
+    the last two equations are dx/dS = cos(theta) and dy/dS = sin(theta), and the others are the
+    solution of a linear system, LHS @ d/dS(...) = RHS, assembled in closed form from radial integrals.
+
+    The radial integrals are differenced (second-order one-sided differences, with relative steps toward zero
+    so that bounded variables such as mass or mixture fractions stay within their limits) by evaluating them
+    for the state and all of the perturbed states in a single call. The closed-form assembly of the system is
+    differentiated by complex steps, and the derivative of its solution follows from
+    d/dz_j(LHS^-1 @ RHS) = LHS^-1 @ (dRHS/dz_j - dLHS/dz_j @ LHS^-1 @ RHS).
+    The trajectory rows are analytic, and x and y do not appear in the equations.
+
+    Parameters
+    ----------
+    integrals: callable
+        integrals(states, *args) returns the radial integrals (shape (k, m)) for an array of k states
+        (shape (k, len(ind_vars)))
+    system: callable
+        system(S, ind_vars, integrals, *args) returns (LHS, RHS), and must accept complex ind_vars and integrals
+    S: float
+        distance along the centerline (m)
+    ind_vars: array-like
+        independent variables
+    integral_columns: list of int
+        indices of the variables that the radial integrals depend on
+    theta_index: int
+        index of the angle, theta (radians)
+    *args: positional arguments (optional)
+        passed to integrals and system
+
+    Returns
+    -------
+    jac: ndarray
+        jac[i, j] = d(fun_i)/d(ind_vars_j)
+    """
+    ind_vars = np.array(ind_vars, dtype=float)
+    n = len(ind_vars)
+    eps = np.cbrt(np.finfo(float).eps)
+    states = np.tile(ind_vars, (2*len(integral_columns) + 1, 1))
+    for k, j in enumerate(integral_columns):
+        h = -eps*ind_vars[j] if j != theta_index and ind_vars[j] != 0 else -eps
+        states[2*k + 1, j] += h
+        states[2*k + 2, j] += 2*h
+    I = np.asarray(integrals(states, *args), dtype=float)
+    dI = np.zeros((n,) + I.shape[1:])
+    for k, j in enumerate(integral_columns):
+        a, b = states[2*k + 1:2*k + 3, j] - ind_vars[j]  # exactly representable steps
+        dI[j] = -(a + b)/(a*b)*I[0] + b/(a*(b - a))*I[2*k + 1] - a/(b*(b - a))*I[2*k + 2]
+    LHS, RHS = system(S, ind_vars, I[0], *args)
+    dz = np.linalg.solve(LHS, RHS)
+    h = 1e-30
+    dRHS = np.zeros((len(RHS), n - 2))
+    for j in range(n - 2):
+        z = ind_vars.astype(complex)
+        z[j] += 1j*h
+        dLHS_j, dRHS_j = system(S, z, I[0] + 1j*h*dI[j], *args)
+        dRHS[:, j] = np.imag(dRHS_j)/h - (np.imag(dLHS_j)/h) @ dz
+    jac = np.zeros((n, n))
+    jac[:-2, :-2] = np.linalg.solve(LHS, dRHS)
+    theta = ind_vars[theta_index]
+    jac[-2, theta_index] = -np.sin(theta)
+    jac[-1, theta_index] = np.cos(theta)
+    return jac
@@ -7,6 +7,7 @@ If not, see https://www.gnu.org/licenses/.
 """
 
 from . import analysis
+from .analysis import Analysis
 from .component_failure import ComponentFailureSet, ComponentFailure
 from .component_set import ComponentSet
 from . import consequence
@@ -18,4 +19,6 @@ from .leaks import LeakSizeResult, Leak
 from . import pipe_size
 from .positions import PositionGenerator
 from . import probits
-from . import risk
\ No newline at end of file
+from .result_cache import PhysicsResultCache
+from . import risk
+from . import uncertainty
\ No newline at end of file
@@ -6,6 +6,9 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+import concurrent.futures
+import copy
+import inspect
 import logging
 
 import numpy as np
@@ -13,12 +16,40 @@ import numpy as np
 from . import effects, ignition_probs, leak_frequency, pipe_size, risk, event_tree, consequence
 from . import component_set
 from . import positions as qra_positions
+from . import result_cache as qra_result_cache
+from . import uncertainty
 from ..phys import api as phys_api
-from ..phys import _comps
+from ..phys import _comps, _flame, _jet, _release_state
 from ..utilities import misc_utils
 
 log = logging.getLogger(__name__)
 
+# process pool shared by repeated analyses run with max_workers, so that worker start-up is only paid once
+_process_pool = None
+_process_pool_workers = None
+
+
+def _get_process_pool(max_workers):
+    '''
+    Returns the shared process pool with the given number of workers, (re)creating it if needed
+    '''
+    global _process_pool, _process_pool_workers
+    if _process_pool is None or _process_pool_workers != max_workers:
+        shutdown_process_pool()
+        _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        _process_pool_workers = max_workers
+    return _process_pool
+
+
+def shutdown_process_pool():
+    '''
+    Shuts down the process pool shared by analyses run with max_workers (if one has been started)
+    '''
+    global _process_pool, _process_pool_workers
+    if _process_pool is not None:
+        _process_pool.shutdown()
+    _process_pool, _process_pool_workers = None, None
+
 
 def conduct_analysis(pipe_outer_diam, pipe_thickness,
                      amb_temp, amb_pres,
@@ -44,10 +75,16 @@ def conduct_analysis(pipe_outer_diam, pipe_thickness,
                      event_tree_override=None,
                      verbose=False,
                      output_dir=None,
-                     create_plots=True):
+                     create_plots=True,
+                     executor=None, max_workers=None,
+                     cache_dir=None, cache_max_bytes=256*2**20,
+                     uncertainty_samples=None, uncertainty_method='lhs'):
     """
     Quantitative risk assessment including scenario calculations and harm modeling
 
+    Runs a new Analysis object; use an Analysis object directly to recalculate
+    only the stages affected by changed inputs
+
     Default values for optional overrides (to not use override) is -1 due to type restrictions from C# calls
 
     Parameters
@@ -175,6 +212,37 @@ def conduct_analysis(pipe_outer_diam, pipe_thickness,
     create_plots : bool
         Whether output plots should be created
 
+    executor : concurrent.futures.Executor object
+        Executor used to calculate the physics of the leak sizes in parallel
+        Results are gathered in the order of the leak sizes, so they are identical to a serial analysis
+        Default is None, which uses max_workers
+
+    max_workers : int
+        Number of worker processes used to calculate the physics of the leak sizes in parallel
+        (only used if executor is None). The process pool is kept and reused by later analyses
+        with the same number of workers (see shutdown_process_pool)
+        Default is None, which calculates the leak sizes serially
+
+    cache_dir : str
+        Directory of an on-disk store of physics results (see PhysicsResultCache), keyed by the inputs
+        of the thermal and overpressure calculations of each leak size, so that analyses that only change
+        other inputs (e.g., probits, exposure time, ignition probabilities, occupant hours, frequencies)
+        load the heat fluxes, overpressures, and impulses rather than recalculating them
+        Default is None, which calculates all physics results
+
+    cache_max_bytes : int
+        Size limit (bytes) of the cache directory, beyond which least-recently-used results are removed
+        Default is 256 MiB
+
+    uncertainty_samples : int
+        Number of samples of the leak frequencies and component failure probabilities used to propagate
+        their uncertainty to the risk metrics (see Analysis.uncertainty), using rand_seed
+        Default is None, which does not propagate uncertainty
+
+    uncertainty_method : {'lhs', 'mc'}
+        Latin hypercube or Monte Carlo sampling of the uncertainty
+        Default is 'lhs'
+
     Returns
     -------
     results : dict
@@ -205,275 +273,581 @@ def conduct_analysis(pipe_outer_diam, pipe_thickness,
             position_impulses : 2d array
                 impulse data [Pa] per leak per position,
                 e.g. for 9 positions, 9x5 array
+            flame_summaries : list of dicts
+                mass flow rate, visible length, width, and radiant power of the flame for each leak size
+            jet_summaries : list of dicts
+                mass flow rate, flammable mass, and overpressure origin of the jet for each leak size
+            physics_cache : dict or None
+                hits, misses, evictions, and size of the physics result cache, None if cache_dir is None
+            uncertainty : dict or None
+                mean and 5th, 50th, and 95th percentiles of the PLL, FAR, and AIR,
+                None if uncertainty_samples is None
     """
-    if probit_overp_id in ['head', 'coll'] and overp_method == 'bauwens':
-        impulse_probit_error_msg = ('Overpressure method "bauwens"'
-                                    + ' does not produce impulse values,'
-                                    + ' and so cannot be used with'
-                                    + f' overpressure probit "{probit_overp_id}"')
-        raise ValueError(impulse_probit_error_msg)
-
-    params = locals()  # for logging
-    sorted_params = sorted(params)
-
-    if output_dir is None:
-        output_dir = misc_utils.get_temp_folder()
-
-    log.info("")
-    log.info("=== BEGINNING ANALYSIS ===")
-    log.info("")
-    log.info("PARAMETERS")
-    for param_name in sorted_params:
-        param_val = params[param_name]
-        if isinstance(param_val, list) and isinstance(param_val[0], component_set.ComponentSet):
-            log.info("Component Sets:")
-            for comp_set in param_val:
-                log.info(f"{comp_set}")
-        else:
-            log.info("{}: {}".format(param_name, str(param_val)))
-
-    amb_fluid = phys_api.create_fluid('AIR', amb_temp, amb_pres)
-    rel_fluid = phys_api.create_fluid(rel_species, rel_temp, rel_pres, phase=rel_phase)
-    if rel_temp is None:
-        rel_temp = rel_fluid.T
-    if amb_temp is None:
-        amb_temp = amb_fluid.T
-
-    # Each occupant row in GUI is represented as group and stored as dict inside list
-    # Massage into required format for phys module [count, (xdistr, xa, xb), (ydistr...]
-    loc_distributions = []
-    total_occupants = 0
-    total_occupant_hours = 0
-    for group_dict in occupant_input_list:
-        num_occupants = int(group_dict['count'])
-        loc_distribution = [num_occupants,
-                            (group_dict['xdistr'], group_dict['xa'], group_dict['xb']),
-                            (group_dict['ydistr'], group_dict['ya'], group_dict['yb']),
-                            (group_dict['zdistr'], group_dict['za'], group_dict['zb'])]
-        loc_distributions.append(loc_distribution)
-        total_occupants += num_occupants
-        total_occupant_hours += int(group_dict['hours'] * num_occupants)
-    if total_occupant_hours == 0:
-        occupant_avg_hours = 0
-    else:
-        occupant_avg_hours = total_occupant_hours / total_occupants
-
-    if verbose:
-        component_set_log_msg = ""
-        for compset in component_sets:
-            if compset.num_components:
-                component_set_log_msg += "{}\n".format(str(compset))
-        log.info(f"Location distributions: {loc_distributions}")
-        log.info(f"{total_occupants} Occupants for {occupant_avg_hours} average hours")
-        log.info("")
+    params = locals()
+    return Analysis(**params).run()
+
 
-    leak_results, leak_result100 = leak_frequency.compute_leak_frequencies(leak_sizes,
-                                                                           release_freq_overrides,
-                                                                           component_sets)
-    num_leak_sizes = len(leak_results)
-
-    # Account for non-leak fueling failure contributors in 100% release only. Use override value if provided
-    leak_result100.set_failures(component_failure_set)
-    total_leak_freqs = np.array([leak_res.total_release_freq for leak_res in leak_results])
-
-    log.info("RELEASE FREQUENCIES:")
-    for leak_result in leak_results[:-1]:
-        log.info(f" {leak_result.leak_size:0.2f}% - {leak_result.total_release_freq:.3g}")
-    log.info(f"  {leak_result100.leak_size:.2f}% - {leak_result100.total_release_freq:.3g}")
-
-    # Compute leak diameters and discharge rates, one per leak size
-    pipe_inner_diam = pipe_size.calc_pipe_inner_diameter(pipe_outer_diam, pipe_thickness)
-    pipe_flow_area = pipe_size.calc_pipe_flow_area(pipe_inner_diam)
-    log.info("System pipe inner diameter {:.3g} m, area {:.3g} m^2".format(pipe_inner_diam, pipe_flow_area))
-    orifices = []
-    discharge_rates = []
-    for leak_result in leak_results:
-        orifice_leak_diam = pipe_size.calc_orifice_diameter(pipe_flow_area, leak_result.leak_size/100)
-        orifice = _comps.Orifice(orifice_leak_diam, discharge_coeff)
-        orifices.append(orifice)
-        discharge_rate = orifice.mdot(orifice.flow(rel_fluid))
-        discharge_rates.append(discharge_rate)
-        log.info("For {}% leak size: orifice leak diameter: {:.3g} m, discharge rate: {:.3g} kg/s".format(leak_result.leak_size, orifice_leak_diam, discharge_rate))
-
-    # Determine ignition probabilities for each leak size based on discharge rates and thresholds
-    immed_ign_probs_per_leak = []
-    delay_ign_probs_per_leak = []
-    for rate in discharge_rates:
-        (immed_ign_prob, delayed_ign_prob) = ignition_probs.get_ignition_probability(rate,
-                                                                                     ign_thresholds,
-                                                                                     immed_ign_probs,
-                                                                                     delayed_ign_probs)
-        immed_ign_probs_per_leak.append(immed_ign_prob)
-        delay_ign_probs_per_leak.append(delayed_ign_prob)
-        log.info("Flow rate {:.3g} (kg/s) ignition probabilities: immed {}, delayed {}".format(rate, immed_ign_prob, delayed_ign_prob))
-    immed_ign_probs_per_leak = np.array(immed_ign_probs_per_leak)
-    delay_ign_probs_per_leak = np.array(delay_ign_probs_per_leak)
-
-    # Evaluate event tree
-    # Use override event tree specification if provided
-    if event_tree_override is None:
-        events_in_tree = []
-        events_in_tree.append({'name': 'Shutdown',
-                               'key': 'shut',
-                               'event_prob': detection_credit,
-                               'consequence_type': None})
-        events_in_tree.append({'name': 'No Ignition',
-                               'key': 'noig',
-                               'event_prob': 1 - (immed_ign_probs_per_leak + delay_ign_probs_per_leak),
-                               'consequence_type': None})                       
-        events_in_tree.append({'name': 'Jetfire',
-                               'key': 'jetf',
-                               'event_prob': immed_ign_probs_per_leak / (immed_ign_probs_per_leak + delay_ign_probs_per_leak),
-                               'consequence_type': 'thermal'})
-        events_in_tree.append({'name': 'Explosion',
-                               'key': 'expl',
-                               'event_prob': 1,
-                               'consequence_type': 'overp'})
-        end_states = event_tree.build_event_tree(events_in_tree, num_leak_sizes)
-
-    else:
-        end_states = event_tree.build_event_tree(event_tree_override, num_leak_sizes)
-
-    # Generate positions
-    posgen = qra_positions.PositionGenerator(loc_distributions,
-                                             excl_radius,
-                                             rand_seed)
-    locations = posgen.locs
-    transposed_positions = np.array(locations).transpose()
-
-    # Calculate harm/hazard effects at each position for each leak size
-    # Calculate thermal effects
-    log.info("Computing thermal effects...")
-    rel_angle_rads = np.radians(rel_angle)
-    try:
-        flux_dict = effects.calc_thermal_effects(amb_fluid,
-                                                 rel_fluid,
-                                                 rel_angle=rel_angle_rads,
-                                                 site_length=facil_length,
-                                                 site_width=facil_width,
-                                                 orifices=orifices,
-                                                 rel_humid=rel_humid,
-                                                 not_nozzle_model=nozzle_model,
-                                                 locations=locations,
-                                                 create_plots=create_plots,
-                                                 output_dir=output_dir,
-                                                 verbose=verbose)
-    except ValueError as err:
-        if type(rel_species) == dict:
-            raise ValueError('Invalid blend provided')
-
-    log.info("Thermal effects analysis complete")
-    qrads = flux_dict['fluxes']
-    qrad_plot_files = flux_dict['all_pos_files']
-    log.info("Heat flux data:\n{}".format(qrads))
-
-    # Calculate overpressure effects
-    log.info("Computing overpressure effects...")
-    overp_dict = effects.calc_overp_effects(orifices,
-                                            nozzle_model,
-                                            rel_fluid,
-                                            amb_fluid,
-                                            rel_angle,
-                                            locations,
-                                            facil_length,
-                                            facil_width,
-                                            overp_method,
-                                            BST_mach_flame_speed,
-                                            TNT_equivalence_factor,
-                                            create_plots=create_plots,
-                                            output_dir=output_dir,
-                                            verbose=verbose)
-    log.info("Overpressure effects analysis complete")
-    overpressures = overp_dict['overpressures']
-    impulses = overp_dict['impulses']
-    overp_plot_files = overp_dict['all_pos_overp_files']
-    impulse_plot_files = overp_dict['all_pos_impulse_files']
-    log.info("Overpressure data:\n{}".format(overpressures))
-    log.info("Impulse data:\n{}".format(impulses))
-
-    # Estimate fatality probabilities
-    event_consequences = []
-    physical_responses = {'qrads': qrads,
-                          'overpressures': overpressures,
-                          'impulses': impulses}
-    consequence_modeling_decisions = {'probit_thermal_id': probit_thermal_id,
-                                      'exposure_time': exposure_time,
-                                      'probit_overp_id': probit_overp_id}
-    for end_state in end_states:
-        event_consequences.append(consequence.calculate_event_consequence(end_state.consequence_type,
-                                                                          num_leak_sizes,
-                                                                          total_occupants,
-                                                                          physical_responses,
-                                                                          consequence_modeling_decisions))
-
-    # Calculate risk metrics
-
-    # Risk for each scenario
-    log.info("Calculating frequencies and consequences for each scenario...")
-    scenario_freqs = []
-    scenario_fatalities = []
-    for i in range(num_leak_sizes):
-        # Compute expected events per year for this leak size
-        for end_state, consequence_outcome in zip(end_states, event_consequences):
-            scenario_freqs.append(end_state.end_state_probability[i] * total_leak_freqs[i])
-            scenario_fatalities.append(consequence_outcome[i])
-
-    # Overall risk metrics
-    log.info("Calculating risk for each scenario...")
-    plls = risk.calc_all_plls(scenario_freqs, scenario_fatalities)
-    log.info("Calculating overall risk metrics and risk contributions for each scenario...")
-    total_pll, pll_contributions = risk.calc_risk_contributions(plls)
-    far = risk.calc_far(total_pll, total_occupants)
-    air = risk.calc_air(far, occupant_avg_hours)
-    
-
-    # Output results
-
-    # Collect results for each leak size
-    log.info("Results for each leak size:")
-    for i, leak_result in enumerate(leak_results):
-        for j, end_state in enumerate(end_states):
-            leak_result.list_event_names.append(end_state.name)
-            leak_result.list_event_keys.append(end_state.key)
-            leak_result.list_p_events.append(np.around(end_state.end_state_probability[i], 20))
-            leak_result.list_avg_events.append(np.around(scenario_freqs[i*len(end_states)+j], 20))
-            leak_result.list_pll_contrib.append(np.around(pll_contributions[i*len(end_states)+j], 20))
-            # event data in dict format for easier GUI consumption
-            leak_result.event_dicts = leak_result.get_result_dicts()
-
-        leak_result.mass_flow_rate = discharge_rates[i]
-        leak_result.leak_diam = orifices[i].d
-        log.info(str(leak_result))
-
-    # Re-shape harm values into position table
-    position_qrads_reshape = (qrads.reshape((num_leak_sizes, total_occupants))).T
-    position_overps_reshape = (overpressures.reshape((num_leak_sizes, total_occupants))).T
-    position_impulses_reshape = (impulses.reshape((num_leak_sizes, total_occupants))).T
-
-    results = {
-        'total_pll': total_pll,
-        'far': far,
-        'air': air,
-        'leak_results': leak_results,
-        'qrad_plot_files': qrad_plot_files,
-        'overp_plot_files': overp_plot_files,
-        'impulse_plot_files': impulse_plot_files,
-        'positions': transposed_positions,
-        'position_qrads': position_qrads_reshape,
-        'position_overps': position_overps_reshape,
-        'position_impulses': position_impulses_reshape
-    }
-
-    if verbose:
-        print("")
-        for leak_res in leak_results:
-            print(leak_res)
-        print("PLL: {:.5E}".format(total_pll))
-        print("FAR: {:.5E}".format(far))
-        print("AIR: {:.5E}\n".format(air))
-
-    # Print one result key/val pair per line
-    log.info("\nANALYSIS RESULTS:\n{}".format("\n".join(["{}: {}".format(key, val) for key, val in results.items()])))
-    log.info("=== ANALYSIS COMPLETE ===")
-
-    return results
+class Analysis:
+    """
+    Quantitative risk assessment as a graph of stages with declared inputs and outputs
+
+    The intermediate results (artifacts) of each stage are kept, so that after changing some inputs
+    (see update), only the stages downstream of those inputs are recalculated by the next run.
+    The flames and jets of the leak sizes are separate stages that depend only on the release, so, for example,
+    changing the occupants reruns the positions, effects, plot, consequence, and risk stages, which evaluate
+    the heat fluxes and overpressures at the new positions from the same flames and jets,
+    changing a probit model reruns only the consequence and risk stages,
+    and changing create_plots or output_dir reruns only the plot stages.
+    """
+    # (stage name, inputs (analysis inputs or outputs of earlier stages), outputs), in order of calculation
+    _stages = [
+        ('fluids',
+         ['amb_temp', 'amb_pres', 'rel_species', 'rel_temp', 'rel_pres', 'rel_phase'],
+         ['amb_fluid', 'rel_fluid']),
+        ('occupants',
+         ['occupant_input_list'],
+         ['loc_distributions', 'total_occupants', 'occupant_avg_hours']),
+        ('leak_sizes',
+         ['leak_sizes'],
+         ['all_leak_sizes']),
+        ('leak_frequencies',
+         ['all_leak_sizes', 'release_freq_overrides', 'component_sets', 'component_failure_set'],
+         ['leak_results', 'total_leak_freqs']),
+        ('orifices',
+         ['all_leak_sizes', 'pipe_outer_diam', 'pipe_thickness', 'discharge_coeff', 'rel_fluid'],
+         ['orifices', 'discharge_rates', 'release_cache']),
+        ('flames',
+         ['amb_fluid', 'rel_fluid', 'rel_angle', 'orifices', 'nozzle_model', 'release_cache'],
+         ['flames']),
+        ('jets',
+         ['amb_fluid', 'rel_fluid', 'rel_angle', 'orifices', 'nozzle_model', 'release_cache'],
+         ['jets']),
+        ('ignition',
+         ['discharge_rates', 'ign_thresholds', 'immed_ign_probs', 'delayed_ign_probs'],
+         ['immed_ign_probs_per_leak', 'delay_ign_probs_per_leak']),
+        ('event_tree',
+         ['orifices', 'detection_credit', 'event_tree_override', 'immed_ign_probs_per_leak',
+          'delay_ign_probs_per_leak'],
+         ['end_states']),
+        ('positions',
+         ['loc_distributions', 'excl_radius', 'rand_seed'],
+         ['locations', 'transposed_positions']),
+        ('thermal_effects',
+         ['flames', 'amb_fluid', 'rel_fluid', 'rel_species', 'rel_angle', 'facil_length', 'facil_width', 'orifices',
+          'rel_humid', 'nozzle_model', 'locations', 'release_cache'],
+         ['qrads', 'flame_summaries']),
+        ('thermal_plots',
+         ['qrads', 'orifices', 'locations', 'facil_length', 'facil_width', 'create_plots', 'output_dir'],
+         ['qrad_plot_files']),
+        ('overpressure_effects',
+         ['jets', 'orifices', 'nozzle_model', 'rel_fluid', 'amb_fluid', 'rel_angle', 'locations', 'facil_length',
+          'facil_width', 'overp_method', 'BST_mach_flame_speed', 'TNT_equivalence_factor', 'release_cache'],
+         ['overpressures', 'impulses', 'jet_summaries']),
+        ('overpressure_plots',
+         ['overpressures', 'impulses', 'orifices', 'locations', 'facil_length', 'facil_width', 'create_plots',
+          'output_dir'],
+         ['overp_plot_files', 'impulse_plot_files']),
+        ('consequences',
+         ['orifices', 'end_states', 'total_occupants', 'qrads', 'overpressures', 'impulses',
+          'probit_thermal_id', 'exposure_time', 'probit_overp_id'],
+         ['event_consequences']),
+        ('risk',
+         ['orifices', 'end_states', 'event_consequences', 'total_leak_freqs', 'total_occupants',
+          'occupant_avg_hours'],
+         ['scenario_freqs', 'total_pll', 'pll_contributions', 'far', 'air']),
+        ('results',
+         ['leak_results', 'end_states', 'scenario_freqs', 'pll_contributions', 'discharge_rates', 'orifices',
+          'total_pll', 'far', 'air', 'qrad_plot_files', 'overp_plot_files', 'impulse_plot_files',
+          'transposed_positions', 'total_occupants', 'qrads', 'overpressures', 'impulses',
+          'flame_summaries', 'jet_summaries'],
+         ['results']),
+    ]
+    # inputs that control how the analysis is run, but not its results
+    _options = ['verbose', 'executor', 'max_workers', 'cache_dir', 'cache_max_bytes',
+                'uncertainty_samples', 'uncertainty_method']
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initializes the analysis; stages are not calculated until the analysis is run
+
+        Parameters
+        ----------
+        Same as conduct_analysis (positional or keyword)
+
+        Calculated
+        ----------
+        inputs : dict
+            Inputs of the analysis, by name (change using update)
+        stage_runs : dict
+            Number of times that each stage has been calculated, by stage name
+        """
+        bound = inspect.signature(conduct_analysis).bind(*args, **kwargs)
+        bound.apply_defaults()
+        self.inputs = dict(bound.arguments)
+        self.stage_runs = {name: 0 for name, _, _ in self._stages}
+        self._artifacts = {}
+        self._stale = set(self.stage_runs)
+        self._executor, self._result_cache = None, None
+
+    @property
+    def stage_names(self):
+        """
+        Names of the stages, in order of calculation
+        """
+        return [name for name, _, _ in self._stages]
+
+    def update(self, **inputs):
+        """
+        Changes inputs of the analysis, invalidating the stages downstream of them
+
+        Inputs are compared by name only, so objects that are modified in place
+        (e.g., ComponentSet objects) should be passed to update to invalidate their stages
+
+        Parameters
+        ----------
+        **inputs
+            New values of inputs, by name (see conduct_analysis)
+        """
+        unknown = [name for name in inputs if name not in self.inputs]
+        if unknown:
+            raise TypeError('Unknown analysis inputs: {}'.format(', '.join(unknown)))
+        self.inputs.update(inputs)
+        self.invalidate(*[name for name in inputs if name not in self._options])
+
+    def invalidate(self, *names):
+        """
+        Marks the stages that depend (directly or through other stages) on the given inputs,
+        artifacts, or stage names to be recalculated by the next run
+        """
+        changed = set(names)
+        for name, stage_inputs, outputs in self._stages:
+            if name in changed or name in self._stale or changed.intersection(stage_inputs):
+                self._stale.add(name)
+                changed.update(outputs)
+
+    def stale_stages(self):
+        """
+        Returns the names of the stages that will be calculated by the next run, in order
+        """
+        return [name for name in self.stage_names if name in self._stale]
+
+    def artifact(self, name):
+        """
+        Returns an intermediate result (output of a stage) of the last run
+        """
+        if name not in self._artifacts:
+            raise KeyError('Artifact {} has not been calculated'.format(name))
+        return self._artifacts[name]
+
+    def uncertainty(self, num_samples=100000, method='lhs', percentiles=(5, 50, 95), random_state=None,
+                    return_samples=False):
+        """
+        Propagates the uncertainty of the leak frequencies and component failure probabilities to the
+        risk metrics, reusing the event tree and consequences of the analysis (run first, if needed)
+
+        Parameters
+        ----------
+        num_samples : int
+            Number of samples
+            Default is 100,000
+
+        method : {'lhs', 'mc'}
+            Latin hypercube or Monte Carlo sampling
+            Default is 'lhs'
+
+        percentiles : sequence of floats
+            Percentiles (between 0 and 100) of the risk metrics to return
+            Default is (5, 50, 95)
+
+        random_state : None, int, or numpy Generator
+            Seed or generator of random numbers
+
+        return_samples : bool
+            Whether to include the samples of the risk metrics in the results
+
+        Returns
+        -------
+        results : dict
+            see uncertainty.propagate_frequency_uncertainty
+        """
+        if self._stale:
+            self.run()
+        return uncertainty.propagate_frequency_uncertainty(self._value('all_leak_sizes'),
+                                                           self._value('release_freq_overrides'),
+                                                           self._value('component_sets'),
+                                                           self._value('component_failure_set'),
+                                                           self._value('end_states'),
+                                                           self._value('event_consequences'),
+                                                           self._value('total_occupants'),
+                                                           self._value('occupant_avg_hours'),
+                                                           num_samples=num_samples, method=method,
+                                                           percentiles=percentiles, random_state=random_state,
+                                                           return_samples=return_samples)
+
+    def _value(self, name):
+        return self._artifacts[name] if name in self._artifacts else self.inputs[name]
+
+    def run(self):
+        """
+        Calculates the stages that have been invalidated since the last run
+
+        Returns
+        -------
+        results : dict
+            see conduct_analysis
+        """
+        inputs = self.inputs
+        if inputs['probit_overp_id'] in ['head', 'coll'] and inputs['overp_method'] == 'bauwens':
+            impulse_probit_error_msg = ('Overpressure method "bauwens"'
+                                        + ' does not produce impulse values,'
+                                        + ' and so cannot be used with'
+                                        + f' overpressure probit "{inputs["probit_overp_id"]}"')
+            raise ValueError(impulse_probit_error_msg)
+
+        if inputs['output_dir'] is None:
+            inputs['output_dir'] = misc_utils.get_temp_folder()
+
+        log.info("")
+        log.info("=== BEGINNING ANALYSIS ===")
+        log.info("")
+        log.info("PARAMETERS")
+        for param_name in sorted(inputs):
+            param_val = inputs[param_name]
+            if isinstance(param_val, list) and param_val and isinstance(param_val[0], component_set.ComponentSet):
+                log.info("Component Sets:")
+                for comp_set in param_val:
+                    log.info(f"{comp_set}")
+            else:
+                log.info("{}: {}".format(param_name, str(param_val)))
+        log.info("Stages to calculate: {}".format(self.stale_stages()))
+
+        self._executor = inputs['executor']
+        if self._executor is None and inputs['max_workers'] is not None:
+            self._executor = _get_process_pool(inputs['max_workers'])
+        if inputs['cache_dir'] is None:
+            self._result_cache = None
+        else:
+            self._result_cache = qra_result_cache.PhysicsResultCache(inputs['cache_dir'], inputs['cache_max_bytes'])
+
+        for name, stage_inputs, outputs in self._stages:
+            if name not in self._stale:
+                continue
+            artifacts = getattr(self, '_stage_' + name)(**{key: self._value(key) for key in stage_inputs})
+            self._artifacts.update(artifacts)
+            self._stale.discard(name)
+            self.stage_runs[name] += 1
+
+        results = dict(self._artifacts['results'])
+        results['physics_cache'] = None if self._result_cache is None else self._result_cache.report()
+        if inputs['uncertainty_samples'] is None:
+            results['uncertainty'] = None
+        else:
+            results['uncertainty'] = self.uncertainty(inputs['uncertainty_samples'], inputs['uncertainty_method'],
+                                                      random_state=inputs['rand_seed'])
+
+        if inputs['verbose']:
+            print("")
+            for leak_res in results['leak_results']:
+                print(leak_res)
+            print("PLL: {:.5E}".format(results['total_pll']))
+            print("FAR: {:.5E}".format(results['far']))
+            print("AIR: {:.5E}\n".format(results['air']))
+
+        # Print one result key/val pair per line
+        log.info("\nANALYSIS RESULTS:\n{}".format("\n".join(["{}: {}".format(key, val) for key, val in results.items()])))
+        log.info("=== ANALYSIS COMPLETE ===")
+
+        return results
+
+    def _stage_fluids(self, amb_temp, amb_pres, rel_species, rel_temp, rel_pres, rel_phase):
+        amb_fluid = phys_api.create_fluid('AIR', amb_temp, amb_pres)
+        rel_fluid = phys_api.create_fluid(rel_species, rel_temp, rel_pres, phase=rel_phase)
+        return {'amb_fluid': amb_fluid, 'rel_fluid': rel_fluid}
+
+    def _stage_occupants(self, occupant_input_list):
+        # Each occupant row in GUI is represented as group and stored as dict inside list
+        # Massage into required format for phys module [count, (xdistr, xa, xb), (ydistr...]
+        loc_distributions = []
+        total_occupants = 0
+        total_occupant_hours = 0
+        for group_dict in occupant_input_list:
+            num_occupants = int(group_dict['count'])
+            loc_distribution = [num_occupants,
+                                (group_dict['xdistr'], group_dict['xa'], group_dict['xb']),
+                                (group_dict['ydistr'], group_dict['ya'], group_dict['yb']),
+                                (group_dict['zdistr'], group_dict['za'], group_dict['zb'])]
+            loc_distributions.append(loc_distribution)
+            total_occupants += num_occupants
+            total_occupant_hours += int(group_dict['hours'] * num_occupants)
+        if total_occupant_hours == 0:
+            occupant_avg_hours = 0
+        else:
+            occupant_avg_hours = total_occupant_hours / total_occupants
+
+        if self.inputs['verbose']:
+            log.info(f"Location distributions: {loc_distributions}")
+            log.info(f"{total_occupants} Occupants for {occupant_avg_hours} average hours")
+            log.info("")
+        return {'loc_distributions': loc_distributions,
+                'total_occupants': total_occupants,
+                'occupant_avg_hours': occupant_avg_hours}
+
+    def _stage_leak_sizes(self, leak_sizes):
+        all_leak_sizes = leak_frequency.set_leak_size_defaults(None if leak_sizes is None else list(leak_sizes))
+        return {'all_leak_sizes': all_leak_sizes}
+
+    def _stage_leak_frequencies(self, all_leak_sizes, release_freq_overrides, component_sets, component_failure_set):
+        leak_results, leak_result100 = leak_frequency.compute_leak_frequencies(list(all_leak_sizes),
+                                                                               release_freq_overrides,
+                                                                               component_sets)
+
+        # Account for non-leak fueling failure contributors in 100% release only. Use override value if provided
+        leak_result100.set_failures(component_failure_set)
+        total_leak_freqs = np.array([leak_res.total_release_freq for leak_res in leak_results])
+
+        log.info("RELEASE FREQUENCIES:")
+        for leak_result in leak_results[:-1]:
+            log.info(f" {leak_result.leak_size:0.2f}% - {leak_result.total_release_freq:.3g}")
+        log.info(f"  {leak_result100.leak_size:.2f}% - {leak_result100.total_release_freq:.3g}")
+        return {'leak_results': leak_results, 'total_leak_freqs': total_leak_freqs}
+
+    def _stage_orifices(self, all_leak_sizes, pipe_outer_diam, pipe_thickness, discharge_coeff, rel_fluid):
+        # Compute leak diameters and discharge rates, one per leak size
+        pipe_inner_diam = pipe_size.calc_pipe_inner_diameter(pipe_outer_diam, pipe_thickness)
+        pipe_flow_area = pipe_size.calc_pipe_flow_area(pipe_inner_diam)
+        log.info("System pipe inner diameter {:.3g} m, area {:.3g} m^2".format(pipe_inner_diam, pipe_flow_area))
+        # Throat and notional nozzle states do not depend on the leak diameter, so they are shared between leak sizes
+        release_cache = _release_state.ReleaseStateCache()
+        orifices = []
+        discharge_rates = []
+        for leak_size in all_leak_sizes:
+            orifice_leak_diam = pipe_size.calc_orifice_diameter(pipe_flow_area, leak_size/100)
+            orifice = _comps.Orifice(orifice_leak_diam, discharge_coeff)
+            orifices.append(orifice)
+            discharge_rate = release_cache.mass_flow_rate(rel_fluid, orifice)
+            discharge_rates.append(discharge_rate)
+            log.info("For {}% leak size: orifice leak diameter: {:.3g} m, discharge rate: {:.3g} kg/s".format(leak_size, orifice_leak_diam, discharge_rate))
+        return {'orifices': orifices, 'discharge_rates': discharge_rates, 'release_cache': release_cache}
+
+    def _stage_ignition(self, discharge_rates, ign_thresholds, immed_ign_probs, delayed_ign_probs):
+        # Determine ignition probabilities for each leak size based on discharge rates and thresholds
+        immed_ign_probs_per_leak = []
+        delay_ign_probs_per_leak = []
+        for rate in discharge_rates:
+            (immed_ign_prob, delayed_ign_prob) = ignition_probs.get_ignition_probability(rate,
+                                                                                         ign_thresholds,
+                                                                                         immed_ign_probs,
+                                                                                         delayed_ign_probs)
+            immed_ign_probs_per_leak.append(immed_ign_prob)
+            delay_ign_probs_per_leak.append(delayed_ign_prob)
+            log.info("Flow rate {:.3g} (kg/s) ignition probabilities: immed {}, delayed {}".format(rate, immed_ign_prob, delayed_ign_prob))
+        return {'immed_ign_probs_per_leak': np.array(immed_ign_probs_per_leak),
+                'delay_ign_probs_per_leak': np.array(delay_ign_probs_per_leak)}
+
+    def _stage_event_tree(self, orifices, detection_credit, event_tree_override,
+                          immed_ign_probs_per_leak, delay_ign_probs_per_leak):
+        # Evaluate event tree
+        # Use override event tree specification if provided
+        num_leak_sizes = len(orifices)
+        if event_tree_override is None:
+            events_in_tree = []
+            events_in_tree.append({'name': 'Shutdown',
+                                   'key': 'shut',
+                                   'event_prob': detection_credit,
+                                   'consequence_type': None})
+            events_in_tree.append({'name': 'No Ignition',
+                                   'key': 'noig',
+                                   'event_prob': 1 - (immed_ign_probs_per_leak + delay_ign_probs_per_leak),
+                                   'consequence_type': None})
+            events_in_tree.append({'name': 'Jetfire',
+                                   'key': 'jetf',
+                                   'event_prob': immed_ign_probs_per_leak / (immed_ign_probs_per_leak + delay_ign_probs_per_leak),
+                                   'consequence_type': 'thermal'})
+            events_in_tree.append({'name': 'Explosion',
+                                   'key': 'expl',
+                                   'event_prob': 1,
+                                   'consequence_type': 'overp'})
+            end_states = event_tree.build_event_tree(events_in_tree, num_leak_sizes)
+        else:
+            end_states = event_tree.build_event_tree(event_tree_override, num_leak_sizes)
+        return {'end_states': end_states}
+
+    def _stage_positions(self, loc_distributions, excl_radius, rand_seed):
+        posgen = qra_positions.PositionGenerator(loc_distributions,
+                                                 excl_radius,
+                                                 rand_seed)
+        locations = posgen.locs
+        return {'locations': locations, 'transposed_positions': np.array(locations).transpose()}
+
+    def _stage_flames(self, amb_fluid, rel_fluid, rel_angle, orifices, nozzle_model, release_cache):
+        # Flames are solved when the thermal effects first need them, and kept for later runs
+        flames = effects.LeakSolutions(_flame.Flame, rel_fluid, amb_fluid, np.radians(rel_angle), orifices,
+                                       nozzle_model, verbose=self.inputs['verbose'], release_cache=release_cache)
+        return {'flames': flames}
+
+    def _stage_jets(self, amb_fluid, rel_fluid, rel_angle, orifices, nozzle_model, release_cache):
+        # Jets are solved when the overpressure effects first need them, and kept for later runs
+        jets = effects.LeakSolutions(_jet.Jet, rel_fluid, amb_fluid, rel_angle, orifices, nozzle_model,
+                                     verbose=self.inputs['verbose'], release_cache=release_cache)
+        return {'jets': jets}
+
+    def _stage_thermal_effects(self, flames, amb_fluid, rel_fluid, rel_species, rel_angle, facil_length, facil_width,
+                               orifices, rel_humid, nozzle_model, locations, release_cache):
+        log.info("Computing thermal effects...")
+        rel_angle_rads = np.radians(rel_angle)
+        try:
+            flux_dict = effects.calc_thermal_effects(amb_fluid,
+                                                     rel_fluid,
+                                                     rel_angle=rel_angle_rads,
+                                                     site_length=facil_length,
+                                                     site_width=facil_width,
+                                                     orifices=orifices,
+                                                     rel_humid=rel_humid,
+                                                     not_nozzle_model=nozzle_model,
+                                                     locations=locations,
+                                                     create_plots=False,
+                                                     verbose=self.inputs['verbose'],
+                                                     release_cache=release_cache,
+                                                     executor=self._executor,
+                                                     result_cache=self._result_cache,
+                                                     flames=flames)
+        except ValueError as err:
+            if type(rel_species) == dict:
+                raise ValueError('Invalid blend provided')
+            raise
+
+        log.info("Thermal effects analysis complete")
+        qrads = flux_dict['fluxes']
+        log.info("Heat flux data:\n{}".format(qrads))
+        return {'qrads': qrads,
+                'flame_summaries': flux_dict['flame_summaries']}
+
+    def _stage_thermal_plots(self, qrads, orifices, locations, facil_length, facil_width, create_plots, output_dir):
+        if not create_plots:
+            return {'qrad_plot_files': []}
+        qrad_plot_files = effects.plot_thermal_effect_positions(qrads, orifices, locations,
+                                                                facil_length, facil_width, output_dir)
+        return {'qrad_plot_files': qrad_plot_files}
+
+    def _stage_overpressure_effects(self, jets, orifices, nozzle_model, rel_fluid, amb_fluid, rel_angle, locations,
+                                    facil_length, facil_width, overp_method, BST_mach_flame_speed,
+                                    TNT_equivalence_factor, release_cache):
+        log.info("Computing overpressure effects...")
+        overp_dict = effects.calc_overp_effects(orifices,
+                                                nozzle_model,
+                                                rel_fluid,
+                                                amb_fluid,
+                                                rel_angle,
+                                                locations,
+                                                facil_length,
+                                                facil_width,
+                                                overp_method,
+                                                BST_mach_flame_speed,
+                                                TNT_equivalence_factor,
+                                                create_plots=False,
+                                                verbose=self.inputs['verbose'],
+                                                release_cache=release_cache,
+                                                executor=self._executor,
+                                                result_cache=self._result_cache,
+                                                jets=jets)
+        log.info("Overpressure effects analysis complete")
+        log.info("Overpressure data:\n{}".format(overp_dict['overpressures']))
+        log.info("Impulse data:\n{}".format(overp_dict['impulses']))
+        return {'overpressures': overp_dict['overpressures'],
+                'impulses': overp_dict['impulses'],
+                'jet_summaries': overp_dict['jet_summaries']}
+
+    def _stage_overpressure_plots(self, overpressures, impulses, orifices, locations, facil_length, facil_width,
+                                  create_plots, output_dir):
+        if not create_plots:
+            return {'overp_plot_files': [], 'impulse_plot_files': []}
+        overp_plot_files, impulse_plot_files = effects.plot_overp_effect_positions(overpressures, impulses,
+                                                                                   orifices, locations,
+                                                                                   facil_length, facil_width,
+                                                                                   output_dir)
+        return {'overp_plot_files': overp_plot_files, 'impulse_plot_files': impulse_plot_files}
+
+    def _stage_consequences(self, orifices, end_states, total_occupants, qrads, overpressures, impulses,
+                            probit_thermal_id, exposure_time, probit_overp_id):
+        # Estimate fatality probabilities
+        event_consequences = []
+        physical_responses = {'qrads': qrads,
+                              'overpressures': overpressures,
+                              'impulses': impulses}
+        consequence_modeling_decisions = {'probit_thermal_id': probit_thermal_id,
+                                          'exposure_time': exposure_time,
+                                          'probit_overp_id': probit_overp_id}
+        for end_state in end_states:
+            event_consequences.append(consequence.calculate_event_consequence(end_state.consequence_type,
+                                                                              len(orifices),
+                                                                              total_occupants,
+                                                                              physical_responses,
+                                                                              consequence_modeling_decisions))
+        return {'event_consequences': event_consequences}
+
+    def _stage_risk(self, orifices, end_states, event_consequences, total_leak_freqs, total_occupants,
+                    occupant_avg_hours):
+        # Risk for each scenario
+        log.info("Calculating frequencies and consequences for each scenario...")
+        scenario_freqs = []
+        scenario_fatalities = []
+        for i in range(len(orifices)):
+            # Compute expected events per year for this leak size
+            for end_state, consequence_outcome in zip(end_states, event_consequences):
+                scenario_freqs.append(end_state.end_state_probability[i] * total_leak_freqs[i])
+                scenario_fatalities.append(consequence_outcome[i])
+
+        # Overall risk metrics
+        log.info("Calculating risk for each scenario...")
+        plls = risk.calc_all_plls(scenario_freqs, scenario_fatalities)
+        log.info("Calculating overall risk metrics and risk contributions for each scenario...")
+        total_pll, pll_contributions = risk.calc_risk_contributions(plls)
+        far = risk.calc_far(total_pll, total_occupants)
+        air = risk.calc_air(far, occupant_avg_hours)
+        return {'scenario_freqs': scenario_freqs, 'total_pll': total_pll, 'pll_contributions': pll_contributions,
+                'far': far, 'air': air}
+
+    def _stage_results(self, leak_results, end_states, scenario_freqs, pll_contributions, discharge_rates, orifices,
+                       total_pll, far, air, qrad_plot_files, overp_plot_files, impulse_plot_files,
+                       transposed_positions, total_occupants, qrads, overpressures, impulses,
+                       flame_summaries, jet_summaries):
+        # Collect results for each leak size
+        # (on copies, so that the leak frequency artifacts are unchanged if this stage is rerun)
+        log.info("Results for each leak size:")
+        leak_results = copy.deepcopy(leak_results)
+        for i, leak_result in enumerate(leak_results):
+            for j, end_state in enumerate(end_states):
+                leak_result.list_event_names.append(end_state.name)
+                leak_result.list_event_keys.append(end_state.key)
+                leak_result.list_p_events.append(np.around(end_state.end_state_probability[i], 20))
+                leak_result.list_avg_events.append(np.around(scenario_freqs[i*len(end_states)+j], 20))
+                leak_result.list_pll_contrib.append(np.around(pll_contributions[i*len(end_states)+j], 20))
+                # event data in dict format for easier GUI consumption
+                leak_result.event_dicts = leak_result.get_result_dicts()
+
+            leak_result.mass_flow_rate = discharge_rates[i]
+            leak_result.leak_diam = orifices[i].d
+            log.info(str(leak_result))
+
+        # Re-shape harm values into position table
+        num_leak_sizes = len(orifices)
+        position_qrads_reshape = (qrads.reshape((num_leak_sizes, total_occupants))).T
+        position_overps_reshape = (overpressures.reshape((num_leak_sizes, total_occupants))).T
+        position_impulses_reshape = (impulses.reshape((num_leak_sizes, total_occupants))).T
+
+        results = {
+            'total_pll': total_pll,
+            'far': far,
+            'air': air,
+            'leak_results': leak_results,
+            'qrad_plot_files': qrad_plot_files,
+            'overp_plot_files': overp_plot_files,
+            'impulse_plot_files': impulse_plot_files,
+            'positions': transposed_positions,
+            'position_qrads': position_qrads_reshape,
+            'position_overps': position_overps_reshape,
+            'position_impulses': position_impulses_reshape,
+            'flame_summaries': flame_summaries,
+            'jet_summaries': jet_summaries
+        }
+        return {'results': results}
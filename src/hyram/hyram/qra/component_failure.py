@@ -165,6 +165,7 @@ class ComponentFailureSet:
                                                  coupling_ftc_dist, coupling_ftc_a, coupling_ftc_b)
 
             num_fuelings = num_vehicles * daily_fuelings * vehicle_days
+            self.num_fuelings = num_fuelings
             self.p_driveoff = np.around(self.driveoff.mean * self.coupling_ftc.mean, 20)
             self.f_driveoff = np.around(num_fuelings * self.p_driveoff, 20)
 
@@ -210,6 +211,40 @@ class ComponentFailureSet:
         if verbose:
             log.info("Frequency of other failures: {:.3g}".format(self.f_fueling_fail))
 
+    def sample_fueling_fail_freq(self, size, method='mc', random_state=None):
+        """
+        Draws samples of the frequency of other (fueling) failures, sampling each component failure
+        probability from its distribution
+
+        Parameters
+        ----------
+        size : int
+            Number of samples
+
+        method : {'mc', 'lhs'}
+            Monte Carlo or Latin hypercube sampling
+
+        random_state : None, int, or numpy Generator
+            Seed or generator of random numbers
+
+        Returns
+        -------
+        freqs : ndarray
+            Samples of the fueling failure frequency (per year)
+        """
+        if self.use_override:
+            return np.full(size, self.f_fueling_fail)
+        rng = np.random.default_rng(random_state)
+        p = {name: getattr(self, name).sample(size, method, rng)
+             for name in ['noz_po', 'noz_ftc', 'mvalve_ftc', 'svalve_ftc', 'svalve_ccf',
+                          'overp', 'pvalve_fto', 'driveoff', 'coupling_ftc']}
+        f_driveoff = self.num_fuelings * p['driveoff'] * p['coupling_ftc']
+        f_overp_rupture = self.num_fuelings * p['overp'] * p['pvalve_fto']
+        p_nozzle_release = p['noz_po'] + p['noz_ftc']
+        p_sol_valves_ftc = p['svalve_ftc'] ** 3. + p['svalve_ccf']
+        p_shutdown_fail = p_sol_valves_ftc * p['mvalve_ftc'] * p_nozzle_release
+        return f_overp_rupture + f_driveoff + self.num_fuelings * p_shutdown_fail
+
     def __str__(self):
         if self.use_override:
             # User provided vehicle fueling failure frequency directly so ignore individual events
@@ -260,5 +295,9 @@ class ComponentFailure:
         self.distr = distr_class(a, b)
         self.mean = self.p = self.distr.mean
 
+    def sample(self, size, method='mc', random_state=None):
+        """ Draws samples of the failure probability distribution (see distributions.uniform_samples) """
+        return self.distr.sample(size, method, random_state)
+
     def __str__(self):
         return "Component failure: {} {} | {}, mean {:.3g}".format(self.component, self.mode, self.distr, self.mean)
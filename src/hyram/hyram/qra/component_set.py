@@ -117,6 +117,34 @@ class ComponentSet:
             freq = leak.get_leak_freq_mean() * self.num_components
         return freq
 
+    def sample_leak_frequency(self, leak_size, size, method='mc', random_state=None):
+        """
+        Draws samples of the leak frequency of all components in this set for the specified leak size
+
+        Parameters
+        ----------
+        leak_size : float
+            Leak size (% of pipe flow area)
+
+        size : int
+            Number of samples
+
+        method : {'mc', 'lhs'}
+            Monte Carlo or Latin hypercube sampling
+
+        random_state : None, int, or numpy Generator
+            Seed or generator of random numbers
+
+        Returns
+        -------
+        freqs : ndarray
+            Samples of the leak frequency (per year)
+        """
+        leak = self.get_leak(leak_size)
+        if leak:
+            return leak.sample_leak_freq(size, method, random_state) * self.num_components
+        return np.zeros(size)
+
     def get_leaks_str_simple(self):
         """ simplified version of above as '[x, y], [x2, y2]... ' """
         leak_list = sorted(self.leaks.values(), key=lambda x: x.size)
@@ -12,9 +12,41 @@ This file should NOT import from any QRA-specific code.
 """
 
 import numpy as np
+from scipy.special import ndtri
 from scipy.stats import beta, uniform, norm
 
 
+def uniform_samples(size, method='mc', random_state=None):
+    """
+    Draws samples of the standard uniform distribution, used to sample other distributions
+    through their percent point functions
+
+    Parameters
+    ----------
+    size : int
+        Number of samples
+
+    method : {'mc', 'lhs'}
+        'mc' for simple random (Monte Carlo) sampling,
+        'lhs' for Latin hypercube sampling (one sample in each of size equal-probability strata)
+
+    random_state : None, int, or numpy Generator
+        Seed or generator of random numbers
+
+    Returns
+    -------
+    samples : ndarray
+        Samples between 0 and 1
+    """
+    rng = np.random.default_rng(random_state)
+    if method == 'mc':
+        return rng.random(size)
+    elif method == 'lhs':
+        return (rng.permutation(size) + rng.random(size)) / size
+    else:
+        raise ValueError('Sampling method must be "mc" or "lhs"')
+
+
 class DistributionWrapper(object):
     """
     Convenience class to build similar distributions (i.e. scipy continuous_ev).
@@ -46,6 +78,17 @@ class DistributionWrapper(object):
         self.var = self.variance = float(self.distribution.var())
         self.rvs = self.distribution.rvs
 
+    def ppf(self, q):
+        """ Percent point function (inverse of the cumulative distribution function) """
+        return self.distribution.ppf(q)
+
+    def sample(self, size, method='mc', random_state=None):
+        """ Draws samples of the distribution (see uniform_samples) """
+        if method == 'mc':
+            # direct random variates are faster than inverting the cumulative distribution function
+            return self.distribution.rvs(size, random_state=np.random.default_rng(random_state))
+        return self.ppf(uniform_samples(size, method, random_state))
+
     def __str__(self):
         return '{}, a={:.3g}, b={:.3g}'.format(self.name, self.a, self.b)
 
@@ -100,6 +143,14 @@ class EVDistribution:
         self.mean = float(self.distribution.mean())
         self.var = self.variance = float(self.distribution.var())
 
+    def ppf(self, q):
+        """ Percent point function (inverse of the cumulative distribution function) """
+        return np.full(np.shape(q), self.distribution.value)
+
+    def sample(self, size, method='mc', random_state=None):
+        """ Draws samples of the distribution, which are all the expected value """
+        return np.full(size, self.distribution.value)
+
     def __str__(self):
         return 'Expected Value = {:.3g}'.format(self.value)
 
@@ -153,6 +204,14 @@ class LogNormDistribution(object):
         self.var = self.variance = (np.exp(self.sigma ** 2) - 1) * np.exp(2 * self.mu + self.sigma ** 2)
         self.rvs = None
 
+    def ppf(self, q):
+        """ Percent point function (inverse of the cumulative distribution function) """
+        return np.exp(self.mu + self.sigma * ndtri(q))
+
+    def sample(self, size, method='mc', random_state=None):
+        """ Draws samples of the distribution (see uniform_samples) """
+        return self.ppf(uniform_samples(size, method, random_state))
+
     def __str__(self):
         return 'Lognormal, mu={:.3f}, sigma={:.3f}'.format(self.mu, self.sigma)
 
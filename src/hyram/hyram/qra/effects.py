@@ -14,6 +14,7 @@ import matplotlib.patches as mplpatch
 
 from ..phys import _flame, _jet, _unconfined_overpressure
 from ..utilities import misc_utils
+from . import result_cache as qra_result_cache
 
 
 def calc_thermal_effects(amb_fluid, rel_fluid, rel_angle,
@@ -21,7 +22,8 @@ def calc_thermal_effects(amb_fluid, rel_fluid, rel_angle,
                          orifices, rel_humid,
                          not_nozzle_model,
                          locations,
-                         create_plots=True, output_dir=None, verbose=False):
+                         create_plots=True, output_dir=None, verbose=False,
+                         release_cache=None, executor=None, result_cache=None, flames=None):
     """
     Calculates thermal effects for all positions in QRA
 
@@ -66,6 +68,28 @@ def calc_thermal_effects(amb_fluid, rel_fluid, rel_angle,
     verbose : bool
         If True, extra output will be printed (default False)
 
+    release_cache : ReleaseStateCache object
+        Cache of diameter-independent release states shared between leak sizes
+        If an executor is given, the throat and notional nozzle states are solved in this process
+        and only those states are sent with each leak size (see ReleaseStateCache.release_states),
+        so the developing flows solved by the workers are not added to release_cache
+        Default is None, which solves the release states for each orifice
+
+    executor : concurrent.futures.Executor object
+        Executor used to solve the flames of the leak sizes in parallel (e.g., a ProcessPoolExecutor)
+        Results are gathered in the order of the orifices, so they are identical to the serial calculation
+        Default is None, which solves the flames serially
+
+    result_cache : PhysicsResultCache object
+        On-disk store from which the results of each leak size are loaded, if they have been
+        calculated for the same inputs, or to which they are saved
+        Default is None, which calculates all leak sizes
+
+    flames : LeakSolutions object
+        Flames of the orifices (see LeakSolutions), which are solved only if needed and kept,
+        so that later calls at other locations or humidities reuse them
+        Default is None, which solves the flames for this call only
+
     Returns : dict
     -------
         fluxes : ndarray
@@ -75,49 +99,49 @@ def calc_thermal_effects(amb_fluid, rel_fluid, rel_angle,
 
         all_pos_files : list of str
             position plot file paths
+
+        flame_summaries : list of dict
+            mass flow rate (kg/s), visible length (m), width (m),
+            and radiant power (W) of the flame for each leak size
     """
     num_sizes = len(orifices)
     num_positions = len(locations)
-    x_locations = [location[0] for location in locations]
-    z_locations = [location[2] for location in locations]
     cons_momentum, notional_noz_t = misc_utils.convert_nozzle_model_to_params(not_nozzle_model, rel_fluid)
+    if flames is None:
+        flames = LeakSolutions(_flame.Flame, rel_fluid, amb_fluid, rel_angle, orifices, not_nozzle_model,
+                               verbose=verbose, release_cache=release_cache)
+
+    def calculate(indices):
+        return [_thermal_effects_for_flame(flame, locations, rel_humid)
+                for flame in flames.solve(indices, executor)]
+    stage_inputs = [(qra_result_cache.fluid_key(rel_fluid), qra_result_cache.fluid_key(amb_fluid),
+                     float(rel_angle), qra_result_cache.orifice_key(orifice), float(rel_humid),
+                     cons_momentum, notional_noz_t, qra_result_cache.locations_key(locations))
+                    for orifice in orifices]
+    all_results = _cached_results(calculate, result_cache, 'thermal', stage_inputs)
 
     all_qrads = np.zeros((num_sizes, num_positions))
-    all_pos_filepaths = []
-    for i, orifice in enumerate(orifices):
-        flame = _flame.Flame(rel_fluid, orifice, amb_fluid,
-                             theta0=rel_angle,
-                             nn_conserve_momentum=cons_momentum, nn_T=notional_noz_t,
-                             verbose=verbose)
-
-        fluxes = flame.generate_positional_flux(locations, rel_humid)
-
+    flame_summaries = []
+    for i, results in enumerate(all_results):
+        flame_summaries.append({key: float(results[key])
+                                for key in ['mass_flow_rate', 'visible_length', 'width', 'radiant_power']})
         # Each row is the heatflux for all locs for specific leak size
-        all_qrads[i, :] = fluxes
-
-        if create_plots:
-            fluxes_kWm2 = fluxes / 1000
-            fluxes_str = 'Radiative Heat Flux (kW/m$^2$)'
-            now_str = misc_utils.get_now_str()
-            orif_diam_mm = orifice.d * 1000
-            pos_fname = 'HeatFluxPositionPlot{}_{}.png'.format(i, now_str)
-            if output_dir is None:
-                output_dir = misc_utils.get_temp_folder()
-            plot_filepath = os.path.join(output_dir, pos_fname)
-            pos_title = '{} mm Leak Size'.format(round(orif_diam_mm, 3))
-            plot_effect_positions(fluxes_kWm2, fluxes_str,
-                                  plot_filepath, pos_title,
-                                  x_locations, z_locations,
-                                  site_length, site_width)
-            all_pos_filepaths.append(plot_filepath)
+        all_qrads[i, :] = results['fluxes']
 
     # Flatten heatflux (all leaksize loc1, then all leaksize loc2, etc)
     # Corresponds to flattening by row which is C-style ordering
     qrads_flat = all_qrads.flatten(order='C')
 
+    if create_plots:
+        all_pos_filepaths = plot_thermal_effect_positions(qrads_flat, orifices, locations,
+                                                          site_length, site_width, output_dir)
+    else:
+        all_pos_filepaths = []
+
     result_dict = {
         "fluxes": qrads_flat,
-        "all_pos_files": all_pos_filepaths
+        "all_pos_files": all_pos_filepaths,
+        "flame_summaries": flame_summaries
     }
 
     return result_dict
@@ -129,7 +153,7 @@ def calc_overp_effects(orifices, notional_nozzle_model,
                        overp_method,
                        BST_mach_flame_speed=None, TNT_equivalence_factor=None,
                        create_plots=True, output_dir=None,
-                       verbose=False):
+                       verbose=False, release_cache=None, executor=None, result_cache=None, jets=None):
     """
     Calculates overpressure effects for all positions in QRA
 
@@ -187,6 +211,28 @@ def calc_overp_effects(orifices, notional_nozzle_model,
     verbose : bool
         If True, extra output will be printed (default is False)
 
+    release_cache : ReleaseStateCache object
+        Cache of diameter-independent release states shared between leak sizes
+        If an executor is given, the throat and notional nozzle states are solved in this process
+        and only those states are sent with each leak size (see ReleaseStateCache.release_states),
+        so the developing flows solved by the workers are not added to release_cache
+        Default is None, which solves the release states for each orifice
+
+    executor : concurrent.futures.Executor object
+        Executor used to solve the jets of the leak sizes in parallel (e.g., a ProcessPoolExecutor)
+        Results are gathered in the order of the orifices, so they are identical to the serial calculation
+        Default is None, which solves the jets serially
+
+    result_cache : PhysicsResultCache object
+        On-disk store from which the results of each leak size are loaded, if they have been
+        calculated for the same inputs, or to which they are saved
+        Default is None, which calculates all leak sizes
+
+    jets : LeakSolutions object
+        Jets of the orifices (see LeakSolutions), which are solved only if needed and kept,
+        so that later calls at other locations or with other overpressure methods reuse them
+        Default is None, which solves the jets for this call only
+
     Returns : dict
     -------
         overpressures : ndarray
@@ -206,67 +252,42 @@ def calc_overp_effects(orifices, notional_nozzle_model,
 
         all_pos_impulse_files : list of str
             position plot file paths for impulse by position
+
+        jet_summaries : list of dict
+            mass flow rate (kg/s), flammable mass (kg), and overpressure origin (x, y, z) (m)
+            of the unignited jet for each leak size
+            Note: flammable mass is np.nan for the Bauwens method, which uses the detonable mass
     """
     num_sizes = len(orifices)
     num_positions = len(locations)
-    x_locations = [location[0] for location in locations]
-    z_locations = [location[2] for location in locations]
+
+    if overp_method.lower() not in ('bst', 'tnt', 'bauwens'):
+        raise ValueError('Invalid overpressure method name')
+    nozzle_cons_momentum, notional_noz_t = misc_utils.convert_nozzle_model_to_params(notional_nozzle_model, release_fluid)
+    if jets is None:
+        jets = LeakSolutions(_jet.Jet, release_fluid, ambient_fluid, release_angle, orifices, notional_nozzle_model,
+                             verbose=verbose, release_cache=release_cache)
+
+    def calculate(indices):
+        return [_overp_effects_for_jet(jet, locations, overp_method, BST_mach_flame_speed, TNT_equivalence_factor)
+                for jet in jets.solve(indices, executor)]
+    method = overp_method.lower()
+    method_parameter = {'bst': BST_mach_flame_speed, 'tnt': TNT_equivalence_factor}.get(method)
+    stage_inputs = [(qra_result_cache.orifice_key(orifice), nozzle_cons_momentum, notional_noz_t,
+                     qra_result_cache.fluid_key(release_fluid), qra_result_cache.fluid_key(ambient_fluid),
+                     float(release_angle), qra_result_cache.locations_key(locations), method, method_parameter)
+                    for orifice in orifices]
+    all_results = _cached_results(calculate, result_cache, 'overpressure', stage_inputs)
 
     all_overpressures = np.zeros((num_sizes, num_positions))
     all_impulses = np.zeros((num_sizes, num_positions))
-    all_pos_overp_filepaths = []
-    all_pos_impulse_filepaths = []
-    for i, orifice in enumerate(orifices):
-        nozzle_cons_momentum, notional_noz_t = misc_utils.convert_nozzle_model_to_params(notional_nozzle_model, release_fluid)
-        jet = _jet.Jet(release_fluid, orifice, ambient_fluid,
-                       theta0=release_angle,
-                       nn_conserve_momentum=nozzle_cons_momentum, nn_T=notional_noz_t, verbose=verbose)
-
-        method = overp_method.lower()
-        if method == 'bst':
-            over_pressure_model = _unconfined_overpressure.BST_method(jet_object=jet,
-                                                                      mach_flame_speed=BST_mach_flame_speed)
-        elif method == 'tnt':
-            over_pressure_model = _unconfined_overpressure.TNT_method(jet_object=jet,
-                                                                      equivalence_factor=TNT_equivalence_factor)
-        elif method == 'bauwens':
-            over_pressure_model = _unconfined_overpressure.Bauwens_method(jet_object=jet)
-        else:
-            raise ValueError('Invalid overpressure method name')
-
-        overpressures = over_pressure_model.calc_overpressure(locations)
-        impulses = over_pressure_model.calc_impulse(locations)
-        all_overpressures[i, :] = overpressures
-        all_impulses[i, :] = impulses
-
-        if create_plots:
-            overpressures_kPa = overpressures / 1000
-            overpressures_str = 'Peak Overpressure (kPa)'
-            now_str = misc_utils.get_now_str()
-            orif_diam_mm = orifice.d * 1000  # mm
-            pos_fname = 'OverpressurePositionPlot{}_{}.png'.format(i, now_str)
-            if output_dir is None:
-                output_dir = misc_utils.get_temp_folder()
-            plot_filepath = os.path.join(output_dir, pos_fname)
-            pos_title = '{} mm Leak Size'.format(round(orif_diam_mm, 3))
-            plot_effect_positions(overpressures_kPa, overpressures_str,
-                                  plot_filepath, pos_title,
-                                  x_locations, z_locations,
-                                  site_length, site_width)
-            all_pos_overp_filepaths.append(plot_filepath)
-
-            if not np.isnan(impulses).any():
-                impulses_kPas = impulses / 1000
-                impulses_str = 'Impulse (kPa*s)'
-                now_str = misc_utils.get_now_str()
-                pos_fname = 'ImpulsePositionPlot{}_{}.png'.format(i, now_str)
-                plot_filepath = os.path.join(output_dir, pos_fname)
-                plot_effect_positions(impulses_kPas, impulses_str,
-                                      plot_filepath, pos_title,
-                                      x_locations, z_locations,
-                                      site_length, site_width)
-                all_pos_impulse_filepaths.append(plot_filepath)
-
+    jet_summaries = []
+    for i, results in enumerate(all_results):
+        jet_summaries.append({'mass_flow_rate': float(results['mass_flow_rate']),
+                              'flammable_mass': float(results['flammable_mass']),
+                              'origin': tuple([float(x) for x in results['origin']])})
+        all_overpressures[i, :] = results['overpressures']
+        all_impulses[i, :] = results['impulses']
 
     # Flatten overpressures and impulses
     # (all leaksize loc1, then all leaksize loc2, etc)
@@ -274,15 +295,327 @@ def calc_overp_effects(orifices, notional_nozzle_model,
     all_overpressures_flat = all_overpressures.flatten(order='C')
     all_impulses_flat = all_impulses.flatten(order='C')
 
+    if create_plots:
+        all_pos_overp_filepaths, all_pos_impulse_filepaths = plot_overp_effect_positions(
+            all_overpressures_flat, all_impulses_flat, orifices, locations, site_length, site_width, output_dir)
+    else:
+        all_pos_overp_filepaths, all_pos_impulse_filepaths = [], []
+
     result_dict = {
         'overpressures': all_overpressures_flat, 
         'impulses': all_impulses_flat,
         'all_pos_overp_files': all_pos_overp_filepaths,
-        'all_pos_impulse_files': all_pos_impulse_filepaths
+        'all_pos_impulse_files': all_pos_impulse_filepaths,
+        'jet_summaries': jet_summaries
     }
     return result_dict
 
 
+class LeakSolutions:
+    """
+    Flames or jets of a set of leak sizes, each solved when it is first needed and kept,
+    so that the effects at other locations (or humidities) are calculated without solving them again
+    """
+    def __init__(self, solution_class, release_fluid, ambient_fluid, release_angle, orifices,
+                 notional_nozzle_model, verbose=False, release_cache=None):
+        """
+        Initializes the (unsolved) solutions
+
+        Parameters
+        ----------
+        solution_class : class
+            Flame or Jet
+
+        release_fluid : Fluid object
+            Release fluid
+
+        ambient_fluid : Fluid object
+            Ambient fluid
+
+        release_angle : float
+            Angle of release (0 is horizontal) (radians)
+
+        orifices : list of Orifice objects
+            Leak orifices, one for each leak size
+
+        notional_nozzle_model : {'yuce', 'ewan', 'birc', 'bir2', 'molk'}
+            Notional nozzle model identifier (i.e. for under-expanded jet zone)
+
+        verbose : bool
+            If True, extra output will be printed (default False)
+
+        release_cache : ReleaseStateCache object
+            Cache of diameter-independent release states shared between leak sizes
+            (see calc_thermal_effects)
+            Default is None, which solves the release states for each orifice
+        """
+        self.solution_class = solution_class
+        self.release_fluid, self.ambient_fluid = release_fluid, ambient_fluid
+        self.release_angle = release_angle
+        self.orifices = list(orifices)
+        self.cons_momentum, self.notional_noz_t = misc_utils.convert_nozzle_model_to_params(notional_nozzle_model,
+                                                                                             release_fluid)
+        self.verbose = verbose
+        self.release_cache = release_cache
+        self._solutions = [None]*len(self.orifices)
+
+    def __len__(self):
+        return len(self.orifices)
+
+    def solve(self, indices=None, executor=None):
+        """
+        Returns the solutions of the given leak sizes, solving those that have not been solved
+
+        Parameters
+        ----------
+        indices : list of int
+            Indices of the leak sizes
+            Default is None, which returns all leak sizes
+
+        executor : concurrent.futures.Executor object
+            Executor used to solve the leak sizes in parallel (e.g., a ProcessPoolExecutor)
+            Default is None, which solves the leak sizes serially
+
+        Returns
+        -------
+        solutions : list of Flame or Jet objects
+            one for each index, in order
+        """
+        indices = list(range(len(self))) if indices is None else list(indices)
+        missing = [i for i in dict.fromkeys(indices) if self._solutions[i] is None]
+        if missing:
+            orifices = [self.orifices[i] for i in missing]
+            worker_cache = _release_states_for_executor(self.release_cache, executor, self.release_fluid, orifices,
+                                                        self.ambient_fluid, self.notional_noz_t, self.cons_momentum)
+            args = [(self.solution_class, self.release_fluid, orifice, self.ambient_fluid, self.release_angle,
+                     self.cons_momentum, self.notional_noz_t, self.verbose, worker_cache) for orifice in orifices]
+            for i, solution in zip(missing, _map_orifices(_solve_orifice, args, executor)):
+                self._solutions[i] = solution
+        return [self._solutions[i] for i in indices]
+
+
+def _release_states_for_executor(release_cache, executor, fluid, orifices, ambient, nn_T, nn_conserve_momentum):
+    """
+    Returns the release cache to pass with each leak size: the cache itself for a serial calculation,
+    or, for an executor, a copy holding only the throat and notional nozzle states, which are solved here
+    so that every worker reuses them rather than solving them again in its own copy of the cache
+    """
+    if release_cache is None or executor is None:
+        return release_cache
+    for orifice in orifices:
+        throat = release_cache.throat(fluid, orifice, ambient.P)
+        if throat.P > ambient.P:
+            release_cache.expanded(throat, orifice, ambient, nn_T, nn_conserve_momentum)
+    return release_cache.release_states()
+
+
+def _map_orifices(function, args, executor=None):
+    """
+    Applies a per-orifice function to each set of arguments, serially or using an executor,
+    and returns the results in the order of the arguments
+    """
+    if executor is None:
+        return [function(*arg) for arg in args]
+    futures = [executor.submit(function, *arg) for arg in args]
+    return [future.result() for future in futures]
+
+
+def _cached_results(calculate, result_cache, stage, stage_inputs):
+    """
+    Returns the results (dicts of arrays) of each leak size, loading them from the result cache
+    where they have been saved for the same stage inputs, and calculating (calculate(indices))
+    and saving the rest
+    """
+    if result_cache is None:
+        return calculate(list(range(len(stage_inputs))))
+    keys = [result_cache.key(stage, inputs) for inputs in stage_inputs]
+    results = [result_cache.load(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    calculated = calculate(missing) if missing else []
+    for i, result in zip(missing, calculated):
+        result_cache.save(keys[i], result)
+        results[i] = result
+    return results
+
+
+def _solve_orifice(solution_class, release_fluid, orifice, ambient_fluid, release_angle,
+                   cons_momentum, notional_noz_t, verbose, release_cache):
+    """
+    Solves the flame or jet (solution_class) of a single leak size
+    """
+    return solution_class(release_fluid, orifice, ambient_fluid,
+                          theta0=release_angle,
+                          nn_conserve_momentum=cons_momentum, nn_T=notional_noz_t,
+                          verbose=verbose, release_cache=release_cache)
+
+
+def _thermal_effects_for_flame(flame, locations, rel_humid):
+    """
+    Calculates the heat flux (W/m^2) at each location and a summary of the flame for a single leak size
+    """
+    fluxes = flame.generate_positional_flux(locations, rel_humid)
+    return {'fluxes': np.asarray(fluxes, dtype=float),
+            'mass_flow_rate': flame.mass_flow_rate,
+            'visible_length': flame.length(),
+            'width': flame.Wf,
+            'radiant_power': flame.Srad}
+
+
+def _overp_effects_for_jet(jet, locations, overp_method, BST_mach_flame_speed, TNT_equivalence_factor):
+    """
+    Calculates the peak overpressure (Pa) and impulse (Pa*s) at each location
+    and a summary of the jet for a single leak size
+    """
+    method = overp_method.lower()
+    if method == 'bst':
+        over_pressure_model = _unconfined_overpressure.BST_method(jet_object=jet,
+                                                                  mach_flame_speed=BST_mach_flame_speed)
+    elif method == 'tnt':
+        over_pressure_model = _unconfined_overpressure.TNT_method(jet_object=jet,
+                                                                  equivalence_factor=TNT_equivalence_factor)
+    else:
+        over_pressure_model = _unconfined_overpressure.Bauwens_method(jet_object=jet)
+
+    overpressures = over_pressure_model.calc_overpressure(locations)
+    impulses = over_pressure_model.calc_impulse(locations)
+    return {'overpressures': np.asarray(overpressures, dtype=float),
+            'impulses': np.asarray(impulses, dtype=float),
+            'mass_flow_rate': jet.mass_flow_rate,
+            'flammable_mass': getattr(over_pressure_model, 'flammable_mass', np.nan),
+            'origin': np.asarray(over_pressure_model.origin, dtype=float)}
+
+
+def plot_thermal_effect_positions(fluxes, orifices, locations, site_length, site_width, output_dir=None):
+    """
+    Plots the heat flux at each position, one plot per leak size
+
+    Parameters
+    ----------
+    fluxes : ndarray
+        [W/m2] Heat flux for all positions and leak sizes,
+        ordered as returned by calc_thermal_effects
+
+    orifices : list of Orifice objects
+        Leak orifices, one for each leak size
+
+    locations : list of tuples
+        Locations (x, y, z) (m) of the positions
+
+    site_length : float
+        Facility length (m)
+
+    site_width : float
+        Facility width (m)
+
+    output_dir : str
+        File path to directory in which to create plots
+        Default is None, which will use a temporary directory
+        in the current working directory
+
+    Returns
+    -------
+    all_pos_files : list of str
+        position plot file paths
+    """
+    if output_dir is None:
+        output_dir = misc_utils.get_temp_folder()
+    x_locations = [location[0] for location in locations]
+    z_locations = [location[2] for location in locations]
+    all_qrads = np.reshape(fluxes, (len(orifices), len(locations)))
+    all_pos_filepaths = []
+    for i, (orifice, fluxes) in enumerate(zip(orifices, all_qrads)):
+        fluxes_kWm2 = fluxes / 1000
+        fluxes_str = 'Radiative Heat Flux (kW/m$^2$)'
+        now_str = misc_utils.get_now_str()
+        orif_diam_mm = orifice.d * 1000
+        pos_fname = 'HeatFluxPositionPlot{}_{}.png'.format(i, now_str)
+        plot_filepath = os.path.join(output_dir, pos_fname)
+        pos_title = '{} mm Leak Size'.format(round(orif_diam_mm, 3))
+        plot_effect_positions(fluxes_kWm2, fluxes_str,
+                              plot_filepath, pos_title,
+                              x_locations, z_locations,
+                              site_length, site_width)
+        all_pos_filepaths.append(plot_filepath)
+    return all_pos_filepaths
+
+
+def plot_overp_effect_positions(overpressures, impulses, orifices, locations, site_length, site_width,
+                                output_dir=None):
+    """
+    Plots the peak overpressure and impulse at each position, one plot of each per leak size
+    (impulses are only plotted for leak sizes where they exist)
+
+    Parameters
+    ----------
+    overpressures : ndarray
+        [Pa] Peak overpressure for all positions and leak sizes,
+        ordered as returned by calc_overp_effects
+
+    impulses : ndarray
+        [Pa*s] Impulse for all positions and leak sizes,
+        ordered as returned by calc_overp_effects
+
+    orifices : list of Orifice objects
+        Leak orifices, one for each leak size
+
+    locations : list of tuples
+        Locations (x, y, z) (m) of the positions
+
+    site_length : float
+        Facility length (m)
+
+    site_width : float
+        Facility width (m)
+
+    output_dir : str
+        File path to directory in which to create plots
+        Default is None, which will use a temporary directory
+        in the current working directory
+
+    Returns
+    -------
+    all_pos_overp_files : list of str
+        position plot file paths for peak overpressure by position
+
+    all_pos_impulse_files : list of str
+        position plot file paths for impulse by position
+    """
+    if output_dir is None:
+        output_dir = misc_utils.get_temp_folder()
+    x_locations = [location[0] for location in locations]
+    z_locations = [location[2] for location in locations]
+    all_overpressures = np.reshape(overpressures, (len(orifices), len(locations)))
+    all_impulses = np.reshape(impulses, (len(orifices), len(locations)))
+    all_pos_overp_filepaths = []
+    all_pos_impulse_filepaths = []
+    for i, (orifice, overpressures, impulses) in enumerate(zip(orifices, all_overpressures, all_impulses)):
+        overpressures_kPa = overpressures / 1000
+        overpressures_str = 'Peak Overpressure (kPa)'
+        now_str = misc_utils.get_now_str()
+        orif_diam_mm = orifice.d * 1000  # mm
+        pos_fname = 'OverpressurePositionPlot{}_{}.png'.format(i, now_str)
+        plot_filepath = os.path.join(output_dir, pos_fname)
+        pos_title = '{} mm Leak Size'.format(round(orif_diam_mm, 3))
+        plot_effect_positions(overpressures_kPa, overpressures_str,
+                              plot_filepath, pos_title,
+                              x_locations, z_locations,
+                              site_length, site_width)
+        all_pos_overp_filepaths.append(plot_filepath)
+
+        if not np.isnan(impulses).any():
+            impulses_kPas = impulses / 1000
+            impulses_str = 'Impulse (kPa*s)'
+            now_str = misc_utils.get_now_str()
+            pos_fname = 'ImpulsePositionPlot{}_{}.png'.format(i, now_str)
+            plot_filepath = os.path.join(output_dir, pos_fname)
+            plot_effect_positions(impulses_kPas, impulses_str,
+                                  plot_filepath, pos_title,
+                                  x_locations, z_locations,
+                                  site_length, site_width)
+            all_pos_impulse_filepaths.append(plot_filepath)
+    return all_pos_overp_filepaths, all_pos_impulse_filepaths
+
+
 def plot_effect_positions(effects, effect_label, filename, title,
                           x_locations, z_locations, length, width):
     """
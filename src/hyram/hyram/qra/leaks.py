@@ -242,6 +242,11 @@ class Leak:
         leak_freq_dist = LogNormDistribution(mu=self.mu, sigma=self.sigma)
         return leak_freq_dist.mean
 
+    def sample_leak_freq(self, size, method='mc', random_state=None):
+        """ Draws samples of the lognormal leak frequency distribution (see distributions.uniform_samples) """
+        leak_freq_dist = LogNormDistribution(mu=self.mu, sigma=self.sigma)
+        return leak_freq_dist.sample(size, method, random_state)
+
     def __str__(self):
         param_str = ('Leak: size: {}%'.format(self.size)
                      + ', mu: {}'.format(self.mu)
@@ -0,0 +1,190 @@
+"""
+Copyright 2015-2022 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+You should have received a copy of the GNU General Public License along with HyRAM+.
+If not, see https://www.gnu.org/licenses/.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import zipfile
+import zlib
+
+import numpy as np
+
+from .. import __version__
+
+log = logging.getLogger(__name__)
+
+_RESULT_CACHE_FORMAT_VERSION = 1
+
+
+def fluid_key(fluid):
+    """
+    Returns a hashable description of a fluid state for use in result cache keys
+    """
+    return (str(fluid.species), float(fluid.T), float(fluid.P), float(fluid.rho), float(fluid.v),
+            type(fluid.therm).__name__)
+
+
+def orifice_key(orifice):
+    """
+    Returns a hashable description of an orifice for use in result cache keys
+    """
+    return (float(orifice.d), float(orifice.Cd))
+
+
+def locations_key(locations):
+    """
+    Returns a digest of a list of (x, y, z) locations for use in result cache keys
+    """
+    locations = np.ascontiguousarray(locations, dtype=np.float64)
+    return (locations.shape, hashlib.sha1(locations.tobytes()).hexdigest())
+
+
+class PhysicsResultCache:
+    """
+    Content-addressed store of QRA physics results on disk
+
+    Each entry holds the arrays calculated for one stage (e.g., thermal or overpressure effects)
+    of one leak size, and is keyed by a hash of the inputs that feed that stage, so that analyses
+    that only change downstream inputs (e.g., probit models, exposure time, ignition probabilities,
+    occupant hours, or frequencies) load the physics rather than recalculating it.
+    Entries are evicted in least-recently-used order when the directory exceeds the size limit.
+    """
+    def __init__(self, directory, max_bytes=256*2**20):
+        """
+        Initializes the cache, creating the directory if it does not exist
+
+        Parameters
+        ----------
+        directory : str
+            Directory in which the results are saved
+
+        max_bytes : int
+            Maximum total size (bytes) of the saved results
+            Default is 256 MiB
+
+        Calculated
+        ----------
+        hits, misses, evictions : int
+            Number of entries loaded, not found, and removed by this object
+        """
+        if max_bytes <= 0:
+            raise ValueError('Cache size limit must be positive')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, stage, inputs):
+        """
+        Returns the key of a stage calculated from a tuple of (hashable, repr-stable) inputs
+        """
+        description = repr((_RESULT_CACHE_FORMAT_VERSION, __version__, stage, inputs))
+        return '{}_{}'.format(stage, hashlib.sha1(description.encode()).hexdigest())
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def load(self, key):
+        """
+        Returns a dict of the arrays saved under a key, or None if there are none
+        """
+        filename = self._filename(key)
+        if not os.path.exists(filename):
+            self.misses += 1
+            return None
+        try:
+            with np.load(filename) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            # evicted by another process since the check above
+            self.misses += 1
+            return None
+        except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile, zlib.error):
+            # truncated or corrupt entry: remove it so that the results are recalculated and saved again
+            log.warning("Removing unreadable cached physics results {}".format(filename))
+            self._remove(filename)
+            self.misses += 1
+            return None
+        # modification time records the last use, for least-recently-used eviction
+        try:
+            os.utime(filename)
+        except OSError:
+            pass  # evicted by another process after loading, which does not affect the loaded arrays
+        self.hits += 1
+        return arrays
+
+    @staticmethod
+    def _remove(filename):
+        """Removes a file, returning whether it was removed"""
+        try:
+            os.remove(filename)
+        except OSError:
+            return False
+        return True
+
+    def save(self, key, arrays):
+        """
+        Saves a dict of arrays under a key, then evicts the least-recently-used entries
+        if the cache is larger than the size limit
+        """
+        # the temporary suffix keeps partially written files out of the entries
+        handle, temp_filename = tempfile.mkstemp(suffix='.npz.tmp', dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_filename, self._filename(key))
+        except BaseException:
+            self._remove(temp_filename)
+            raise
+        self._evict()
+
+    def _entries(self):
+        """list of (last use, size, filename) of the saved entries, oldest first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, filename))
+        return sorted(entries)
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum([size for _, size, _ in entries])
+        # the newest entry is always kept, even if it is larger than the limit by itself
+        for _, size, filename in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            if not self._remove(filename):
+                continue
+            total -= size
+            self.evictions += 1
+            log.info("Evicted cached physics results {}".format(filename))
+
+    def size(self):
+        """
+        Returns the total size (bytes) of the saved results
+        """
+        return sum([size for _, size, _ in self._entries()])
+
+    def report(self):
+        """
+        Returns a dict of cache counters and sizes
+        """
+        return {'directory': self.directory,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries()),
+                'size_bytes': self.size(),
+                'max_bytes': self.max_bytes}
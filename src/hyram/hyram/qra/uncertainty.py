@@ -0,0 +1,158 @@
+"""
+Copyright 2015-2022 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+You should have received a copy of the GNU General Public License along with HyRAM+.
+If not, see https://www.gnu.org/licenses/.
+"""
+
+import logging
+
+import numpy as np
+
+from . import leak_frequency
+
+log = logging.getLogger(__name__)
+
+
+def sample_leak_frequencies(leak_sizes, release_freq_overrides, component_sets, component_failure_set,
+                            num_samples, method='lhs', random_state=None):
+    """
+    Draws samples of the total release frequency of each leak size
+
+    Mirrors leak_frequency.compute_leak_frequencies: the frequency of each leak size is the sum
+    of the component leak frequencies (or the override value, if one is given), and the fueling
+    failure frequency is added to the 100% leak size. Every component leak frequency and
+    component failure probability is sampled independently from its distribution.
+
+    Parameters
+    ----------
+    leak_sizes : list of floats
+        Leak sizes (% of pipe flow area), in the order of the analysis (ending with 100)
+
+    release_freq_overrides : list of floats or None
+        Release frequencies to use instead of the component leak frequencies (-1 if not used)
+
+    component_sets : list of ComponentSet objects
+        Components and their leak frequency distributions
+
+    component_failure_set : ComponentFailureSet object
+        Fueling failure distributions
+
+    num_samples : int
+        Number of samples
+
+    method : {'mc', 'lhs'}
+        Monte Carlo or Latin hypercube sampling
+
+    random_state : None, int, or numpy Generator
+        Seed or generator of random numbers
+
+    Returns
+    -------
+    freqs : ndarray
+        Samples of the total release frequency (per year), shape (num_samples, number of leak sizes)
+    """
+    rng = np.random.default_rng(random_state)
+    overrides = leak_frequency.set_release_freq_override_defaults(release_freq_overrides, leak_sizes)
+    freqs = np.zeros((num_samples, len(leak_sizes)))
+    for i, (leak_size, override) in enumerate(zip(leak_sizes, overrides)):
+        if override != -1:
+            freqs[:, i] = override
+            continue
+        for comp_set in component_sets:
+            freqs[:, i] += comp_set.sample_leak_frequency(leak_size, num_samples, method, rng)
+    freqs[:, -1] += component_failure_set.sample_fueling_fail_freq(num_samples, method, rng)
+    return freqs
+
+
+def propagate_frequency_uncertainty(leak_sizes, release_freq_overrides, component_sets, component_failure_set,
+                                    end_states, event_consequences, total_occupants, occupant_avg_hours,
+                                    num_samples=100000, method='lhs', percentiles=(5, 50, 95),
+                                    random_state=None, return_samples=False):
+    """
+    Propagates the uncertainty of the leak frequencies and component failure probabilities
+    to the risk metrics (PLL, FAR, and AIR)
+
+    The event tree probabilities and the consequences (expected fatalities) of each end state
+    do not depend on the frequencies, so they are combined once into the expected fatalities
+    per release of each leak size; each sample of the risk metrics is then a weighted sum
+    of the sampled release frequencies.
+
+    Parameters
+    ----------
+    leak_sizes, release_freq_overrides, component_sets, component_failure_set :
+        see sample_leak_frequencies
+
+    end_states : list of EndState objects
+        Event tree end states, with the probability of each end state for each leak size
+
+    event_consequences : list of arrays
+        Expected fatalities of each end state for each leak size
+
+    total_occupants : int
+        Number of occupants
+
+    occupant_avg_hours : float
+        Average annual exposed hours of the occupants
+
+    num_samples : int
+        Number of samples
+        Default is 100,000
+
+    method : {'mc', 'lhs'}
+        Monte Carlo or Latin hypercube sampling
+        ('mc' is faster for beta distributions, which are sampled directly rather than by inversion)
+        Default is 'lhs'
+
+    percentiles : sequence of floats
+        Percentiles (between 0 and 100) of the risk metrics to return
+        Default is (5, 50, 95)
+
+    random_state : None, int, or numpy Generator
+        Seed or generator of random numbers
+
+    return_samples : bool
+        Whether to include the samples of the risk metrics in the results
+        Default is False
+
+    Returns
+    -------
+    results : dict
+        num_samples : int
+            Number of samples
+        method : str
+            Sampling method
+        pll, far, air : dict
+            mean : float
+                Mean of the samples of the risk metric
+            percentiles : dict
+                Value of the risk metric at each percentile, keyed by percentile
+            samples : ndarray
+                Samples of the risk metric (only if return_samples)
+    """
+    if num_samples < 1:
+        raise ValueError('Number of samples must be at least 1')
+    num_leak_sizes = len(leak_sizes)
+    fatalities_per_release = np.zeros(num_leak_sizes)
+    for end_state, consequence_outcome in zip(end_states, event_consequences):
+        end_state_probabilities = np.broadcast_to(end_state.end_state_probability, (num_leak_sizes,))
+        fatalities_per_release += end_state_probabilities * np.asarray(consequence_outcome, dtype=float)
+
+    freqs = sample_leak_frequencies(leak_sizes, release_freq_overrides, component_sets, component_failure_set,
+                                    num_samples, method, random_state)
+    pll = freqs @ fatalities_per_release
+    hours_per_year = 8760  # as risk.calc_far
+    with np.errstate(divide='ignore', invalid='ignore'):
+        far = np.where(pll == 0, 0., pll * 1e8 / (total_occupants * hours_per_year))
+    air = far * 1e-8 * occupant_avg_hours
+
+    results = {'num_samples': num_samples, 'method': method}
+    for name, samples in [('pll', pll), ('far', far), ('air', air)]:
+        values = np.percentile(samples, percentiles)
+        results[name] = {'mean': float(np.mean(samples)),
+                         'percentiles': {p: float(value) for p, value in zip(percentiles, values)}}
+        if return_samples:
+            results[name]['samples'] = samples
+    log.info("PLL uncertainty ({} {} samples): {}".format(num_samples, method, results['pll']))
+    return results
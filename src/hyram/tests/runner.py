@@ -12,6 +12,7 @@ import unittest
 from tests import test_phys_api
 from tests import test_phys_flame
 from tests import test_phys_fluid
+from tests import test_phys_jet
 from tests import test_phys_overpressure
 from tests import test_phys_utils
 from tests import test_qra_analysis
@@ -21,7 +22,9 @@ from tests import test_qra_ignition_probs
 from tests import test_qra_pipe_size
 from tests import test_qra_positions
 from tests import test_qra_probits
+from tests import test_qra_result_cache
 from tests import test_qra_risk
+from tests import test_qra_uncertainty
 
 
 def suite():
@@ -54,8 +57,11 @@ def suite():
         suite.addTest(unittest.makeSuite(test_qra_probits.TestFatalityProbabilityCalc))
         suite.addTest(unittest.makeSuite(test_qra_probits.TestThermalProbits))
         suite.addTest(unittest.makeSuite(test_qra_probits.TestOverpressureProbits))
+        suite.addTest(unittest.makeSuite(test_qra_result_cache.TestPhysicsResultCache))
         suite.addTest(unittest.makeSuite(test_qra_risk.TestRiskMetricCalcs))
         suite.addTest(unittest.makeSuite(test_qra_risk.TestScenarioRiskCalcs))
+        suite.addTest(unittest.makeSuite(test_qra_uncertainty.TestDistributionSampling))
+        suite.addTest(unittest.makeSuite(test_qra_uncertainty.TestFrequencyUncertainty))
 
     # PHYSICS TESTS
     if do_test_phys_api:
@@ -69,8 +75,27 @@ def suite():
     if do_test_phys:
         suite.addTest(unittest.makeSuite(test_phys_fluid.PureFluidTestCase))
         suite.addTest(unittest.makeSuite(test_phys_fluid.BlendFluidTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_fluid.TabulatedFluidTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_fluid.PropsCacheTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_fluid.OrificeFlowTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_fluid.ReleaseStateCacheTestCase))
         suite.addTest(unittest.makeSuite(test_phys_flame.TestAtmosphericTransmissivity))
         suite.addTest(unittest.makeSuite(test_phys_flame.TestFlameObject))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestFlameJacobian))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestCombustionCache))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestCombustionTemperature))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestMultiSourceRadiation))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestRadiativeKernel))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestHazardDistanceTable))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestSlicedHeatFlux))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestAdaptiveRadiation))
+        suite.addTest(unittest.makeSuite(test_phys_flame.TestRadiativeField))
+        suite.addTest(unittest.makeSuite(test_phys_jet.JetIntegralTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_jet.JetJacobianTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_jet.JetDenseOutputTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_jet.JetFlammableMassTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_jet.JetPointQueryTestCase))
+        suite.addTest(unittest.makeSuite(test_phys_jet.JetIsoContourTestCase))
         suite.addTest(unittest.makeSuite(test_phys_overpressure.GenericMethodTestCase))
         suite.addTest(unittest.makeSuite(test_phys_overpressure.BstMethodTestCase))
         suite.addTest(unittest.makeSuite(test_phys_overpressure.TntMethodTestCase))
@@ -6,11 +6,22 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+import functools
+import pickle
+import tempfile
 import unittest
+from unittest import mock
+import warnings
+
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy import integrate, optimize
 
 import hyram.phys.api as phys_api
-from hyram.phys import Orifice, Flame
+from hyram.phys import Orifice, Flame, Fluid, RadiativeField
+from hyram.phys import _therm
 from hyram.phys._flame import calc_transmissivity
+from hyram.phys._plots import plot_sliced_contour, _evaluate_slice
 
 
 VERBOSE = False
@@ -83,5 +94,375 @@ class TestFlameObject(unittest.TestCase):
         self.assertEqual(len(fluxes), 0)
 
 
+class TestFlameJacobian(unittest.TestCase):
+    """
+    Tests of the Jacobian of the flame governing equations and the solvers that use it
+    """
+    def setUp(self):
+        self.release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        self.ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        self.flame = Flame(self.release_fluid, Orifice(0.003), self.ambient_fluid, verbose=VERBOSE)
+
+    def test_jacobian(self):
+        flame = self.flame
+        i = len(flame.S)//3
+        conditions = np.array([flame.V_cl[i], flame.B[i], flame.theta[i], flame.f_cl[i], flame.x[i], flame.y[i]])
+        jac = flame._jacobian(flame.S[i], conditions)
+        for j in [0, 1, 3]:
+            h = 1e-7*conditions[j]
+            dz = (flame._govEqns(flame.S[i], conditions + h*np.eye(6)[j]) -
+                  flame._govEqns(flame.S[i], conditions - h*np.eye(6)[j]))/(2*h)
+            np.testing.assert_allclose(jac[:, j], dz, rtol=1e-3, atol=1e-5*np.max(np.abs(dz)))
+        np.testing.assert_array_equal(jac[:, 4:], 0)
+        self.assertEqual(jac[4, 2], -np.sin(conditions[2]))
+
+    def test_rhs_calls(self):
+        flame = self.flame
+        conditions = np.array([flame.V_cl[0], flame.B[0], flame.theta[0], flame.f_cl[0], flame.x[0], flame.y[0]])
+        with mock.patch.object(flame, '_govEqns', wraps=flame._govEqns) as govEqns:
+            flame._jacobian(flame.S[0], conditions)
+        self.assertEqual(govEqns.call_count, 0)
+        calls = {}
+        for jac in [None, flame._jacobian]:
+            with mock.patch.object(flame, '_govEqns', wraps=flame._govEqns) as govEqns:
+                sol = integrate.solve_ivp(flame._govEqns, [flame.S[0], flame.S[-1]], conditions, method='BDF',
+                                          atol=1e-6, rtol=1e-6, jac=jac)
+            self.assertTrue(sol.success)
+            calls[jac is None] = govEqns.call_count
+        self.assertLess(calls[False], calls[True])
+
+    def test_radau(self):
+        flame = Flame(self.release_fluid, Orifice(0.003), self.ambient_fluid, solver='Radau')
+        self.assertAlmostEqual(flame.x[-1], self.flame.x[-1], places=4)
+        self.assertAlmostEqual(flame.y[-1], self.flame.y[-1], places=4)
+
+    def test_explicit_solvers(self):
+        for solver in ['RK45', 'RK23', 'DOP853']:
+            with warnings.catch_warnings():
+                warnings.filterwarnings('error', message='.*jac.*')
+                flame = Flame(self.release_fluid, Orifice(0.003), self.ambient_fluid, solver=solver)
+            self.assertAlmostEqual(flame.x[-1], self.flame.x[-1], places=2)
+
+
+class TestCombustionCache(unittest.TestCase):
+    """
+    Tests of the process-wide (and on-disk) cache of combustion chemistry
+    """
+    def setUp(self):
+        _therm.clear_combustion_cache()
+        self.fluid = Fluid(species='H2', T=288, P=101325)
+        self.fvals = np.linspace(0, 1, 11)
+
+    def tearDown(self):
+        _therm.set_combustion_cache_dir(None)
+        _therm.clear_combustion_cache()
+
+    def assertSameChemistry(self, chem1, chem2):
+        self.assertEqual(chem1.fstoich, chem2.fstoich)
+        self.assertEqual(chem1.sigma, chem2.sigma)
+        np.testing.assert_array_equal(chem1.T_prod(self.fvals), chem2.T_prod(self.fvals))
+        np.testing.assert_array_equal(chem1.rho_prod(self.fvals), chem2.rho_prod(self.fvals))
+        np.testing.assert_array_equal(chem1.drhodf(self.fvals), chem2.drhodf(self.fvals))
+
+    def test_shared_in_memory(self):
+        chem = _therm.get_combustion(self.fluid)
+        self.assertIs(_therm.get_combustion(Fluid(species='H2', T=288, P=101325)), chem)
+        self.assertIsNot(_therm.get_combustion(self.fluid, numpoints=50), chem)
+        self.assertSameChemistry(chem, _therm.Combustion(self.fluid))
+
+    def test_saved_to_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            _therm.set_combustion_cache_dir(directory)
+            chem = _therm.get_combustion(self.fluid)
+            _therm.clear_combustion_cache()
+            loaded = _therm.get_combustion(self.fluid)
+            self.assertIsNot(loaded, chem)
+            self.assertSameChemistry(chem, loaded)
+            self.assertEqual(chem.MW, loaded.MW)
+            self.assertEqual(chem.gamma_reac, loaded.gamma_reac)
+
+    def test_pickle(self):
+        chem = _therm.get_combustion(self.fluid)
+        self.assertSameChemistry(chem, pickle.loads(pickle.dumps(chem)))
+
+    def test_flame_uses_cache(self):
+        flame = Flame(phys_api.create_fluid('H2', 288, 35e6), Orifice(0.001), Fluid(species='air', T=288, P=101325))
+        self.assertIs(flame.chem, _therm.get_combustion(self.fluid))
+
+
+class TestCombustionTemperature(unittest.TestCase):
+    """
+    Tests of the elementwise adiabatic flame temperature solver
+    """
+    def test_against_root(self):
+        for species in ['H2', 'CH4']:
+            chem = _therm.Combustion(Fluid(species=species, T=288, P=101325), numpoints=50)
+            f = chem._fvals
+            DHc = chem.DHc*chem._Yprod(f)['H2O']/(chem._nH/2)*chem.MW[chem.reac]/chem.MW['H2O']
+            Hdict = chem._Hdict(288, npoints=500)
+            H = (chem._H(288, chem._Yreac(f), Hdict)*chem._MWmix(chem._Yreac(f))/chem._MWmix(chem._Yprod(f))
+                 + DHc)
+            T = optimize.root(lambda T: chem._H(T, chem._Yprod(f), Hdict) - H, 288*np.ones_like(f))['x']
+            np.testing.assert_allclose(chem.T_prod(f), T, rtol=1e-7)
+
+    def test_scalar(self):
+        chem = _therm.get_combustion(Fluid(species='H2', T=288, P=101325))
+        T = chem._T_combustion(288, chem.fstoich)
+        self.assertEqual(np.shape(T), ())
+        self.assertAlmostEqual(T/chem.T_prod(chem.fstoich), 1, places=4)
+
+    def test_many_points(self):
+        fluid = Fluid(species='H2', T=288, P=101325)
+        chem = _therm.Combustion(fluid, numpoints=2000)
+        self.assertTrue(np.all(np.isfinite(chem._Tvals)))
+        Tad = _therm.get_combustion(fluid).T_prod(chem.fstoich)
+        self.assertAlmostEqual(chem.T_prod(chem.fstoich)/Tad, 1, places=4)
+
+
+class TestMultiSourceRadiation(unittest.TestCase):
+    """
+    Tests of the vectorized multi-source radiation model
+    """
+    @classmethod
+    def setUpClass(cls):
+        release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        cls.flame = Flame(release_fluid, Orifice(0.003), ambient_fluid, verbose=VERBOSE)
+
+    def reference_flux(self, x, y, z, RH, WaistLoc=0.75, N=50):
+        # point source summation, one source at a time
+        flame = self.flame
+        sources, w = flame._radiative_sources(WaistLoc, N)
+        obs = np.array([x, y, z], dtype=float)
+        flux = 0
+        for source, weight in zip(sources, w):
+            L = np.linalg.norm(source - obs)
+            flux += weight / (4 * np.pi * L ** 2) * flame.Srad * calc_transmissivity(L, flame.ambient.T, RH)
+        return flux
+
+    def test_against_point_sources(self):
+        points = np.random.default_rng(1).uniform(-5, 5, (20, 3))
+        flux = self.flame.Qrad_multi(points[:, 0], points[:, 1], points[:, 2], 0.5)
+        reference = [self.reference_flux(*point, 0.5) for point in points]
+        np.testing.assert_allclose(flux, reference, rtol=1e-12)
+
+    def test_grid_matches_flattened(self):
+        x, y = np.mgrid[-2:6:9j, 0:4:5j]
+        z = np.ones_like(x)
+        flux = self.flame.Qrad_multi(x, y, z, 0.89)
+        self.assertEqual(flux.shape, x.shape)
+        flat = self.flame.Qrad_multi(x.ravel(), y.ravel(), z.ravel(), 0.89)
+        np.testing.assert_allclose(flux, flat.reshape(x.shape), rtol=1e-12)
+        self.assertAlmostEqual(flux[3, 2], self.reference_flux(x[3, 2], y[3, 2], 1, 0.89), delta=1e-9 * flux[3, 2])
+
+    def test_chunks_and_precision(self):
+        points = np.random.default_rng(2).uniform(-20, 20, (1000, 3))
+        flux = self.flame.Qrad_multi(*points.T, 0.5)
+        np.testing.assert_allclose(self.flame.Qrad_multi(*points.T, 0.5, chunk_size=7), flux, rtol=1e-12)
+        flux32 = self.flame.Qrad_multi(*points.T, 0.5, dtype=np.float32)
+        np.testing.assert_allclose(flux32, flux, rtol=1e-5)
+        with self.assertRaises(ValueError):
+            self.flame.Qrad_multi(*points.T, 0.5, dtype=int)
+
+    def test_scalar(self):
+        flux = self.flame.Qrad_multi(1, 2, 3, 0.5)
+        self.assertEqual(np.shape(flux), ())
+        self.assertAlmostEqual(float(flux), self.reference_flux(1, 2, 3, 0.5), delta=1e-9 * flux)
+
+
+class TestRadiativeKernel(unittest.TestCase):
+    """
+    Tests of reusing the radiation geometry for other atmospheric conditions
+    """
+    @classmethod
+    def setUpClass(cls):
+        release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        cls.flame = Flame(release_fluid, Orifice(0.003), ambient_fluid, verbose=VERBOSE)
+        cls.points = np.random.default_rng(3).uniform(-10, 10, (50, 3))
+
+    def reference_flux(self, RH, T, CO2=335):
+        sources, w = self.flame._radiative_sources()
+        L = np.linalg.norm(sources[np.newaxis, :, :] - self.points[:, np.newaxis, :], axis=2)
+        return self.flame.Srad * np.sum(w / (4 * np.pi * L ** 2) * calc_transmissivity(L, T, RH, CO2), axis=1)
+
+    def test_atmospheric_conditions(self):
+        kernel = self.flame.radiative_kernel(*self.points.T)
+        np.testing.assert_allclose(kernel.flux(0.5), self.flame.Qrad_multi(*self.points.T, 0.5), rtol=1e-13)
+        for RH, T, CO2 in [(0.2, 288, 335), (0.9, 300, 335), (0.5, 273, 420)]:
+            np.testing.assert_allclose(kernel.flux(RH, T, CO2), self.reference_flux(RH, T, CO2), rtol=1e-12)
+
+    def test_sweep(self):
+        kernel = self.flame.radiative_kernel(*self.points.T)
+        RH = np.linspace(0.1, 0.9, 5)
+        flux = kernel.flux(RH, Srad=2 * self.flame.Srad)
+        self.assertEqual(flux.shape, (5, len(self.points)))
+        for i, rh in enumerate(RH):
+            np.testing.assert_allclose(flux[i], 2 * self.reference_flux(rh, 288), rtol=1e-12)
+
+    def test_cached_per_observers(self):
+        kernel = self.flame.radiative_kernel(*self.points.T)
+        self.assertIs(self.flame.radiative_kernel(*self.points.T), kernel)
+        self.assertIsNot(self.flame.radiative_kernel(*self.points[:10].T), kernel)
+        locations = [tuple(point) for point in self.points]
+        np.testing.assert_allclose(self.flame.generate_positional_flux(locations, 0.7),
+                                   self.reference_flux(0.7, 288), rtol=1e-12)
+
+
+class TestHazardDistanceTable(unittest.TestCase):
+    """
+    Tests of distances to several heat flux levels in several directions
+    """
+    @classmethod
+    def setUpClass(cls):
+        release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        cls.flame = Flame(release_fluid, Orifice(0.003), ambient_fluid, verbose=VERBOSE)
+
+    def test_against_single_distances(self):
+        heat_fluxes = [1577, 4732, 25237]
+        directions = ['x', '-x', 'y', 'z', '-z']
+        table = self.flame.hazard_distance_table(heat_fluxes, directions)
+        self.assertEqual(list(table.keys()), directions)
+        for direction in directions:
+            axis = direction[-1]
+            negative_direction = direction.startswith('-')
+            for heat_flux, distance in zip(heat_fluxes, table[direction]):
+                self.assertAlmostEqual(distance, self.flame.calc_distance_to_heatflux(
+                    heat_flux, axis, negative_direction=negative_direction), places=5)
+        np.testing.assert_array_less(np.diff(table['x']), 0)
+        np.testing.assert_allclose(table['z'], -table['-z'], rtol=1e-8)
+
+    def test_bad_direction(self):
+        with self.assertRaises(ValueError):
+            self.flame.hazard_distance_table([1577], ['+-x'])
+
+
+class TestSlicedHeatFlux(unittest.TestCase):
+    """
+    Tests of evaluating and reusing the slices of heat flux plots
+    """
+    @classmethod
+    def setUpClass(cls):
+        release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        cls.flame = Flame(release_fluid, Orifice(0.003), ambient_fluid, verbose=VERBOSE)
+        cls.levels = np.array([1.577, 4.732, 25.237]) * 1000
+        fig, cls.fields = cls.flame.plot_heat_flux_sliced(savefig=False, return_fields=True, nx=60, ny=60, nz=60)
+        plt.close(fig)
+
+    def test_threads(self):
+        # tiles smaller than the slices, so that each slice is split over several tiles
+        tiled_plot = functools.partial(plot_sliced_contour, tile_size=500)
+        with mock.patch('hyram.phys._flame.plot_sliced_contour', tiled_plot), \
+                mock.patch.object(self.flame, 'Qrad_multi', wraps=self.flame.Qrad_multi) as value_func:
+            fig, fields = self.flame.plot_heat_flux_sliced(savefig=False, return_fields=True, nx=60, ny=60, nz=60,
+                                                           max_workers=3)
+        plt.close(fig)
+        tiles = [len(call.args[0]) for call in value_func.call_args_list]
+        self.assertEqual(tiles.count(500), 3*(60*60//500))
+        for key in ['xy', 'xz', 'zy']:
+            for array, reference in zip(fields[key], self.fields[key]):
+                np.testing.assert_array_equal(array, reference)
+
+    def test_progressive(self):
+        fig, fields = self.flame.plot_heat_flux_sliced(savefig=False, return_fields=True, nx=60, ny=60, nz=60,
+                                                       progressive=True)
+        plt.close(fig)
+        for key in ['xy', 'xz', 'zy']:
+            np.testing.assert_array_equal(np.digitize(fields[key][2], self.levels),
+                                          np.digitize(self.fields[key][2], self.levels))
+
+    def test_progressive_peak_within_cell(self):
+        # a peak at the center of a coarse cell, with all of the corners of the cell below the level
+        x, y = np.mgrid[0:40:41j, 0:40:41j]
+
+        def value_func(x, y, z):
+            return np.exp(-((x - 22)**2 + (y - 14)**2)/(2*0.7**2))
+
+        evaluation = (value_func, (), {}, [0.5])
+        full = _evaluate_slice(x, y, np.zeros_like(x), *evaluation, progressive=False, tile_size=4096, executor=None)
+        progressive = _evaluate_slice(x, y, np.zeros_like(x), *evaluation, progressive=True, tile_size=4096,
+                                      executor=None)
+        self.assertGreater(progressive.max(), 0.5)
+        np.testing.assert_array_equal(progressive > 0.5, full > 0.5)
+
+    def test_replot_from_fields(self):
+        def value_func(x, y, z):
+            raise AssertionError('fields should not be recalculated')
+
+        fig = plot_sliced_contour([1.577, 4.732], (0, 2), None, None, 60, 60, 60, None, value_func,
+                                  None, 'Heat Flux', fields=self.fields)
+        self.assertEqual(fig.axes[0].get_xlim(), (0, 2))
+        plt.close(fig)
+
+
+class TestAdaptiveRadiation(unittest.TestCase):
+    """
+    Tests of using fewer radiative sources for observers far from the flame
+    """
+    @classmethod
+    def setUpClass(cls):
+        release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        cls.flame = Flame(release_fluid, Orifice(0.003), ambient_fluid, verbose=VERBOSE)
+        rng = np.random.default_rng(4)
+        cls.points = rng.uniform(-1, 1, (5000, 3)) * np.logspace(0, 3, 5000)[:, np.newaxis]
+
+    def test_error_within_tolerance(self):
+        flux = self.flame.Qrad_multi(*self.points.T, 0.5)
+        for rtol in [1e-2, 1e-4, 1e-6]:
+            kernel = self.flame.radiative_kernel(*self.points.T, rtol=rtol)
+            np.testing.assert_allclose(kernel.flux(0.5), flux, rtol=rtol)
+            self.assertLess(np.mean(kernel.num_sources), 50)
+        np.testing.assert_allclose(self.flame.Qrad_multi(*self.points.T, 0.5, rtol=1e-3), flux, rtol=1e-3)
+
+    def test_far_field_single_source(self):
+        kernel = self.flame.radiative_kernel(*self.points.T, rtol=1e-3)
+        far = np.linalg.norm(self.points, axis=1) > 100 * self.flame.Lvis
+        self.assertTrue(np.any(far))
+        np.testing.assert_array_equal(kernel.num_sources[far], 1)
+        near = self.flame.radiative_kernel([0, self.flame.Lvis / 2], [0.1, 0.1], [0, 0], rtol=1e-3)
+        np.testing.assert_array_equal(near.num_sources, 50)
+
+
+class TestRadiativeField(unittest.TestCase):
+    """
+    Tests of the tabulated radiative heat flux field
+    """
+    @classmethod
+    def setUpClass(cls):
+        release_fluid = phys_api.create_fluid('H2', 288, 35e6)
+        ambient_fluid = phys_api.create_fluid('AIR', 288, 101325)
+        cls.flame = Flame(release_fluid, Orifice(0.003), ambient_fluid, verbose=VERBOSE)
+        cls.field = RadiativeField(cls.flame, 0.5, rtol=1e-3, floor=10)
+        rng = np.random.default_rng(5)
+        cls.points = rng.uniform(-1, 1, (20000, 3)) * np.array([150, 100, 150])
+        cls.exact = cls.flame.Qrad_multi(*cls.points.T, 0.5)
+
+    def test_within_tolerance(self):
+        self.assertLessEqual(self.field.error, 1e-3)
+        flux = self.field.flux(*self.points.T)
+        above_floor = self.exact > self.field.floor
+        self.assertGreater(np.sum(above_floor), 1000)
+        np.testing.assert_allclose(flux[above_floor], self.exact[above_floor], rtol=1e-3)
+
+    def test_pruned_and_inner_points(self):
+        distance = np.linalg.norm(self.points - self.field.center, axis=1)
+        pruned = distance > self.field.prune_distance
+        self.assertTrue(np.any(pruned))
+        np.testing.assert_array_less(self.exact[pruned], self.field.floor)
+        np.testing.assert_array_equal(self.field.flux(*self.points[pruned].T), 0)
+        inner = distance < self.field.inner_distance
+        self.assertTrue(np.any(inner))
+        np.testing.assert_allclose(self.field.flux(*self.points[inner].T), self.exact[inner], rtol=1e-12)
+
+    def test_shape_and_symmetry(self):
+        x, y = np.mgrid[-40:40:5j, 0:20:4j]
+        flux = self.field.flux(x, y, 12)
+        self.assertEqual(flux.shape, x.shape)
+        np.testing.assert_array_equal(flux, self.field.flux(x, y, -12))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,9 +6,16 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import pickle
 import unittest
 
-from hyram.phys import Fluid
+import numpy as np
+
+from hyram.phys import Fluid, Orifice, ReleaseStateCache, Jet, Flame
+from hyram.phys._notional_nozzle import NotionalNozzle
+from hyram.phys import _therm
+from hyram.phys._therm import CoolPropWrapper, TabulatedWrapper
 
 """
 NOTE: if running from IDE like pycharm, make sure cwd is hyram/ and not hyram/tests.
@@ -93,6 +100,13 @@ class PureFluidTestCase(unittest.TestCase):
         self.assertAlmostEqual(fluid.P, 110000.)
 
 
+    def test_pickle(self):
+        fluid = Fluid(species='h2', T=315, P=200000)
+        copied = pickle.loads(pickle.dumps(fluid))
+        self.assertEqual(copied.rho, fluid.rho)
+        self.assertEqual(copied.therm.PropsSI('D', T=300, P=1e6), fluid.therm.PropsSI('D', T=300, P=1e6))
+
+
 class BlendFluidTestCase(unittest.TestCase):
     """
     Test engineering toolkit temperature, pressure, density API interface.
@@ -115,3 +129,256 @@ class BlendFluidTestCase(unittest.TestCase):
         self.assertAlmostEqual(fluid.T, 287.)
         self.assertAlmostEqual(fluid.P, 35e6)
 
+    def test_blend_inverse_flashes(self):
+        fluid = Fluid(species={'ch4': 0.5, 'n2': 0.5}, T=287, P=35e6)
+        s, h, rho = fluid.therm.PropsSI(['S', 'H', 'D'], T=250, P=1e7)
+        self.assertAlmostEqual(fluid.therm.PropsSI('T', P=1e7, S=s), 250.)
+        self.assertAlmostEqual(fluid.therm.PropsSI('T', P=1e7, H=h), 250.)
+        self.assertAlmostEqual(fluid.therm.PropsSI('P', T=250, D=rho)/1e7, 1.)
+
+    def test_blend_state_per_wrapper(self):
+        fluid_1 = Fluid(species={'ch4': 0.5, 'n2': 0.5}, T=287, P=35e6)
+        fluid_2 = Fluid(species={'ch4': 0.5, 'n2': 0.5}, T=300, P=1e6)
+        self.assertIsNot(fluid_1.therm._eos, fluid_2.therm._eos)
+        fluid_1.therm._uncached_PropsSI('D', T=287, P=35e6)
+        fluid_2.therm._uncached_PropsSI('D', T=300, P=1e6)
+        self.assertEqual(fluid_1.therm._eos_PT, (35e6, 287.))
+        self.assertAlmostEqual(fluid_1.therm.PropsSI('T', P=35e6, D=fluid_1.rho), 287.)
+
+    def test_blend_threads(self):
+        therm = Fluid(species={'ch4': 0.5, 'n2': 0.5}, T=287, P=35e6).therm
+        states = [(T, P) for T in np.linspace(250, 350, 10) for P in [1e5, 1e6, 1e7]]
+        expected = [therm._uncached_PropsSI('D', T=T, P=P) for T, P in states]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda TP: therm._uncached_PropsSI('D', T=TP[0], P=TP[1]), states*4))
+        np.testing.assert_array_equal(results, expected*4)
+
+    def test_failed_update_raises_error(self):
+        fluid = Fluid(species={'ch4': 0.5, 'n2': 0.5}, T=287, P=35e6)
+        rho = fluid.therm._uncached_PropsSI('D', T=300, P=1e6)
+        with self.assertRaises(ValueError):
+            fluid.therm._uncached_PropsSI('D', T=300, P=-1e6)
+        # the previous state is not mistaken for the state of the failed update
+        self.assertIsNone(fluid.therm._eos_PT)
+        self.assertEqual(fluid.therm._uncached_PropsSI('D', T=300, P=1e6), rho)
+
+    def test_pickle(self):
+        fluid = Fluid(species={'ch4': 0.5, 'n2': 0.5}, T=287, P=35e6)
+        copied = pickle.loads(pickle.dumps(fluid))
+        self.assertIsNot(copied.therm._eos, fluid.therm._eos)
+        self.assertAlmostEqual(copied.therm.PropsSI('T', P=35e6, D=fluid.rho), 287.)
+
+
+
+class TabulatedFluidTestCase(unittest.TestCase):
+    """
+    Test fluid properties from the tabulated equation of state against CoolProp.
+    """
+    def setUp(self):
+        self.therm = TabulatedWrapper('Hydrogen', T_range=(100, 500), P_range=(1e4, 1e8), numpoints=40, rtol=1e-4)
+        self.coolprop = CoolPropWrapper('Hydrogen')
+
+    def test_error_bounds(self):
+        for pair in [('T', 'P'), ('D', 'U'), ('P', 'S'), ('H', 'D')]:
+            self.assertLessEqual(self.therm.error_bounds[pair], 1e-4)
+
+    def test_error_away_from_check_points(self):
+        # the error bounds are checked at a few points per cell, so are estimates at other points
+        rng = np.random.default_rng(0)
+        for table in self.therm._tables.values():
+            i, j = np.nonzero(table.valid)
+            cells = rng.integers(len(i), size=2000)
+            x1, x2 = [ax[n[cells]] + rng.random(len(cells))*np.diff(ax)[n[cells]] for ax, n in zip(table.axes, (i, j))]
+            v1, v2 = [np.exp(x) if k in _therm._LOG_PROPS else x for k, x in zip(table.keys, (x1, x2))]
+            for k in ['D', 'T']:
+                if k not in table.outputs:
+                    continue
+                true = self.coolprop._cp.PropsSI(k, table.keys[0], v1, table.keys[1], v2, 'Hydrogen')
+                np.testing.assert_allclose(table(k, x1, x2), true, rtol=3*table.max_error)
+
+    def test_fluid_within_table(self):
+        fluid = Fluid(species='hydrogen', T=288, P=35e6, therm=self.therm)
+        ref = Fluid(species='hydrogen', T=288, P=35e6)
+        self.assertAlmostEqual(fluid.rho, ref.rho, delta=ref.rho*1e-4)
+        self.assertEqual(fluid.phase, ref.phase)
+        self.assertGreater(self.therm.table_calls, 0)
+
+    def test_inverse_pairs(self):
+        h, s, u, rho = self.coolprop.PropsSI(['H', 'S', 'U', 'D'], T=250, P=2e7)
+        T, rho_PS = self.therm.PropsSI(['T', 'D'], P=2e7, S=s)
+        self.assertAlmostEqual(T, 250, delta=250*1e-4)
+        self.assertAlmostEqual(rho_PS, rho, delta=rho*1e-4)
+        self.assertAlmostEqual(self.therm.PropsSI('T', D=rho, U=u), 250, delta=250*1e-4)
+        self.assertAlmostEqual(self.therm.PropsSI('S', H=h, D=rho), s, delta=abs(s)*1e-4)
+
+    def test_fallback_outside_table(self):
+        calls = self.therm.fallback_calls
+        rho = self.therm.PropsSI('D', T=1000, P=1e5)
+        self.assertEqual(rho, self.coolprop.PropsSI('D', T=1000, P=1e5))
+        self.assertEqual(self.therm.fallback_calls, calls + 1)
+
+
+class PropsCacheTestCase(unittest.TestCase):
+    """
+    Test memoization of property evaluations.
+    """
+    def setUp(self):
+        _therm.clear_props_cache()
+
+    def tearDown(self):
+        _therm.set_props_cache(enabled=True, maxsize=4096, sig_digits=12)
+
+    def test_cached_values_match_uncached(self):
+        therm = CoolPropWrapper('Hydrogen')
+        first = therm.PropsSI(['H', 'D'], T=300, P=1e6)
+        second = therm.PropsSI(['H', 'D'], T=300, P=1e6)
+        _therm.set_props_cache(enabled=False)
+        uncached = therm.PropsSI(['H', 'D'], T=300, P=1e6)
+        for val_1, val_2, val_3 in zip(first, second, uncached):
+            self.assertEqual(val_1, val_3)
+            self.assertEqual(val_2, val_3)
+        info = _therm.props_cache_info('Hydrogen')
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 1)
+
+    def test_keyword_order(self):
+        therm = CoolPropWrapper('Hydrogen')
+        therm.PropsSI('D', T=300, P=1e6)
+        therm.PropsSI('D', P=1e6, T=300)
+        self.assertEqual(_therm.props_cache_info('Hydrogen')['hits'], 1)
+
+    def test_same_type_on_hit_and_miss(self):
+        therm = CoolPropWrapper('Hydrogen')
+        for output in ['D', ['H', 'D']]:
+            miss = therm.PropsSI(output, T=300, P=1e6)
+            hit = therm.PropsSI(output, T=300, P=1e6)
+            self.assertIs(type(miss), type(hit))
+            np.testing.assert_array_equal(miss, hit)
+        hit[0] = 0  # returned arrays are copies
+        self.assertNotEqual(therm.PropsSI(['H', 'D'], T=300, P=1e6)[0], 0)
+
+    def test_threads(self):
+        _therm.set_props_cache(maxsize=50)
+        therm = CoolPropWrapper('Hydrogen')
+        temperatures = np.linspace(250, 350, 200)
+        expected = [CoolPropWrapper('Hydrogen')._uncached_PropsSI('D', T=T, P=1e6) for T in temperatures]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(3):
+                results = list(executor.map(lambda T: therm.PropsSI('D', T=T, P=1e6), temperatures))
+                self.assertEqual(results, expected)
+        info = _therm.props_cache_info('Hydrogen')
+        self.assertEqual(info['hits'] + info['misses'], 600)
+        self.assertLessEqual(info['size'], 50)
+
+    def test_rounded_keys(self):
+        _therm.set_props_cache(sig_digits=6)
+        therm = CoolPropWrapper('Hydrogen')
+        therm.PropsSI('D', T=300, P=1e6)
+        therm.PropsSI('D', T=300.00000001, P=1e6)
+        self.assertEqual(_therm.props_cache_info('Hydrogen')['hits'], 1)
+
+    def test_eviction(self):
+        _therm.set_props_cache(maxsize=2)
+        therm = CoolPropWrapper('Hydrogen')
+        for T in [300, 310, 320]:
+            therm.PropsSI('D', T=T, P=1e6)
+        info = _therm.props_cache_info('Hydrogen')
+        self.assertEqual(info['evictions'], 1)
+        self.assertEqual(info['size'], 2)
+        therm.PropsSI('D', T=300, P=1e6)  # evicted, so recomputed
+        self.assertEqual(_therm.props_cache_info('Hydrogen')['hits'], 0)
+
+    def test_disabled(self):
+        _therm.set_props_cache(enabled=False)
+        therm = CoolPropWrapper('Hydrogen')
+        therm.PropsSI('D', T=300, P=1e6)
+        therm.PropsSI('D', T=300, P=1e6)
+        self.assertEqual(_therm.props_cache_info(), {})
+
+
+class OrificeFlowTestCase(unittest.TestCase):
+    """
+    Test the sonic throat solution against the maximum mass flux solution.
+    """
+    def setUp(self):
+        self.orifice = Orifice(0.005, 0.8)
+
+    def test_choked_hydrogen(self):
+        fluid = Fluid(species='hydrogen', T=288, P=35e6)
+        sonic = self.orifice.flow(fluid)
+        reference = self.orifice.flow(fluid, method='minimize')
+        self.assertTrue(sonic._choked)
+        self.assertEqual(sonic._throat_solution['method'], 'sonic')
+        self.assertLess(sonic._throat_solution['iterations'], 10)
+        self.assertAlmostEqual(self.orifice.mdot(sonic), self.orifice.mdot(reference), places=10)
+        self.assertAlmostEqual(sonic.P/reference.P, 1, places=6)
+        self.assertAlmostEqual(sonic.v, fluid.therm.a(P=sonic.P, S=fluid.therm.s(T=fluid.T, P=fluid.P)), places=4)
+
+    def test_unchoked_hydrogen(self):
+        fluid = Fluid(species='hydrogen', T=288, P=1.5e5)
+        sonic = self.orifice.flow(fluid)
+        reference = self.orifice.flow(fluid, method='minimize')
+        self.assertFalse(sonic._choked)
+        self.assertEqual(sonic.P, 101325)
+        self.assertAlmostEqual(self.orifice.mdot(sonic)/self.orifice.mdot(reference), 1, places=6)
+
+    def test_saturated_liquid_falls_back(self):
+        fluid = Fluid(species='hydrogen', P=5e5, phase='liquid')
+        sonic = self.orifice.flow(fluid)
+        reference = self.orifice.flow(fluid, method='minimize')
+        self.assertEqual(sonic._throat_solution['method'], 'minimize')
+        self.assertEqual(self.orifice.mdot(sonic), self.orifice.mdot(reference))
+
+    def test_bad_method(self):
+        fluid = Fluid(species='hydrogen', T=288, P=35e6)
+        with self.assertRaises(ValueError):
+            self.orifice.flow(fluid, method='newton')
+
+
+class ReleaseStateCacheTestCase(unittest.TestCase):
+    """
+    Test that cached throat and notional nozzle states rescale correctly between orifice diameters.
+    """
+    def setUp(self):
+        self.fluid = Fluid(species='hydrogen', T=288, P=35e6)
+        self.ambient = Fluid(species='air', T=288, P=101325)
+        self.cache = ReleaseStateCache()
+
+    def test_diameters(self):
+        for d in [0.001, 0.003, 0.01]:
+            orifice = Orifice(d, 0.75)
+            throat = self.cache.throat(self.fluid, orifice, self.ambient.P)
+            self.assertAlmostEqual(orifice.mdot(throat)/orifice.mdot(orifice.flow(self.fluid, self.ambient.P)), 1, places=12)
+            fluid_exp, orifice_exp = self.cache.expanded(throat, orifice, self.ambient, 'solve_energy', True)
+            fluid_ref, orifice_ref = NotionalNozzle(throat, orifice, self.ambient).calculate('solve_energy', True)
+            self.assertAlmostEqual(fluid_exp.v/fluid_ref.v, 1, places=8)
+            self.assertAlmostEqual(orifice_exp.d/orifice_ref.d, 1, places=8)
+        info = self.cache.info()
+        self.assertEqual(info['misses'], 2)
+        self.assertEqual(info['hits'], 4)
+
+    def test_mdot_not_cached(self):
+        orifice = Orifice(0.005)
+        self.cache.throat(self.fluid, orifice, mdot=0.01)
+        self.assertEqual(self.cache.info()['misses'], 0)
+
+    def test_developing_flow_shared(self):
+        orifice = Orifice(0.001)
+        jet_1 = Jet(self.fluid, orifice, self.ambient, release_cache=self.cache)
+        jet_2 = Jet(self.fluid, orifice, self.ambient, release_cache=self.cache)
+        self.assertIs(jet_1.developing_flow, jet_2.developing_flow)
+        self.assertEqual(self.cache.info()['developing_flows'], 1)
+        jet_ref = Jet(self.fluid, orifice, self.ambient)
+        self.assertAlmostEqual(jet_2.initial_node.v_cl/jet_ref.initial_node.v_cl, 1, places=8)
+        self.assertAlmostEqual(jet_2.S[-1]/jet_ref.S[-1], 1, places=6)
+
+    def test_precomputed_developing_flow(self):
+        orifice = Orifice(0.001)
+        flame_1 = Flame(self.fluid, orifice, self.ambient, release_cache=self.cache)
+        flame_2 = Flame(self.fluid, orifice, self.ambient, developing_flow=flame_1.developing_flow)
+        self.assertIs(flame_2.developing_flow, flame_1.developing_flow)
+        self.assertEqual(flame_2.length(), flame_1.length())
+        # a jet uses different establishment parameters, so it does not share the flame's developing flow
+        jet = Jet(self.fluid, orifice, self.ambient, release_cache=self.cache)
+        self.assertIsNot(jet.developing_flow, flame_1.developing_flow)
+        self.assertEqual(self.cache.info()['developing_flows'], 2)
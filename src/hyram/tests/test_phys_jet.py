@@ -0,0 +1,258 @@
+"""
+Copyright 2015-2022 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+You should have received a copy of the GNU General Public License along with HyRAM+.
+If not, see https://www.gnu.org/licenses/.
+"""
+
+import copy
+import unittest
+from unittest import mock
+
+import numpy as np
+from scipy import integrate
+
+from hyram.phys import Fluid, Orifice, Jet
+
+"""
+NOTE: if running from IDE like pycharm, make sure cwd is hyram/ and not hyram/tests.
+"""
+
+VERBOSE = False
+
+
+class JetIntegralTestCase(unittest.TestCase):
+    """
+    Test the quadrature radial integral in the energy equation against the trapezoidal rule
+    """
+    def setUp(self):
+        self.ambient = Fluid(species='air', T=288, P=101325)
+        self.jet = Jet(Fluid(species='H2', T=288, P=35e6), Orifice(0.003), self.ambient, verbose=VERBOSE)
+
+    def test_energy_integral(self):
+        jet = self.jet
+        for i in [0, len(jet.S)//2, -1]:
+            conditions = [jet.V_cl[i], jet.B[i], jet.rho_cl[i], jet.Y_cl[i], jet.theta[i], jet.x[i], jet.y[i]]
+            trapz = jet._govEqns(jet.S[i], conditions, numpts=20000)
+            quadrature = jet._govEqns(jet.S[i], conditions, integral_method='quadrature')
+            np.testing.assert_allclose(quadrature, trapz, rtol=1e-4, atol=1e-12)
+
+    def test_solution(self):
+        jet = Jet(Fluid(species='H2', T=288, P=35e6), Orifice(0.003), self.ambient, integral_method='quadrature')
+        S = np.linspace(self.jet.S[0], min(self.jet.S[-1], jet.S[-1]), 20)
+        for k in ['V_cl', 'B', 'Y_cl', 'x']:
+            np.testing.assert_allclose(np.interp(S, jet.S, getattr(jet, k)),
+                                       np.interp(S, self.jet.S, getattr(self.jet, k)), rtol=5e-3)
+
+    def test_bad_method(self):
+        with self.assertRaises(ValueError):
+            self.jet.solve(integral_method='simpson')
+
+
+class JetJacobianTestCase(unittest.TestCase):
+    """
+    Test the Jacobian of the jet governing equations and the implicit solvers that use it
+    """
+    def setUp(self):
+        self.fluid = Fluid(species='H2', T=288, P=35e6)
+        self.ambient = Fluid(species='air', T=288, P=101325)
+        self.orifice = Orifice(0.003)
+        self.jet = Jet(self.fluid, self.orifice, self.ambient, integral_method='quadrature')
+
+    def test_jacobian(self):
+        jet = self.jet
+        i = len(jet.S)//3
+        conditions = np.array([jet.V_cl[i], jet.B[i], jet.rho_cl[i], jet.Y_cl[i], jet.theta[i], jet.x[i], jet.y[i]])
+        args = (0.082, 0, 5, 500, 'quadrature')
+        jac = jet._jacobian(jet.S[i], conditions, *args)
+        for j in range(5):
+            h = 1e-7*max(abs(conditions[j]), 1)
+            dz = (jet._govEqns(jet.S[i], conditions + h*np.eye(7)[j], *args) -
+                  jet._govEqns(jet.S[i], conditions - h*np.eye(7)[j], *args))/(2*h)
+            np.testing.assert_allclose(jac[:, j], dz, rtol=1e-4, atol=1e-6*np.max(np.abs(dz)))
+        np.testing.assert_array_equal(jac[:, 5:], 0)
+        self.assertEqual(jac[5, 4], -np.sin(conditions[4]))
+        self.assertEqual(jac[6, 4], np.cos(conditions[4]))
+
+    def test_implicit_solvers(self):
+        for solver in ['Radau', 'LSODA']:
+            jet = Jet(self.fluid, self.orifice, self.ambient, integral_method='quadrature', solver=solver)
+            self.assertAlmostEqual(jet.Y_cl[-1], 7e-4, places=10)
+            S = np.linspace(self.jet.S[0], jet.S[-1], 20)
+            for k in ['V_cl', 'B', 'Y_cl']:
+                np.testing.assert_allclose(np.interp(S, jet.S, getattr(jet, k)),
+                                           np.interp(S, self.jet.S, getattr(self.jet, k)), rtol=5e-3)
+
+    def test_rhs_calls(self):
+        jet = self.jet
+        args = (0.082, 0, 5, 500, 'quadrature')
+        with mock.patch.object(jet, '_govEqns', wraps=jet._govEqns) as govEqns:
+            jet._jacobian(jet.S[0], jet.initial_node.conditions, *args)
+        self.assertEqual(govEqns.call_count, 0)
+        calls = {}
+        for jac in [None, jet._jacobian]:
+            with mock.patch.object(jet, '_govEqns', wraps=jet._govEqns) as govEqns:
+                sol = integrate.solve_ivp(jet._govEqns, [jet.S[0], jet.S[-1]], jet.initial_node.conditions,
+                                          method='Radau', args=args, atol=1e-6, rtol=1e-6, jac=jac)
+            self.assertTrue(sol.success)
+            calls[jac is None] = govEqns.call_count
+        self.assertLess(calls[False], calls[True])
+
+    def test_bad_solver(self):
+        with self.assertRaises(ValueError):
+            self.jet.solve(solver='euler')
+
+
+class JetDenseOutputTestCase(unittest.TestCase):
+    """
+    Test event-terminated integration with a continuous solution
+    """
+    def setUp(self):
+        self.fluid = Fluid(species='H2', T=288, P=35e6)
+        self.ambient = Fluid(species='air', T=288, P=101325)
+        self.orifice = Orifice(0.003)
+
+    def test_Ymin(self):
+        reference = Jet(self.fluid, self.orifice, self.ambient, integral_method='quadrature')
+        jet = Jet(self.fluid, self.orifice, self.ambient, integral_method='quadrature', solver='RK45', Ymin=0.01)
+        self.assertAlmostEqual(jet.Y_cl[-1], 0.01, places=10)
+        self.assertTrue(np.all(jet.Y_cl[:-1] > 0.01))
+        # the continuous solution between steps agrees with the dopri5 steps
+        S = reference.S[(reference.S > jet.S[0]) & (reference.S < jet.S[-1])]
+        state = jet.state(S)
+        for k in ['V_cl', 'B', 'Y_cl', 'x', 'y', 'X_cl', 'T_cl']:
+            np.testing.assert_allclose(state[k], getattr(reference, k)[:len(S) + 1][-len(S):], rtol=1e-4)
+
+    def test_Smax(self):
+        jet = Jet(self.fluid, self.orifice, self.ambient, integral_method='quadrature', solver='DOP853', Smax=1)
+        self.assertEqual(jet.S[-1], 1)
+        self.assertGreater(jet.Y_cl[-1], 7e-4)
+
+    def test_state_at_steps(self):
+        jet = Jet(self.fluid, self.orifice, self.ambient, integral_method='quadrature', solver='RK45')
+        state = jet.state(jet.S)
+        for k in ['V_cl', 'B', 'rho_cl', 'Y_cl', 'theta', 'x', 'y', 'X_cl', 'T_cl']:
+            np.testing.assert_allclose(state[k], getattr(jet, k), rtol=1e-10)
+        self.assertEqual(jet.state(jet.S[-1] + 10)['Y_cl'], jet.Y_cl[-1])
+
+
+class JetFlammableMassTestCase(unittest.TestCase):
+    """
+    Test the closed-form flammable mass against the reference (per-node root finding and quadrature)
+    """
+    def setUp(self):
+        ambient = Fluid(species='air', T=288, P=101325)
+        self.jets = [Jet(Fluid(species='H2', T=288, P=35e6), Orifice(0.003), ambient),
+                     Jet(Fluid(species='H2', T=288, P=35e6), Orifice(0.01), ambient, theta0=np.pi/2),
+                     Jet(Fluid(species='CH4', T=288, P=10e6), Orifice(0.005), ambient)]
+
+    def test_against_reference(self):
+        for jet in self.jets:
+            for Hmax in [np.inf, jet.y[len(jet.y)//2]]:
+                self.assertAlmostEqual(jet.m_flammable(Hmax=Hmax)/jet.m_flammable(Hmax=Hmax, method='reference'),
+                                       1, places=10)
+
+    def test_limits(self):
+        jet = self.jets[0]
+        self.assertAlmostEqual(jet.m_flammable(0.1, 0.5)/jet.m_flammable(0.1, 0.5, method='reference'), 1, places=10)
+
+    def test_bad_method(self):
+        with self.assertRaises(ValueError):
+            self.jets[0].m_flammable(method='quad')
+
+
+class JetPointQueryTestCase(unittest.TestCase):
+    """
+    Test concentrations and velocities at arbitrary points
+    """
+    def setUp(self):
+        self.fluid = Fluid(species='H2', T=288, P=35e6)
+        self.ambient = Fluid(species='air', T=288, P=101325)
+
+    def test_vertical_jet(self):
+        jet = Jet(self.fluid, Orifice(0.003), self.ambient, theta0=np.pi/2)
+        i = len(jet.S)//2
+        r, X = jet._radial_profile(jet.S[i], 'X')
+        _, v = jet._radial_profile(jet.S[i], 'v')
+        points = np.column_stack((r, jet.y[i]*np.ones_like(r)))
+        np.testing.assert_allclose(jet.concentration_at(points), X, rtol=1e-8)
+        np.testing.assert_allclose(jet.velocity_at(points), v, rtol=1e-8)
+        # axisymmetric about the centerline
+        points = np.column_stack((np.zeros_like(r), jet.y[i]*np.ones_like(r), r))
+        np.testing.assert_allclose(jet.concentration_at(points), X, rtol=1e-8)
+
+    def test_contour_data(self):
+        jet = Jet(self.fluid, Orifice(0.003), self.ambient)
+        x, y, X, Y, v, T = jet.get_contour_data()
+        points = np.stack((x, y), axis=-1)
+        np.testing.assert_allclose(jet.concentration_at(points), X, atol=1e-4)
+        np.testing.assert_allclose(jet.concentration_at(points, mass_fraction=True), Y, atol=1e-4)
+        np.testing.assert_allclose(jet.velocity_at(points), v, atol=1e-2*np.max(v))
+
+    def test_chunks(self):
+        jet = Jet(self.fluid, Orifice(0.003), self.ambient)
+        points = np.random.default_rng(0).uniform([0, -1, -1], [10, 1, 1], (1000, 3))
+        np.testing.assert_array_equal(jet.concentration_at(points), jet.concentration_at(points, chunk_size=7))
+        self.assertEqual(jet.concentration_at(points.reshape(10, 100, 3)).shape, (10, 100))
+
+    def test_nearest_segment(self):
+        # uneven node spacing: the nodes nearest to the point are not on the nearest segment
+        centerline = Jet.__new__(Jet)
+        centerline.x = np.concatenate(([-10, 10], np.linspace(10, 0, 1001)))
+        centerline.y = np.concatenate(([1, 1], -3*np.ones(1001)))
+        points = np.array([[0., 0.], [5., 0.5], [0.5, -2.9], [20., 30.]])
+        iseg, t, d2 = centerline._project(points)
+        np.testing.assert_array_equal(iseg[:2], 0)
+        np.testing.assert_allclose(d2, [1, 0.25, 0.01, 10**2 + 29**2])
+        # matches an exhaustive search along a solved jet, including far away points
+        jet = Jet(self.fluid, Orifice(0.003), self.ambient, theta0=np.pi/4)
+        points = np.random.default_rng(0).uniform([-20, -20], [20, 20], (500, 2))
+        _, _, d2 = jet._project(points)
+        x0, y0, dx, dy = jet.x[:-1], jet.y[:-1], np.diff(jet.x), np.diff(jet.y)
+        with np.errstate(divide='ignore', invalid='ignore'):  # repeated nodes
+            t = np.clip(np.nan_to_num(((points[:, :1] - x0)*dx + (points[:, 1:] - y0)*dy)/(dx**2 + dy**2)), 0, 1)
+        np.testing.assert_allclose(d2, np.min((points[:, :1] - x0 - t*dx)**2 + (points[:, 1:] - y0 - t*dy)**2,
+                                              axis=1), rtol=1e-12)
+
+    def test_bad_points(self):
+        jet = Jet(self.fluid, Orifice(0.003), self.ambient)
+        with self.assertRaises(ValueError):
+            jet.concentration_at([1, 2, 3, 4])
+
+
+class JetIsoContourTestCase(unittest.TestCase):
+    """
+    Test mole fraction contours calculated from the jet centerline
+    """
+    def setUp(self):
+        self.jet = Jet(Fluid(species='H2', T=288, P=35e6), Orifice(0.003), Fluid(species='air', T=288, P=101325))
+
+    def test_contours(self):
+        jet = self.jet
+        contours = jet.iso_contour([0.04, 0.08])
+        self.assertEqual(len(contours), 2)
+        for contour in contours:
+            points = np.column_stack((contour['x'], contour['y']))
+            np.testing.assert_allclose(jet.concentration_at(points)[:-1], contour['X'], rtol=1e-3)
+            self.assertEqual((contour['x'][0], contour['y'][0]), (contour['x'][-1], contour['y'][-1]))
+            self.assertAlmostEqual(contour['S'], jet.streamline_distance_to_mole_fraction(contour['X']), places=2)
+            self.assertEqual(contour['x_max'], np.max(contour['x']))
+        self.assertGreater(contours[0]['x_max'], contours[1]['x_max'])
+        self.assertGreater(contours[0]['y_max'], contours[1]['y_max'])
+
+    def test_crossed_after_first_node(self):
+        # the centerline mass fraction falls below the contour between the first and second nodes
+        jet = copy.copy(self.jet)
+        jet.Y_cl = np.concatenate(([1.], self.jet.Y_cl[1:]))
+        Y = (1 + jet.Y_cl[1])/2
+        MW_fluid, MW_air = jet.fluid.therm.MW, jet.ambient.therm.MW
+        contour = jet.iso_contour(Y/MW_fluid/(Y/MW_fluid + (1 - Y)/MW_air))
+        self.assertEqual(len(contour['x']), 4)
+        self.assertAlmostEqual(contour['S'], (jet.S[0] + jet.S[1])/2)
+        self.assertAlmostEqual(contour['x'][1], (jet.x[0] + jet.x[1])/2)
+
+    def test_no_contour(self):
+        contour = self.jet.iso_contour(0.999)
+        self.assertEqual(len(contour['x']), 0)
+        self.assertTrue(np.isnan(contour['x_max']))
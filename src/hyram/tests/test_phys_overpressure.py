@@ -295,6 +295,26 @@ class BstMethodTestCase(unittest.TestCase):
         # VERY rough approximate value
         self.assertAlmostEqual(distance, 6, places=0)
 
+    def test_hazard_distance_table(self):
+        overpressures = [5000, 20000, 202650]
+        impulses = [100, 284]
+        directions = ['x', '-x', 'y', '+z']
+        overpressure_table = self.BST_calc.hazard_distance_table(overpressures, directions)
+        impulse_table = self.BST_calc.hazard_distance_table(impulses, directions, quantity='impulse')
+        for direction in directions:
+            axis = direction[-1]
+            negative_direction = direction.startswith('-')
+            for overpressure, distance in zip(overpressures, overpressure_table[direction]):
+                self.assertEqual(distance, self.BST_calc.calc_distance_to_overpressure(
+                    overpressure, direction=axis, negative_direction=negative_direction))
+            for impulse, distance in zip(impulses, impulse_table[direction]):
+                self.assertEqual(distance, self.BST_calc.calc_distance_to_impulse(
+                    impulse, direction=axis, negative_direction=negative_direction))
+        with self.assertRaises(ValueError):
+            self.BST_calc.hazard_distance_table(overpressures, ['w'])
+        with self.assertRaises(ValueError):
+            self.BST_calc.hazard_distance_table(overpressures, quantity='temperature')
+
 
 class BauwensMethodTestCase(unittest.TestCase):
     """
@@ -334,6 +354,15 @@ class BauwensMethodTestCase(unittest.TestCase):
         # test to check that result is non-zero
         self.assertGreater(self.Bauwens_calc.energy, 0)
 
+    def test_hazard_distance_table(self):
+        overpressures = [2000, 5000, 10000]
+        table = self.Bauwens_calc.hazard_distance_table(overpressures, ['x', '-y'])
+        for overpressure, distance in zip(overpressures, table['x']):
+            self.assertAlmostEqual(distance, self.Bauwens_calc.calc_distance_to_overpressure(overpressure), places=5)
+        np.testing.assert_allclose(table['x'] - self.Bauwens_calc.origin[0],
+                                   self.Bauwens_calc.origin[1] - table['-y'])
+        np.testing.assert_array_less(np.diff(table['x']), 0)
+
 
 class TntMethodTestCase(unittest.TestCase):
     """
@@ -7,6 +7,8 @@ If not, see https://www.gnu.org/licenses/.
 """
 import unittest
 
+import numpy as np
+
 import hyram.phys._utils as hpu
 
 
@@ -63,6 +65,55 @@ class TestGetDistanceToEffect(unittest.TestCase):
         distance = hpu.get_distance_to_effect(effect_value, from_point, direction, effect_func, effect_val=effect_scaling)
         self.assertAlmostEqual(distance, 2, places=4)
 
+    def test_multiple_values(self):
+        values = [2, 1, 0.5, 0.25]
+        distances = hpu.get_distance_to_effect(values, (0, 1, 0), 'x', self.effect_function)
+        np.testing.assert_allclose(distances, [1.5, 2, 3, 5], atol=1e-6)
+        scan = hpu.get_distance_to_effect(values, (0, 1, 0), 'x', self.effect_function, method='scan')
+        np.testing.assert_allclose(distances, scan, atol=1e-3)
+        distance = hpu.get_distance_to_effect(0.25, (2, 1, 0), 'x', self.effect_function, negative_direction=True)
+        self.assertAlmostEqual(distance, -5, places=6)
+
+    def test_number_of_evaluations(self):
+        num_evaluations = []
+
+        def effect_function(x_vals, y_vals, z_vals):
+            num_evaluations.append(len(x_vals))
+            return self.effect_function(x_vals, y_vals, z_vals)
+
+        hpu.get_distance_to_effect(np.linspace(0.01, 1, 10), (0, 1, 0), 'x', effect_function)
+        self.assertLess(sum(num_evaluations), 250)
+
+    def test_values_outside_range(self):
+        distances = hpu.get_distance_to_effect([1e-4, 1e100], (0, 1, 0), 'y', self.effect_function, max_distance=50)
+        self.assertEqual(distances[0], 50)
+        self.assertAlmostEqual(distances[1], 0)
+
+    def test_infinite_at_starting_point(self):
+        num_evaluations = []
+
+        def effect_function(x_vals, y_vals, z_vals):
+            num_evaluations.append(len(x_vals))
+            return 1/np.abs(np.asarray(x_vals, dtype=float))  # infinite at the starting point
+
+        with np.errstate(divide='raise'):  # the division by zero is handled by the solver
+            distances = hpu.get_distance_to_effect([1e4, 1, 0.01], (0, 0, 0), 'x', effect_function)
+        np.testing.assert_allclose(distances, [1e-4, 1, 100], atol=1e-6)
+        self.assertLess(sum(num_evaluations), 250)  # solved rather than scanned
+
+    def test_non_monotonic_effect(self):
+        def effect_function(x_vals, y_vals, z_vals):
+            x_vals = np.asarray(x_vals)
+            return np.exp(-x_vals / 10) * (1.5 + np.cos(x_vals))
+
+        distance = hpu.get_distance_to_effect(0.5, (0, 0, 0), 'x', effect_function)
+        scan = hpu.get_distance_to_effect(0.5, (0, 0, 0), 'x', effect_function, method='scan')
+        self.assertEqual(distance, scan)
+
+    def test_bad_method(self):
+        with self.assertRaises(ValueError):
+            hpu.get_distance_to_effect(1, (0, 1, 0), 'x', self.effect_function, method='secant')
+
 
 if __name__ == "__main__":
     unittest.main()
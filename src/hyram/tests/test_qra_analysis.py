@@ -6,10 +6,15 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 
+import numpy as np
 import scipy.constants as spc
 
+from hyram.phys import _flame, _jet
 from hyram.qra import analysis as qra_analysis
 from hyram.qra import component_failure
 from hyram.qra import component_set
@@ -486,6 +491,167 @@ class TestAnalysis(unittest.TestCase):
         risk_value = results['total_pll']
         self.assertEqual(risk_value, 0)
 
+    def test_process_pool_matches_serial(self):
+        args = (self.pipe_outer_diam, self.pipe_thickness, self.amb_temp, self.amb_pres,
+                self.rel_temp, self.rel_pres, self.rel_phase, self.facil_length, self.facil_width,
+                self.immed_ign_probs, self.delayed_ign_probs, self.ign_thresholds,
+                self.occupant_input_list, self.component_sets, self.component_failure_set,
+                self.rel_species)
+        kwargs = {'BST_mach_flame_speed': self.BST_mach_flame_speed, 'exposure_time': self.exposure_time,
+                  'create_plots': False}
+        serial = qra_analysis.conduct_analysis(*args, **kwargs)
+        try:
+            parallel = qra_analysis.conduct_analysis(*args, max_workers=2, **kwargs)
+            pool = qra_analysis._process_pool
+            repeated = qra_analysis.conduct_analysis(*args, max_workers=2, **kwargs)
+            self.assertIs(qra_analysis._process_pool, pool)
+        finally:
+            qra_analysis.shutdown_process_pool()
+        self.assertIsNone(qra_analysis._process_pool)
+        for results in [parallel, repeated]:
+            self.assertEqual(results['total_pll'], serial['total_pll'])
+            for key in ['position_qrads', 'position_overps', 'position_impulses']:
+                np.testing.assert_array_equal(results[key], serial[key])
+
+    def test_physics_result_cache(self):
+        args = (self.pipe_outer_diam, self.pipe_thickness, self.amb_temp, self.amb_pres,
+                self.rel_temp, self.rel_pres, self.rel_phase, self.facil_length, self.facil_width,
+                self.immed_ign_probs, self.delayed_ign_probs, self.ign_thresholds,
+                self.occupant_input_list, self.component_sets, self.component_failure_set,
+                self.rel_species)
+        kwargs = {'BST_mach_flame_speed': self.BST_mach_flame_speed, 'create_plots': False}
+        with tempfile.TemporaryDirectory() as directory:
+            first = qra_analysis.conduct_analysis(*args, exposure_time=60, cache_dir=directory, **kwargs)
+            self.assertEqual(first['physics_cache']['hits'], 0)
+            self.assertEqual(first['physics_cache']['misses'], 10)
+            # changing only the exposure time reuses the physics of all leak sizes
+            second = qra_analysis.conduct_analysis(*args, exposure_time=30, cache_dir=directory, **kwargs)
+            self.assertEqual(second['physics_cache']['hits'], 10)
+            self.assertEqual(second['physics_cache']['misses'], 0)
+        reference = qra_analysis.conduct_analysis(*args, exposure_time=30, **kwargs)
+        self.assertIsNone(reference['physics_cache'])
+        self.assertEqual(second['total_pll'], reference['total_pll'])
+        self.assertNotEqual(second['total_pll'], first['total_pll'])
+        for key in ['position_qrads', 'position_overps', 'position_impulses']:
+            np.testing.assert_array_equal(second[key], reference[key])
+        self.assertEqual(second['jet_summaries'], reference['jet_summaries'])
+
+    def test_incremental_stages(self):
+        args = (self.pipe_outer_diam, self.pipe_thickness, self.amb_temp, self.amb_pres,
+                self.rel_temp, self.rel_pres, self.rel_phase, self.facil_length, self.facil_width,
+                self.immed_ign_probs, self.delayed_ign_probs, self.ign_thresholds,
+                self.occupant_input_list, self.component_sets, self.component_failure_set,
+                self.rel_species)
+        kwargs = {'BST_mach_flame_speed': self.BST_mach_flame_speed, 'exposure_time': self.exposure_time,
+                  'create_plots': False}
+        analysis = qra_analysis.Analysis(*args, **kwargs)
+        self.assertEqual(analysis.stale_stages(), analysis.stage_names)
+        first = analysis.run()
+        self.assertEqual(first['total_pll'], qra_analysis.conduct_analysis(*args, **kwargs)['total_pll'])
+        self.assertEqual(analysis.stale_stages(), [])
+
+        # options do not invalidate any stages
+        analysis.update(verbose=False, cache_dir=None)
+        self.assertEqual(analysis.stale_stages(), [])
+
+        analysis.update(probit_overp_id='coll')
+        self.assertEqual(analysis.stale_stages(), ['consequences', 'risk', 'results'])
+        second = analysis.run()
+        self.assertEqual(analysis.stage_runs['thermal_effects'], 1)
+        self.assertEqual(analysis.stage_runs['risk'], 2)
+        reference = qra_analysis.conduct_analysis(*args, probit_overp_id='coll', **kwargs)
+        self.assertEqual(second['total_pll'], reference['total_pll'])
+        self.assertEqual(len(second['leak_results'][0].list_event_names),
+                         len(reference['leak_results'][0].list_event_names))
+
+        occupants = [dict(self.occupant_input_list[0], count=4)]
+        analysis.update(occupant_input_list=occupants)
+        self.assertEqual(analysis.stale_stages(), ['occupants', 'positions', 'thermal_effects', 'thermal_plots',
+                                                   'overpressure_effects', 'overpressure_plots', 'consequences',
+                                                   'risk', 'results'])
+        third = analysis.run()
+        self.assertEqual(analysis.stage_runs['orifices'], 1)
+        self.assertEqual(third['position_qrads'].shape[0], 4)
+
+        with self.assertRaises(TypeError):
+            analysis.update(not_an_input=1)
+
+    def test_locations_do_not_resolve_physics(self):
+        args = (self.pipe_outer_diam, self.pipe_thickness, self.amb_temp, self.amb_pres,
+                self.rel_temp, self.rel_pres, self.rel_phase, self.facil_length, self.facil_width,
+                self.immed_ign_probs, self.delayed_ign_probs, self.ign_thresholds,
+                self.occupant_input_list, self.component_sets, self.component_failure_set,
+                self.rel_species)
+        kwargs = {'BST_mach_flame_speed': self.BST_mach_flame_speed, 'exposure_time': self.exposure_time,
+                  'create_plots': False}
+        analysis = qra_analysis.Analysis(*args, **kwargs)
+        analysis.run()
+        occupants = [dict(self.occupant_input_list[0], count=4, xb=10)]
+        analysis.update(occupant_input_list=occupants, rel_humid=0.5)
+        self.assertNotIn('flames', analysis.stale_stages())
+        self.assertNotIn('jets', analysis.stale_stages())
+        with mock.patch.object(_flame.Flame, 'solve', autospec=True, side_effect=_flame.Flame.solve) as flame_solve, \
+                mock.patch.object(_jet.Jet, 'solve', autospec=True, side_effect=_jet.Jet.solve) as jet_solve:
+            results = analysis.run()
+        self.assertEqual(flame_solve.call_count, 0)
+        self.assertEqual(jet_solve.call_count, 0)
+        self.assertEqual(analysis.stage_runs['flames'], 1)
+        self.assertEqual(analysis.stage_runs['jets'], 1)
+        self.assertEqual(analysis.stage_runs['thermal_effects'], 2)
+        self.assertEqual(analysis.stage_runs['overpressure_effects'], 2)
+
+        reference = qra_analysis.conduct_analysis(*args[:12], occupants, *args[13:], rel_humid=0.5, **kwargs)
+        self.assertEqual(results['total_pll'], reference['total_pll'])
+        for key in ['position_qrads', 'position_overps', 'position_impulses']:
+            np.testing.assert_array_equal(results[key], reference[key])
+
+    def test_plots_do_not_rerun_physics(self):
+        args = (self.pipe_outer_diam, self.pipe_thickness, self.amb_temp, self.amb_pres,
+                self.rel_temp, self.rel_pres, self.rel_phase, self.facil_length, self.facil_width,
+                self.immed_ign_probs, self.delayed_ign_probs, self.ign_thresholds,
+                self.occupant_input_list, self.component_sets, self.component_failure_set,
+                self.rel_species)
+        with tempfile.TemporaryDirectory() as output_dir:
+            analysis = qra_analysis.Analysis(*args, BST_mach_flame_speed=self.BST_mach_flame_speed,
+                                             exposure_time=self.exposure_time, create_plots=False,
+                                             output_dir=output_dir)
+            first = analysis.run()
+            self.assertEqual(first['qrad_plot_files'], [])
+
+            analysis.update(create_plots=True)
+            self.assertEqual(analysis.stale_stages(), ['thermal_plots', 'overpressure_plots', 'results'])
+            second = analysis.run()
+            self.assertEqual(analysis.stage_runs['thermal_effects'], 1)
+            self.assertEqual(analysis.stage_runs['overpressure_effects'], 1)
+            self.assertEqual(len(second['qrad_plot_files']), len(second['leak_results']))
+            for filename in second['qrad_plot_files'] + second['overp_plot_files'] + second['impulse_plot_files']:
+                self.assertTrue(os.path.isfile(filename))
+            self.assertEqual(second['total_pll'], first['total_pll'])
+
+    def test_frequency_uncertainty(self):
+        args = (self.pipe_outer_diam, self.pipe_thickness, self.amb_temp, self.amb_pres,
+                self.rel_temp, self.rel_pres, self.rel_phase, self.facil_length, self.facil_width,
+                self.immed_ign_probs, self.delayed_ign_probs, self.ign_thresholds,
+                self.occupant_input_list, self.component_sets, self.component_failure_set,
+                self.rel_species)
+        kwargs = {'BST_mach_flame_speed': self.BST_mach_flame_speed, 'exposure_time': self.exposure_time,
+                  'create_plots': False}
+        results = qra_analysis.conduct_analysis(*args, uncertainty_samples=20000, **kwargs)
+        pll = results['uncertainty']['pll']
+        self.assertLess(pll['percentiles'][5], pll['percentiles'][50])
+        self.assertLess(pll['percentiles'][50], pll['percentiles'][95])
+        self.assertLess(pll['percentiles'][5], results['total_pll'])
+
+        # with fixed frequencies, every sample is the point value
+        analysis = qra_analysis.Analysis(*args[:14], component_failure.ComponentFailureSet(f_failure_override=1e-3),
+                                         self.rel_species, release_freq_overrides=[1e-3, 1e-3, 1e-4, 1e-4, 1e-5],
+                                         **kwargs)
+        total_pll = analysis.run()['total_pll']
+        fixed = analysis.uncertainty(1000, 'mc', percentiles=(1, 99), random_state=0)
+        for value in list(fixed['pll']['percentiles'].values()) + [fixed['pll']['mean']]:
+            self.assertAlmostEqual(value/total_pll, 1, places=10)
+        self.assertEqual(analysis.stage_runs['thermal_effects'], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,14 +6,16 @@ You should have received a copy of the GNU General Public License along with HyR
 If not, see https://www.gnu.org/licenses/.
 """
 
+import concurrent.futures
 import os
+import pickle
 import unittest
 
 import numpy as np
 
 from hyram.qra import effects
 import hyram.phys.api as phys_api
-from hyram.phys import Orifice
+from hyram.phys import Orifice, Flame, ReleaseStateCache
 from hyram.utilities import misc_utils
 
 
@@ -73,6 +75,33 @@ class TestThermalEffects(unittest.TestCase):
                                                  self.verbose)
         self.assertEqual(len(flux_dict['fluxes']), 0)
 
+    def test_executor_matches_serial(self):
+        args = (self.amb_fluid, self.rel_fluid, self.rel_angle, self.site_length, self.site_width,
+                self.orifices, self.rel_humid, self.not_nozzle_model, self.locations)
+        serial = effects.calc_thermal_effects(*args, create_plots=False)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = effects.calc_thermal_effects(*args, create_plots=False, executor=executor)
+        np.testing.assert_array_equal(parallel['fluxes'], serial['fluxes'])
+
+    def test_release_cache_with_executor(self):
+        args = (self.amb_fluid, self.rel_fluid, self.rel_angle, self.site_length, self.site_width,
+                self.orifices, self.rel_humid, self.not_nozzle_model, self.locations)
+        serial = effects.calc_thermal_effects(*args, create_plots=False)
+        release_cache = ReleaseStateCache()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = effects.calc_thermal_effects(*args, create_plots=False, executor=executor,
+                                                    release_cache=release_cache)
+        np.testing.assert_array_equal(parallel['fluxes'], serial['fluxes'])
+        # the throat and notional nozzle states are solved once, before the leak sizes are sent to the workers
+        info = release_cache.info()
+        self.assertEqual((info['misses'], info['hits']), (2, 2))
+        self.assertEqual((info['throat_states'], info['expanded_states'], info['developing_flows']), (1, 1, 0))
+        # a worker's copy of the states only has to solve the developing flow of its leak size
+        worker_cache = pickle.loads(pickle.dumps(release_cache.release_states()))
+        Flame(self.rel_fluid, self.orifices[1], self.amb_fluid, release_cache=worker_cache)
+        info = worker_cache.info()
+        self.assertEqual((info['misses'], info['hits']), (1, 2))
+
 
 class TestOverpressureEffects(unittest.TestCase):
     """
@@ -179,6 +208,16 @@ class TestOverpressureEffects(unittest.TestCase):
         self.assertEqual(len(overp_dict['overpressures']), 0)
         self.assertEqual(len(overp_dict['impulses']), 0)
 
+    def test_executor_matches_serial(self):
+        args = (self.orifices, self.notional_nozzle_model, self.release_fluid, self.ambient_fluid,
+                self.release_angle, self.locations, self.site_length, self.site_width, 'tnt',
+                self.BST_mach_flame_speed, self.TNT_equivalence_factor)
+        serial = effects.calc_overp_effects(*args, create_plots=False)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = effects.calc_overp_effects(*args, create_plots=False, executor=executor)
+        np.testing.assert_array_equal(parallel['overpressures'], serial['overpressures'])
+        np.testing.assert_array_equal(parallel['impulses'], serial['impulses'])
+
 
 class TestEffectPlots(unittest.TestCase):
     """
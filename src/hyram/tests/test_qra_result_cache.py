@@ -0,0 +1,121 @@
+"""
+Copyright 2015-2022 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+You should have received a copy of the GNU General Public License along with HyRAM+.
+If not, see https://www.gnu.org/licenses/.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from hyram.qra import effects
+from hyram.qra.result_cache import PhysicsResultCache
+import hyram.phys.api as phys_api
+from hyram.phys import Orifice
+
+
+class TestPhysicsResultCache(unittest.TestCase):
+    """
+    Test saving, loading, and evicting cached physics results
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_save_and_load(self):
+        cache = PhysicsResultCache(self.directory)
+        key = cache.key('thermal', (1.0, 'h2'))
+        self.assertIsNone(cache.load(key))
+        cache.save(key, {'fluxes': np.arange(3.)})
+        np.testing.assert_array_equal(cache.load(key)['fluxes'], np.arange(3.))
+        report = cache.report()
+        self.assertEqual((report['hits'], report['misses'], report['entries']), (1, 1, 1))
+
+    def test_keys_depend_on_inputs(self):
+        cache = PhysicsResultCache(self.directory)
+        self.assertEqual(cache.key('thermal', (1.0,)), cache.key('thermal', (1.0,)))
+        self.assertNotEqual(cache.key('thermal', (1.0,)), cache.key('thermal', (2.0,)))
+        self.assertNotEqual(cache.key('thermal', (1.0,)), cache.key('overpressure', (1.0,)))
+
+    def test_least_recently_used_eviction(self):
+        cache = PhysicsResultCache(self.directory)
+        keys = [cache.key('stage', (i,)) for i in range(3)]
+        for key in keys:
+            cache.save(key, {'values': np.zeros(1000)})
+            time.sleep(0.01)
+        cache.load(keys[0])  # the first entry is now the most recently used
+        cache.max_bytes = 2.5*os.path.getsize(os.path.join(self.directory, keys[0] + '.npz'))
+        cache.save(cache.key('stage', (3,)), {'values': np.zeros(1000)})
+        self.assertIsNotNone(cache.load(keys[0]))
+        self.assertIsNone(cache.load(keys[1]))
+        self.assertEqual(cache.evictions, 2)
+        self.assertLessEqual(cache.size(), cache.max_bytes)
+
+    def test_corrupt_entries_are_misses(self):
+        cache = PhysicsResultCache(self.directory)
+        for i, contents in enumerate([b'', b'PK\x03\x04 truncated']):
+            key = cache.key('stage', (i,))
+            cache.save(key, {'values': np.arange(3.)})
+            with open(os.path.join(self.directory, key + '.npz'), 'wb') as f:
+                f.write(contents)
+            with self.assertLogs('hyram.qra.result_cache', level='WARNING'):
+                self.assertIsNone(cache.load(key))
+            self.assertFalse(os.path.exists(os.path.join(self.directory, key + '.npz')))
+            cache.save(key, {'values': np.arange(3.)})
+            np.testing.assert_array_equal(cache.load(key)['values'], np.arange(3.))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_entry_evicted_while_loading(self):
+        cache = PhysicsResultCache(self.directory)
+        key = cache.key('stage', (0,))
+        cache.save(key, {'values': np.arange(3.)})
+        with mock.patch('os.utime', side_effect=FileNotFoundError):
+            np.testing.assert_array_equal(cache.load(key)['values'], np.arange(3.))
+        self.assertEqual(cache.hits, 1)
+
+    def test_failed_save_leaves_no_entry(self):
+        cache = PhysicsResultCache(self.directory)
+
+        def failing_savez(f, **arrays):
+            f.write(b'PK\x03\x04 partial')
+            raise OSError('disk full')
+
+        with mock.patch('numpy.savez', failing_savez), self.assertRaises(OSError):
+            cache.save(cache.key('stage', (0,)), {'values': np.arange(3.)})
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(cache.report()['entries'], 0)
+
+    def test_bad_size_limit(self):
+        with self.assertRaises(ValueError):
+            PhysicsResultCache(self.directory, max_bytes=0)
+
+    def test_effects_loaded_from_cache(self):
+        amb_fluid = phys_api.create_fluid('AIR', temp=288, pres=101325)
+        rel_fluid = phys_api.create_fluid('H2', temp=288, pres=35e6, phase='none')
+        orifices = [Orifice(0.001), Orifice(0.003)]
+        locations = [(5, 0, 1), (6, 1, 2), (7, 0, 2)]
+        args = (amb_fluid, rel_fluid, 0, 20, 12, orifices, 0.89, 'yuce', locations)
+        cache = PhysicsResultCache(self.directory)
+        first = effects.calc_thermal_effects(*args, create_plots=False, result_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        second = effects.calc_thermal_effects(*args, create_plots=False, result_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        np.testing.assert_array_equal(second['fluxes'], first['fluxes'])
+        self.assertEqual(second['flame_summaries'], first['flame_summaries'])
+        # a change to the inputs of the stage is a miss
+        effects.calc_thermal_effects(amb_fluid, rel_fluid, 0, 20, 12, orifices, 0.5, 'yuce', locations,
+                                     create_plots=False, result_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
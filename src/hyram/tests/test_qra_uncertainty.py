@@ -0,0 +1,91 @@
+"""
+Copyright 2015-2022 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+You should have received a copy of the GNU General Public License along with HyRAM+.
+If not, see https://www.gnu.org/licenses/.
+"""
+
+import unittest
+
+import numpy as np
+
+from hyram.qra import distributions
+from hyram.qra import uncertainty
+from hyram.qra.component_failure import ComponentFailureSet
+from hyram.qra.component_set import ComponentSet
+
+
+class TestDistributionSampling(unittest.TestCase):
+    """
+    Test vectorized sampling of the QRA distributions
+    """
+    def test_latin_hypercube_strata(self):
+        n = 1000
+        samples = distributions.uniform_samples(n, 'lhs', random_state=0)
+        np.testing.assert_array_equal(np.sort(np.floor(samples*n)), np.arange(n))
+
+    def test_bad_method(self):
+        with self.assertRaises(ValueError):
+            distributions.uniform_samples(10, 'sobol')
+
+    def test_lognormal(self):
+        dist = distributions.LogNormDistribution(-11.7, 0.67)
+        samples = dist.sample(10001, 'lhs', random_state=0)
+        self.assertAlmostEqual(np.median(samples)/dist.mean, 1, places=3)
+        self.assertAlmostEqual(np.var(samples)/dist.var, 1, places=1)
+
+    def test_beta(self):
+        dist = distributions.BetaDistribution(3.5, 310289.5)
+        for method in ['mc', 'lhs']:
+            samples = dist.sample(20000, method, random_state=0)
+            self.assertEqual(samples.shape, (20000,))
+            self.assertAlmostEqual(np.mean(samples)/dist.mean, 1, places=1)
+
+    def test_expected_value(self):
+        dist = distributions.EVDistribution(0.002)
+        np.testing.assert_array_equal(dist.sample(5, 'lhs'), np.full(5, 0.002))
+
+
+class TestFrequencyUncertainty(unittest.TestCase):
+    """
+    Test sampling of leak frequencies and propagation of their uncertainty
+    """
+    def setUp(self):
+        self.leak_sizes = [0.01, 0.1, 1, 10, 100]
+        self.component_sets = [ComponentSet('valve', 5, 'h2'), ComponentSet('joint', 35, 'h2')]
+
+    def test_expected_value_failures(self):
+        failure_set = ComponentFailureSet(noz_po_dist='expv', noz_po_a=1e-6, noz_po_b=None,
+                                          overp_dist='expv', overp_a=1e-5, overp_b=None,
+                                          pvalve_fto_dist='expv', pvalve_fto_a=1e-5, pvalve_fto_b=None,
+                                          driveoff_dist='expv', driveoff_a=5e-5, driveoff_b=None,
+                                          coupling_ftc_dist='expv', coupling_ftc_a=1e-4, coupling_ftc_b=None)
+        samples = failure_set.sample_fueling_fail_freq(10)
+        np.testing.assert_allclose(samples, failure_set.f_fueling_fail, rtol=1e-12)
+        override = ComponentFailureSet(f_failure_override=0.1)
+        np.testing.assert_array_equal(override.sample_fueling_fail_freq(3), np.full(3, 0.1))
+
+    def test_sampled_leak_frequencies(self):
+        failure_set = ComponentFailureSet(f_failure_override=0.)
+        freqs = uncertainty.sample_leak_frequencies(self.leak_sizes, None, self.component_sets, failure_set,
+                                                    20001, 'lhs', random_state=0)
+        self.assertEqual(freqs.shape, (20001, 5))
+        # each leak frequency is the sum of lognormal samples, so its mean is above the sum of the medians
+        for i, leak_size in enumerate(self.leak_sizes):
+            median_sum = sum([comp_set.get_leak_frequency(leak_size) for comp_set in self.component_sets])
+            self.assertGreater(np.mean(freqs[:, i]), median_sum)
+        overridden = uncertainty.sample_leak_frequencies(self.leak_sizes, [1e-3, -1, -1, -1, 2e-3],
+                                                         self.component_sets, failure_set, 10)
+        np.testing.assert_array_equal(overridden[:, 0], np.full(10, 1e-3))
+        np.testing.assert_array_equal(overridden[:, -1], np.full(10, 2e-3))
+
+    def test_reproducible(self):
+        failure_set = ComponentFailureSet()
+        samples = [uncertainty.sample_leak_frequencies(self.leak_sizes, None, self.component_sets, failure_set,
+                                                       100, 'mc', random_state=1) for _ in range(2)]
+        np.testing.assert_array_equal(samples[0], samples[1])
+
+
+if __name__ == "__main__":
+    unittest.main()